@@ -0,0 +1,33 @@
+import json
+import hashlib
+
+# Stored Candidate Analyses
+# The analysis payload (skills, gaps, experience, personal info, questions) is computed once
+# at ingest and stored on the candidate row, stamped with the analysis version and the hash
+# of the JD it was computed against. Opening a candidate only recomputes it when stale.
+
+
+def columns(analysis, engine, jd_hash):
+    """
+    Values for (analysis, analysis_version, analysis_jd_hash).
+    """
+    return json.dumps(analysis), engine.analysis_version, jd_hash
+
+
+def save_analysis(conn, candidate_id, analysis, engine, jd_hash):
+    conn.execute('UPDATE candidates SET analysis = ?, analysis_version = ?, analysis_jd_hash = ? WHERE id = ?',
+                 columns(analysis, engine, jd_hash) + (candidate_id,))
+
+
+def load_analysis(candidate, jd_text, analysis_version):
+    """
+    The stored analysis for a candidate row, or None if missing or stale.
+    Takes the version string (scoring_engine.analysis_version()), so it works before the model is loaded.
+    """
+    if not candidate['analysis']:
+        return None
+    if candidate['analysis_version'] != analysis_version:
+        return None
+    if candidate['analysis_jd_hash'] != hashlib.sha256((jd_text or "").encode('utf-8')).hexdigest():
+        return None
+    return json.loads(candidate['analysis'])
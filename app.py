@@ -1,6 +1,11 @@
 import os
-from flask import Flask, redirect, url_for
+import click
+from flask import Flask, redirect, url_for, jsonify
 import database
+import ingestion
+import rollups
+import scoring_engine
+import bulk_import
 from routes import talent_pool, analytics, settings, core
 
 # Initialize App and DB
@@ -32,7 +37,55 @@ app.register_blueprint(talent_pool.bp)
 app.register_blueprint(analytics.bp)
 app.register_blueprint(settings.bp)
 
+def start_background():
+    """
+    Load the scoring model in the background, so pages that don't score serve right away,
+    and start the CV ingestion workers (they wait for the model; uploads queue meanwhile).
+    Called by the server entry points (gunicorn.conf.py, `python app.py`), never on import:
+    tests, CLI commands and extraction pool processes import this module too.
+    """
+    scoring_engine.start_warmup()
+    ingestion.start_workers()
+
 # Global error handlers or context processors can go here
 
+@app.errorhandler(scoring_engine.EngineNotReady)
+def engine_not_ready(e):
+    # A scoring request timed out waiting for the model (see scoring_engine.get_engine)
+    return jsonify({'error': f"{e}. Please try again shortly."}), 503, {'Retry-After': '10'}
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: the scoring model is loaded."""
+    status = scoring_engine.engine_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups():
+    """Recompute the analytics rollup tables from candidates (e.g. after manual DB edits)."""
+    with database.get_db_connection() as conn:
+        rollups.rebuild(conn, postgres=conn.postgres)
+    print("Analytics rollups rebuilt.")
+
+@app.cli.command('import-resumes')
+@click.option('--job', 'job_id', type=int, required=True, help="Job to import the candidates into.")
+@click.option('--batch-size', type=int, default=bulk_import.BATCH_SIZE, show_default=True,
+              help="Files per batch (one encode call and one transaction each).")
+@click.option('--restart', is_flag=True, help="Start over instead of resuming an earlier run of this source.")
+@click.argument('source', type=click.Path(exists=True))
+def import_resumes(job_id, source, batch_size, restart):
+    """Import a directory or zip archive of resumes into a job (resumable; see bulk_import.py)."""
+    engine = scoring_engine.get_engine(timeout=None)
+    try:
+        bulk_import.run(engine, job_id, source, app.config['UPLOAD_FOLDER'], batch_size=batch_size, restart=restart)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
 if __name__ == '__main__':
+    start_background()
     app.run(debug=True)
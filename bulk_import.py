@@ -0,0 +1,176 @@
+import os
+import time
+import json
+import zipfile
+import collections
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from cv_parser import extract_texts
+import database
+import documents
+import job_profiles
+import job_weights
+import analysis_store
+import upload_store
+import vector_index
+
+# Bulk Resume Import (`flask import-resumes --job <id> <dir-or-zip>`)
+# Walks a directory tree or zip archive in sorted order, BATCH_SIZE files at a time:
+# files are read into memory and extracted in parallel (the originals are written to the
+# upload store in the background), the batch is scored with one encode call, and its
+# candidates are inserted with executemany in one transaction.
+# The run's position is committed in that same transaction (import_runs), so an
+# interrupted import picks up at the first batch that was not committed.
+
+EXTENSIONS = ('.pdf', '.docx', '.txt')
+BATCH_SIZE = 256
+
+_INSERT = '''INSERT INTO candidates
+             (job_id, filename, file_key, semantic_score, skills_score, experience_score, total_score,
+              document_hash, missing_skills, interview_questions, analysis, analysis_version, analysis_jd_hash)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+
+def list_files(source):
+    """
+    Sorted [(name, open())] for the resumes in a directory tree or a zip archive.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            paths += [os.path.join(root, n) for n in names if os.path.splitext(n)[1].lower() in EXTENSIONS]
+        return [(os.path.relpath(p, source), lambda p=p: open(p, 'rb')) for p in sorted(paths)]
+    if zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        names = sorted(n for n in archive.namelist()
+                       if not n.endswith('/') and not n.startswith('__MACOSX/')
+                       and os.path.splitext(n)[1].lower() in EXTENSIONS)
+        return [(n, lambda n=n: archive.open(n)) for n in names]
+    raise ValueError(f"{source} is neither a directory nor a zip archive")
+
+
+def _open_run(conn, job_id, source, total, restart):
+    """
+    The import_runs row to continue, or a new one.
+    """
+    last = conn.execute('SELECT * FROM import_runs WHERE job_id = ? AND source = ? ORDER BY id DESC LIMIT 1',
+                        (job_id, source)).fetchone()
+    if last and not restart:
+        if last['finished_at'] is not None:
+            raise ValueError(f"{source} was already imported into job {job_id} (run {last['id']}, "
+                             f"{last['imported']} candidates). Use --restart to import it again.")
+        if last['total'] != total:
+            raise ValueError(f"{source} changed since run {last['id']} started ({last['total']} files, now {total}); "
+                             f"use --restart to import it from the beginning.")
+        print(f"Resuming run {last['id']} at file {last['position'] + 1} of {total} "
+              f"({last['imported']} imported, {last['failed']} failed so far).")
+        return last
+    cur = conn.execute('INSERT INTO import_runs (job_id, source, total) VALUES (?, ?, ?)', (job_id, source, total))
+    return conn.execute('SELECT * FROM import_runs WHERE id = ?', (cur.lastrowid,)).fetchone()
+
+
+def _read(files):
+    """
+    Read a batch into memory: ([(filename, key, data)], [(name, error)]).
+    """
+    uploads, failures = [], []
+    for name, opener in files:
+        try:
+            with opener() as stream:
+                data, key = upload_store.read(FileStorage(stream=stream, filename=os.path.basename(name)))
+            uploads.append((secure_filename(os.path.basename(name)), key, data))
+        except Exception as e:
+            failures.append((name, str(e)))
+    return uploads, failures
+
+
+def run(engine, job_id, source, upload_root, batch_size=BATCH_SIZE, restart=False):
+    """
+    Import every resume under source into a job, resuming an unfinished run unless restart.
+    Returns {'imported', 'failed', 'seconds'} for this invocation.
+    """
+    source = os.path.abspath(source)
+    files = list_files(source)
+    with database.get_db_connection() as conn:
+        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if not job:
+            raise ValueError(f"Job {job_id} not found")
+        profile = job_profiles.get_job_profile(conn, job, engine)
+        import_run = _open_run(conn, job_id, source, len(files), restart)
+    weights = job_weights.get_weights(job)
+    position = import_run['position']
+
+    print(f"Importing {len(files) - position} of {len(files)} files from {source} into job {job_id} "
+          f"({job['title']}), {batch_size} per batch...")
+    started = time.perf_counter()
+    imported = 0
+    errors = []
+    while position < len(files):
+        batch_started = time.perf_counter()
+        batch = files[position:position + batch_size]
+
+        # 1. Read the files and extract them in parallel, straight from memory
+        uploads, failures = _read(batch)
+        parsed = []
+        for (filename, key, data), result in zip(uploads, extract_texts([data for _, _, data in uploads])):
+            upload_store.persist(os.path.join(upload_root, key), data, result['text'])
+            if result['error'] is None:
+                parsed.append((filename, key, result['text']))
+            else:
+                failures.append((filename, result['error']))
+
+        # 2. One batched encode, before this batch's write transaction
+        scores = engine.score_cvs([text for _, _, text in parsed], job['description'], weights, job_profile=profile)
+        rows = []
+        texts = {}
+        for (filename, key, text), score_data in zip(parsed, scores):
+            analysis = engine.analyze_candidate(text, job['description'], job_profile=profile)
+            texts[documents.content_hash(text)] = text
+            rows.append((job_id, filename, key,
+                         score_data['breakdown']['semantic_match'],
+                         score_data['breakdown']['skills_match'],
+                         score_data['breakdown']['experience_match'],
+                         score_data['total_score'],
+                         documents.content_hash(text),
+                         json.dumps(analysis['missing']),
+                         json.dumps(analysis['questions'])
+                        ) + analysis_store.columns(analysis, engine, profile['jd_hash']))
+
+        # 3. Candidates and checkpoint commit together
+        position += len(batch)
+        with database.get_db_connection() as conn:
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) AS id FROM candidates').fetchone()['id']
+            for text in texts.values():
+                documents.store(conn, text)
+            if rows:
+                conn.executemany(_INSERT, rows)
+            conn.execute('''UPDATE import_runs SET position = ?, imported = imported + ?, failed = failed + ?,
+                                   seconds = seconds + ? WHERE id = ?''',
+                         (position, len(rows), len(failures), time.perf_counter() - batch_started, import_run['id']))
+            inserted = conn.execute('SELECT id, document_hash FROM candidates WHERE job_id = ? AND id > ? ORDER BY id',
+                                    (job_id, last_id)).fetchall() if rows else []
+        vector_index.add_candidates(engine, [(row['id'], texts[row['document_hash']])
+                                             for row in inserted if row['document_hash'] in texts])
+
+        imported += len(rows)
+        errors += failures
+        for name, error in failures:
+            print(f"  failed: {name}: {error}")
+        elapsed = time.perf_counter() - started
+        print(f"[{position}/{len(files)}] {imported} imported, {len(errors)} failed, "
+              f"{(imported + len(errors)) / elapsed:.1f} files/s")
+
+    with database.get_db_connection() as conn:
+        conn.execute('UPDATE import_runs SET finished_at = CURRENT_TIMESTAMP WHERE id = ?', (import_run['id'],))
+        totals = conn.execute('SELECT * FROM import_runs WHERE id = ?', (import_run['id'],)).fetchone()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nImport finished in {elapsed:.1f}s: {imported} imported, {len(errors)} failed"
+          f" ({(imported + len(errors)) / elapsed if elapsed else 0:.1f} files/s).")
+    if totals['position'] > len(errors) + imported:
+        print(f"Whole run {totals['id']}: {totals['imported']} imported, {totals['failed']} failed "
+              f"in {totals['seconds']:.1f}s.")
+    for error, count in collections.Counter(error for _, error in errors).most_common(5):
+        print(f"  {count} x {error}")
+    return {'imported': imported, 'failed': len(errors), 'seconds': elapsed}
@@ -0,0 +1,164 @@
+"""
+Compare ScoringEngine inference backends (see BACKENDS in scoring_engine.py) on a fixed
+resume/JD corpus:
+
+    python compare_backends.py
+    python compare_backends.py --backends torch,int8 --resumes path/to/cvs --jd path/to/jd.txt
+
+For each backend it reports model load time, batch encoding throughput, single-query latency
+and drift against torch fp32: embedding cosine similarity, total_score difference and how many
+of the fp32 top-10 candidates per JD are still in the top 10.
+Embeddings are kept in memory only; nothing is written to the database.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+import scoring_engine
+from embedding_cache import EmbeddingCache
+
+ROLES = [
+    ('Backend Engineer', ['python', 'flask', 'postgresql', 'redis', 'docker', 'aws']),
+    ('Frontend Developer', ['javascript', 'react', 'vue', 'node', 'agile', 'communication']),
+    ('Data Scientist', ['python', 'pandas', 'numpy', 'scikit-learn', 'tensorflow', 'pytorch']),
+    ('Cloud Platform Engineer', ['kubernetes', 'docker', 'aws', 'gcp', 'azure', 'leadership']),
+    ('Mobile Developer', ['android', 'ios', 'flutter', 'react native', 'java', 'teamwork']),
+    ('Java Engineer', ['java', 'mysql', 'oracle', 'scrum', 'docker', 'mongodb']),
+]
+EXTRA_SKILLS = sorted({skill for _, skills in ROLES for skill in skills})
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Stark Industries', 'Wayne Enterprises']
+DUTIES = ['built and maintained {} services', 'led a migration to {}', 'designed reporting pipelines with {}',
+          'mentored junior engineers on {}', 'improved {} test coverage and release tooling',
+          'owned on-call for the {} platform']
+
+
+def fixed_corpus(resumes_per_role=8, seed=7):
+    """
+    Deterministic JDs (one per role) and resumes with summary, skills and experience sections.
+    """
+    rnd = random.Random(seed)
+    jds = [f"{title}\nWe are hiring a {title.lower()} with strong experience in {', '.join(skills)}. "
+           f"You will design, build and operate production systems with a small, collaborative team."
+           for title, skills in ROLES]
+    resumes = []
+    for title, skills in ROLES:
+        for _ in range(resumes_per_role):
+            # Mostly on-role skills, plus some noise so rankings are not trivial
+            chosen = rnd.sample(skills, rnd.randint(2, len(skills))) + rnd.sample(EXTRA_SKILLS, 3)
+            years = rnd.randint(1, 12)
+            jobs = []
+            for _ in range(rnd.randint(1, 3)):
+                duties = '; '.join(rnd.choice(DUTIES).format(rnd.choice(chosen)) for _ in range(3))
+                jobs.append(f"{rnd.choice(COMPANIES)} ({rnd.randint(1, 5)} years): {duties}.")
+            resumes.append(f"Summary\n{title} with {years} years of professional experience.\n"
+                           f"Skills\n{', '.join(chosen)}\n"
+                           f"Experience\n" + '\n'.join(jobs) + "\n"
+                           f"Education\nBSc Computer Science")
+    return jds, resumes
+
+
+def load_corpus(resume_dir, jd_path):
+    from cv_parser import extract_text
+    resumes = [extract_text(os.path.join(resume_dir, name)) for name in sorted(os.listdir(resume_dir))]
+    with open(jd_path, encoding='utf-8') as f:
+        jds = [f.read()]
+    return jds, [text for text in resumes if text]
+
+
+def run(backend, jds, resumes, latency_queries):
+    start = time.perf_counter()
+    # local: load this backend in-process, even when EMBEDDING_SOCKET points at a server
+    engine = scoring_engine.ScoringEngine(backend=backend, local=True)
+    load_seconds = time.perf_counter() - start
+    engine.cache = EmbeddingCache(engine.model_version, persistent=False)
+
+    # Throughput: encode the whole corpus, bypassing the cache (best of 2, the first warms up)
+    best = None
+    for _ in range(2):
+        start = time.perf_counter()
+        vectors = engine.model.encode(resumes, batch_size=32, convert_to_numpy=True,
+                                      normalize_embeddings=True, show_progress_bar=False)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Latency: one short text per call, like a search query or a single application
+    latencies = []
+    for query in latency_queries:
+        start = time.perf_counter()
+        engine.encode_query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    scores = np.array([[s['total_score'] for s in engine.score_cvs(resumes, jd)] for jd in jds])
+    return {
+        'backend': engine.backend, # may have fallen back to torch
+        'load_seconds': load_seconds,
+        'throughput': len(resumes) / best,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p95': float(np.percentile(latencies, 95)),
+        'vectors': np.asarray(vectors, dtype=np.float32),
+        'scores': scores,
+    }
+
+
+def drift(result, baseline, top_k=10):
+    cosine = np.sum(result['vectors'] * baseline['vectors'], axis=1)
+    delta = np.abs(result['scores'] - baseline['scores'])
+    k = min(top_k, result['scores'].shape[1])
+    overlap = [len(set(np.argsort(-row)[:k]) & set(np.argsort(-base)[:k])) / k
+               for row, base in zip(result['scores'], baseline['scores'])]
+    return {
+        'cosine_mean': float(cosine.mean()),
+        'cosine_min': float(cosine.min()),
+        'score_diff_mean': float(delta.mean()),
+        'score_diff_max': float(delta.max()),
+        'topk_overlap': float(np.mean(overlap)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ScoringEngine inference backends.")
+    parser.add_argument('--backends', default=','.join(scoring_engine.BACKENDS),
+                        help="comma-separated, from: " + ', '.join(scoring_engine.BACKENDS))
+    parser.add_argument('--resumes', help="directory of resume files (default: built-in corpus)")
+    parser.add_argument('--jd', help="job description text file (with --resumes)")
+    parser.add_argument('--queries', type=int, default=50, help="single-text encodes for latency")
+    args = parser.parse_args()
+
+    if args.resumes:
+        if not args.jd:
+            parser.error("--resumes needs --jd")
+        jds, resumes = load_corpus(args.resumes, args.jd)
+    else:
+        jds, resumes = fixed_corpus()
+    queries = [f"{title.lower()} {skill}" for title, skills in ROLES for skill in skills]
+    queries = (queries * (args.queries // len(queries) + 1))[:args.queries]
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    if 'torch' not in backends:
+        backends.insert(0, 'torch') # the fp32 baseline for drift
+    backends.sort(key=lambda b: b != 'torch')
+    print(f"Corpus: {len(jds)} JDs x {len(resumes)} resumes, {len(queries)} latency queries\n")
+
+    results = [run(backend, jds, resumes, queries) for backend in backends]
+    baseline = results[0]
+
+    header = (f"{'backend':<8} {'load s':>7} {'texts/s':>8} {'p50 ms':>7} {'p95 ms':>7} "
+              f"{'cos mean':>8} {'cos min':>8} {'Δscore':>7} {'Δmax':>6} {'top10':>6}")
+    print(header)
+    print('-' * len(header))
+    for requested, result in zip(backends, results):
+        d = drift(result, baseline)
+        name = result['backend'] if result['backend'] == requested else f"{requested}!"
+        print(f"{name:<8} {result['load_seconds']:>7.1f} {result['throughput']:>8.1f} "
+              f"{result['latency_p50']:>7.1f} {result['latency_p95']:>7.1f} "
+              f"{d['cosine_mean']:>8.4f} {d['cosine_min']:>8.4f} {d['score_diff_mean']:>7.2f} "
+              f"{d['score_diff_max']:>6.2f} {d['topk_overlap']:>6.0%}")
+    if any(result['backend'] != requested for requested, result in zip(backends, results)):
+        print("\n! = backend unavailable here, fell back to torch fp32 (see the log above)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,21 +3,173 @@ import pdfplumber
 import docx
 import re
 import os
+import io
+import codecs
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 
-def extract_text(filepath):
+# Parallel extraction settings (see extract_texts)
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', os.cpu_count() or 2))
+EXTRACT_TIMEOUT = int(os.getenv('EXTRACT_TIMEOUT', 60)) # seconds per file
+
+# Bump when extraction output changes, so cached text (see upload_store.py) is refreshed
+EXTRACTOR_VERSION = '1'
+
+SNIFF_BYTES = 2048 # leading bytes sniff_type looks at
+
+def sniff_type(head):
+    """
+    File type from a file's leading bytes: 'pdf', 'docx', 'txt' or None.
+    Uploads are identified by content, so a misnamed file still parses.
+    """
+    head = bytes(head[:SNIFF_BYTES])
+    if b'%PDF-' in head[:1024]: # readers tolerate junk before the header
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'): # zip container; docx.Document validates the rest
+        return 'docx'
+    if b'\x00' in head:
+        return None
+    try:
+        # final=False: the sample may end mid-character
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'txt'
+    except UnicodeDecodeError:
+        return None
+
+def extract_text(source, file_type=None):
     """
-    Extracts text from a file (PDF, DOCX, or TXT).
+    Extracts text from a PDF, DOCX or TXT file, given as a path, bytes or a binary file object.
+    file_type ('pdf', 'docx', 'txt') is sniffed from the content when not declared.
     """
-    ext = os.path.splitext(filepath)[1].lower()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return extract_text(f, file_type)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif not source.seekable():
+        source = io.BytesIO(source.read())
+
+    if file_type is None:
+        start = source.tell()
+        file_type = sniff_type(source.read(SNIFF_BYTES))
+        source.seek(start)
     
-    if ext == '.pdf':
-        return extract_text_from_pdf(filepath)
-    elif ext == '.docx':
-        return extract_text_from_docx(filepath)
-    elif ext == '.txt':
-        return extract_text_from_txt(filepath)
+    if file_type == 'pdf':
+        return extract_text_from_pdf(source)
+    elif file_type == 'docx':
+        return extract_text_from_docx(source)
+    elif file_type == 'txt':
+        return extract_text_from_txt(source)
     else:
-        raise ValueError(f"Unsupported file format: {ext}")
+        raise ValueError(f"Unsupported file format: {file_type or 'unrecognized content'}")
+
+class ExtractionTimeout(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout("Extraction timed out")
+
+def _extract_in_worker(source, timeout):
+    """
+    Runs inside a pool process. pdfplumber is pure Python, so SIGALRM can interrupt
+    a pathological file without killing the worker.
+    """
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(timeout)
+    try:
+        return extract_text(source)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that holds torch / request threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _reset_pool(pool, kill=False):
+    """
+    Drop a broken or stuck pool so the next call starts a fresh one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    if kill:
+        # A worker stuck in C code ignores SIGALRM; terminate it
+        for proc in list(getattr(pool, '_processes', {}).values()):
+            proc.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_texts(filepaths, workers=None, timeout=EXTRACT_TIMEOUT):
+    """
+    Extract many files (paths, or file contents as bytes) in parallel across processes.
+    Returns a list of {'path', 'text', 'error'} dicts in the same order as filepaths
+    ('path' is None for in-memory files).
+    A file that fails, times out or crashes its worker only fails itself.
+    `workers` sizes the shared pool when it is first created.
+    """
+    workers = workers or EXTRACT_WORKERS
+    results = [{'path': p if isinstance(p, (str, os.PathLike)) else None, 'text': None, 'error': None}
+               for p in filepaths]
+    if not filepaths:
+        return results
+
+    pool = _get_pool(workers)
+    futures = [pool.submit(_extract_in_worker, p, timeout) for p in filepaths]
+    # Safety net on top of the in-worker alarm: every file gets `timeout` once it reaches a worker
+    rounds = -(-len(filepaths) // workers)
+    deadline = (timeout or 0) * rounds + 30
+
+    retry = []
+    stuck = False
+    for i, future in enumerate(futures):
+        try:
+            if stuck and not future.done():
+                retry.append(i)
+                continue
+            results[i]['text'] = future.result(timeout=deadline if timeout else None)
+        except (BrokenProcessPool, CancelledError):
+            # Some file in flight crashed a worker (or another caller reset the pool);
+            # we can't tell which file yet
+            retry.append(i)
+        except FutureTimeout:
+            results[i]['error'] = "Extraction timed out"
+            stuck = True
+        except Exception as e:
+            results[i]['error'] = str(e)
+    if stuck:
+        _reset_pool(pool, kill=True)
+
+    if retry:
+        _reset_pool(pool)
+        # Re-run the affected files one at a time so a crash pins down the culprit
+        for i in sorted(set(retry)):
+            pool = _get_pool(workers)
+            try:
+                results[i]['text'] = pool.submit(_extract_in_worker, filepaths[i], timeout).result(
+                    timeout=(timeout + 30) if timeout else None)
+            except (BrokenProcessPool, CancelledError):
+                results[i]['error'] = "Extraction crashed"
+                _reset_pool(pool)
+            except FutureTimeout:
+                results[i]['error'] = "Extraction timed out"
+                _reset_pool(pool, kill=True)
+            except Exception as e:
+                results[i]['error'] = str(e)
+
+    return results
 
 def extract_text_from_pdf(filepath):
     text = ""
@@ -32,22 +184,18 @@ def extract_text_from_docx(filepath):
     doc = docx.Document(filepath)
     return "\n".join([para.text for para in doc.paragraphs])
 
-def extract_text_from_txt(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.read()
+def extract_text_from_txt(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return extract_text_from_txt(f)
+    # Universal newlines, as text-mode open() gave
+    return source.read().decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
 
-def parse_cv_sections(text):
+def section_spans(text):
     """
-    A heuristic-based parser to try and separate CV into sections.
-    This is not perfect but improves scoring granularly.
+    Character spans of the CV sections, in document order: [(name, start, end)].
+    Header info before the first heading is 'other'; with no headings the whole text is.
     """
-    sections = {
-        'experience': '',
-        'education': '',
-        'skills': '',
-        'other': ''
-    }
-    
     # Simple keyword based splitting (can be improved with NER later)
     # Using lowercase for matching
     lower_text = text.lower()
@@ -62,22 +210,32 @@ def parse_cv_sections(text):
     indices = [i for i in indices if i[0] != -1]
     
     if not indices:
-        return {'other': text} # Return full text if no sections found
+        return [('other', 0, len(text))]
 
-    # Slice text
     # Assuming 'other' (header info) is before the first section
-    sections['other'] = text[:indices[0][0]]
-    
-    for i in range(len(indices)):
-        start_idx = indices[i][0]
-        section_name = indices[i][1]
-        
-        if i < len(indices) - 1:
-            end_idx = indices[i+1][0]
-            sections[section_name] = text[start_idx:end_idx]
-        else:
-            sections[section_name] = text[start_idx:]
-            
+    spans = [('other', 0, indices[0][0])]
+    for i, (start_idx, section_name) in enumerate(indices):
+        end_idx = indices[i + 1][0] if i < len(indices) - 1 else len(text)
+        spans.append((section_name, start_idx, end_idx))
+    return spans
+
+def parse_cv_sections(text):
+    """
+    A heuristic-based parser to try and separate CV into sections.
+    This is not perfect but improves scoring granularly.
+    """
+    spans = section_spans(text)
+    if len(spans) == 1:
+        return {'other': text} # Return full text if no sections found
+
+    sections = {
+        'experience': '',
+        'education': '',
+        'skills': '',
+        'other': ''
+    }
+    for section_name, start_idx, end_idx in spans:
+        sections[section_name] = text[start_idx:end_idx]
     return sections
 
 def extract_candidate_info(text):
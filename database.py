@@ -1,5 +1,13 @@
+import re
+import time
 import sqlite3
 import datetime
+import functools
+import collections
+import threading
+import documents
+import rollups
+import migrations
 
 DB_NAME = "ats.db"
 
@@ -7,17 +15,346 @@ DB_NAME = "ats.db"
 # Enhanced DB Connection (SQLite for Local, Postgres for Docker/Cloud)
 import os
 
-def get_db_connection():
+def _register_sqlite_functions(conn):
+    """
+    SQL functions the schema relies on. Every SQLite connection to ats.db needs them,
+    since the FTS triggers read resume text through document_text().
+    """
+    conn.create_function('document_text', 1, documents.decode, deterministic=True)
+
+# Resume text for FTS: the compressed document, or legacy inline text for unmigrated rows
+_FTS_TEXT = "COALESCE((SELECT document_text(body) FROM documents WHERE content_hash = {row}.document_hash), {row}.full_text)"
+
+def _init_search_sqlite(c):
+    """
+    FTS5 index over candidate names, filenames and resume text (see keyword_search.py).
+    External-content table over the candidates_fts_source view, kept in sync by triggers.
+    """
+    c.execute(f'''CREATE VIEW IF NOT EXISTS candidates_fts_source AS
+                    SELECT id, name, filename, {_FTS_TEXT.format(row='candidates')} AS full_text FROM candidates''')
+    existing = c.execute("SELECT sql FROM sqlite_master WHERE name = 'candidates_fts'").fetchone()
+    if existing and 'candidates_fts_source' not in existing[0]:
+        # Older index read candidates.full_text directly; rebuild it over the view
+        for trigger in ('insert', 'delete', 'update'):
+            c.execute(f'DROP TRIGGER IF EXISTS candidates_fts_{trigger}')
+        c.execute('DROP TABLE candidates_fts')
+        existing = None
+    try:
+        c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS candidates_fts USING fts5(
+                        name, filename, full_text,
+                        content='candidates_fts_source', content_rowid='id',
+                        tokenize='porter unicode61'
+                    )''')
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 not available, keyword search will scan: {e}")
+        return
+    new_text, old_text = _FTS_TEXT.format(row='new'), _FTS_TEXT.format(row='old')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS candidates_fts_insert AFTER INSERT ON candidates BEGIN
+                    INSERT INTO candidates_fts (rowid, name, filename, full_text)
+                    VALUES (new.id, new.name, new.filename, {new_text});
+                END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS candidates_fts_delete AFTER DELETE ON candidates BEGIN
+                    INSERT INTO candidates_fts (candidates_fts, rowid, name, filename, full_text)
+                    VALUES ('delete', old.id, old.name, old.filename, {old_text});
+                END''')
+    # Only text changes touch the index; status/score updates don't
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS candidates_fts_update
+                 AFTER UPDATE OF name, filename, full_text, document_hash ON candidates BEGIN
+                    INSERT INTO candidates_fts (candidates_fts, rowid, name, filename, full_text)
+                    VALUES ('delete', old.id, old.name, old.filename, {old_text});
+                    INSERT INTO candidates_fts (rowid, name, filename, full_text)
+                    VALUES (new.id, new.name, new.filename, {new_text});
+                END''')
+    if not existing:
+        # Index candidates stored before the FTS table existed
+        c.execute("INSERT INTO candidates_fts (candidates_fts) VALUES ('rebuild')")
+
+def _init_search_postgres(c):
+    """
+    tsvector column + GIN index for keyword search (see keyword_search.py).
+    A trigger fills it from the candidate's document (stored raw on Postgres).
+    """
+    c.execute("""SELECT is_generated FROM information_schema.columns
+                 WHERE table_name = 'candidates' AND column_name = 'search_vector'""")
+    column = c.fetchone()
+    if column and column[0] == 'ALWAYS':
+        # Older generated column read candidates.full_text; replace it
+        c.execute('ALTER TABLE candidates DROP COLUMN search_vector')
+        column = None
+    c.execute('ALTER TABLE candidates ADD COLUMN IF NOT EXISTS search_vector tsvector')
+    c.execute('''CREATE OR REPLACE FUNCTION candidates_search_vector() RETURNS trigger AS $$
+                 BEGIN
+                     NEW.search_vector :=
+                         setweight(to_tsvector('english', coalesce(NEW.name, '') || ' ' || coalesce(NEW.filename, '')), 'A') ||
+                         setweight(to_tsvector('english', coalesce(
+                             (SELECT convert_from(substring(body from 2), 'UTF8') FROM documents
+                              WHERE content_hash = NEW.document_hash),
+                             NEW.full_text, '')), 'B');
+                     RETURN NEW;
+                 END
+                 $$ LANGUAGE plpgsql''')
+    c.execute('DROP TRIGGER IF EXISTS candidates_search_vector ON candidates')
+    c.execute('''CREATE TRIGGER candidates_search_vector
+                 BEFORE INSERT OR UPDATE OF name, filename, full_text, document_hash ON candidates
+                 FOR EACH ROW EXECUTE FUNCTION candidates_search_vector()''')
+    if not column:
+        c.execute('UPDATE candidates SET name = name') # fill the new column
+    c.execute('CREATE INDEX IF NOT EXISTS idx_candidates_search ON candidates USING GIN (search_vector)')
+
+# --- Connection pool & dialect layer ---
+# get_db_connection() hands out a pooled Connection instead of opening a new one per call.
+# The same wrapper serves SQLite and Postgres: route SQL keeps its '?' placeholders and
+# is translated for psycopg2, rows support both row['col'] and row[0], and close()
+# (or leaving a `with` block) returns the connection to the pool.
+
+POOL_MAX = int(os.getenv('DB_POOL_MAX', 20)) # connections per process
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30)) # seconds to wait for a free one
+
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL', # readers don't block the writer
+    'PRAGMA synchronous=NORMAL', # durable with WAL, far fewer fsyncs
+    'PRAGMA busy_timeout=5000', # wait for the write lock instead of failing
+    'PRAGMA cache_size=-20000', # ~20MB page cache per connection
+    'PRAGMA temp_store=MEMORY',
+)
+
+_PARAM_RE = re.compile(r"('(?:[^']|'')*')|\?")
+
+@functools.lru_cache(maxsize=512)
+def _to_pyformat(sql):
+    """
+    '?' placeholders -> psycopg2's '%s' (string literals are left alone, '%' is escaped).
+    """
+    return _PARAM_RE.sub(lambda m: m.group(1) or '%s', sql.replace('%', '%%'))
+
+class PoolTimeout(RuntimeError):
+    pass
+
+# Tables with a SERIAL id: single-row inserts into them get RETURNING id, so the
+# id is read with the statement itself (lastval() later could see another session's insert)
+_SERIAL_TABLES = {'jobs', 'users', 'candidates', 'ingest_batches', 'ingest_items', 'import_runs'}
+_INSERT_RE = re.compile(r"^\s*INSERT\s+INTO\s+(\w+)", re.IGNORECASE)
+
+class _PgCursor:
+    """
+    psycopg2 cursor with sqlite3-style lastrowid (the id of the last SERIAL insert).
+    """
+    def __init__(self, cursor, lastrowid=None):
+        self._cursor = cursor
+        self.lastrowid = lastrowid
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class Connection:
+    """
+    A pooled connection. Use as `with get_db_connection() as conn:` (commit on success,
+    rollback on error) or call close() when done; both return it to the pool.
+    """
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self.postgres = pool.postgres
+
+    def execute(self, sql, params=()):
+        if not self.postgres:
+            return self._raw.execute(sql, params)
+        insert = _INSERT_RE.match(sql)
+        returning = bool(insert) and insert.group(1).lower() in _SERIAL_TABLES and 'RETURNING' not in sql.upper()
+        if returning:
+            sql = sql.rstrip().rstrip(';') + ' RETURNING id'
+        cur = self._raw.cursor()
+        if params:
+            cur.execute(_to_pyformat(sql), tuple(params))
+        else:
+            cur.execute(sql)
+        row = cur.fetchone() if returning else None
+        return _PgCursor(cur, row[0] if row else None)
+
+    def executemany(self, sql, seq_of_params):
+        if not self.postgres:
+            return self._raw.executemany(sql, seq_of_params)
+        cur = self._raw.cursor()
+        cur.executemany(_to_pyformat(sql), [tuple(p) for p in seq_of_params])
+        return _PgCursor(cur)
+
+    def stream(self, sql, params=(), batch_size=1000):
+        """
+        Yield rows of a large SELECT batch_size at a time, never holding the whole result:
+        a named (server-side) cursor on Postgres, fetchmany() on SQLite.
+        """
+        if self.postgres:
+            cur = self._raw.cursor(name=f'stream_{id(self)}_{time.monotonic_ns()}')
+            cur.itersize = batch_size
+            cur.execute(_to_pyformat(sql) if params else sql, tuple(params))
+        else:
+            cur = self._raw.execute(sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cur.close()
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._raw is not None:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        self.close()
+
+    def __del__(self):
+        # A connection dropped without close() (e.g. an early return) still goes back
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class _Pool:
+    """
+    Thread-safe LIFO pool of raw connections, at most POOL_MAX checked out at once.
+    Released connections are rolled back, so each checkout starts clean.
+    """
+    def __init__(self, connect, postgres, max_size=POOL_MAX, timeout=POOL_TIMEOUT):
+        self._connect = connect
+        self.postgres = postgres
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._stats = {'created': 0, 'checkouts': 0, 'in_use': 0, 'waits': 0, 'wait_seconds': 0.0,
+                       'timeouts': 0, 'discarded': 0}
+
+    def acquire(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(f"No database connection free after {self.timeout}s (pool size {self.max_size})")
+        waited = time.perf_counter() - started
+        with self._lock:
+            raw = self._idle.pop() if self._idle else None
+        try:
+            if raw is None or (self.postgres and raw.closed):
+                raw = self._connect()
+                with self._lock:
+                    self._stats['created'] += 1
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            if waited > 0.001:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += waited
+        return raw
+
+    def release(self, raw):
+        keep = True
+        try:
+            raw.rollback() # discard anything left uncommitted
+        except Exception:
+            keep = False
+        if self.postgres and raw.closed:
+            keep = False
+        with self._lock:
+            self._stats['in_use'] -= 1
+            if keep:
+                self._idle.append(raw)
+            else:
+                self._stats['discarded'] += 1
+        if not keep:
+            try:
+                raw.close()
+            except Exception:
+                pass
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['dialect'] = 'postgres' if self.postgres else 'sqlite'
+        stats['max_size'] = self.max_size
+        stats['open'] = stats['idle'] + stats['in_use']
+        stats['reused'] = stats['checkouts'] - stats['created']
+        stats['wait_seconds'] = round(stats['wait_seconds'], 4)
+        return stats
+
+def _connect_postgres(db_url):
+    import psycopg2
+    from psycopg2.extras import DictCursor
+    return psycopg2.connect(db_url, cursor_factory=DictCursor)
+
+def _connect_sqlite(path):
+    # Pooled connections move between request threads, one thread at a time
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+    conn.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    _register_sqlite_functions(conn)
+    return conn
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool():
     db_url = os.getenv('DATABASE_URL')
-    if db_url:
+    # Per process (forked workers must not share sockets) and per target
+    key = (os.getpid(), db_url or DB_NAME)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                if db_url:
+                    pool = _Pool(lambda: _connect_postgres(db_url), postgres=True)
+                else:
+                    path = DB_NAME
+                    pool = _Pool(lambda: _connect_sqlite(path), postgres=False)
+                _pools[key] = pool
+    return pool
+
+def get_db_connection():
+    """
+    Check out a pooled connection (see Connection). Callers close() it or use `with`.
+    """
+    pool = _get_pool()
+    return Connection(pool, pool.acquire())
+
+def pool_stats():
+    """
+    Counters for this process's connection pool (checkouts, reuse, waits, open connections).
+    """
+    return _get_pool().stats()
+
+def _integrity_errors():
+    if os.getenv('DATABASE_URL'):
         import psycopg2
-        from psycopg2.extras import RealDictCursor
-        conn = psycopg2.connect(db_url, cursor_factory=RealDictCursor)
-        return conn
-    else:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return (sqlite3.IntegrityError, psycopg2.IntegrityError)
+    return (sqlite3.IntegrityError,)
 
 def init_db():
     db_url = os.getenv('DATABASE_URL')
@@ -62,13 +399,68 @@ def init_db():
                         user_id INTEGER REFERENCES users(id),
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )''')
+
+        # Resume bodies (see documents.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS documents (
+                        content_hash TEXT PRIMARY KEY,
+                        body BYTEA NOT NULL, -- codec byte + payload
+                        raw_size INTEGER,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+
+        # Embedding cache (see embedding_cache.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS embeddings (
+                        text_hash TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        vector BYTEA NOT NULL,
+                        last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (text_hash, model)
+                    )''')
+
+        # Ingestion queue (see ingestion.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS ingest_batches (
+                        id SERIAL PRIMARY KEY,
+                        job_id INTEGER REFERENCES jobs(id),
+                        user_id INTEGER REFERENCES users(id),
+                        total INTEGER DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS ingest_items (
+                        id SERIAL PRIMARY KEY,
+                        batch_id INTEGER REFERENCES ingest_batches(id),
+                        job_id INTEGER,
+                        filename TEXT,
+                        path TEXT,
+                        status TEXT DEFAULT 'queued',
+                        error TEXT,
+                        candidate_id INTEGER,
+                        started_ts DOUBLE PRECISION,
+                        finished_ts DOUBLE PRECISION,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_ingest_items_status ON ingest_items (status, id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_ingest_items_batch ON ingest_items (batch_id)')
+
+        schema = migrations.migrate(c, postgres=True)
+        _init_search_postgres(c)
+        rollups_created = rollups.init_postgres(c)
         
         conn.commit()
         conn.close()
+        with get_db_connection() as conn:
+            migrated = documents.migrate_inline_text(conn)
+            if rollups_created:
+                rollups.rebuild(conn, postgres=True)
+        if migrated:
+            print(f"Moved {migrated} resumes into document storage.")
+        migrations.report(*schema)
         print("Initialized PostgreSQL Database.")
     else:
         # SQLite Initialization (Existing Logic)
         conn = sqlite3.connect(DB_NAME)
+        conn.row_factory = sqlite3.Row
+        _register_sqlite_functions(conn)
         c = conn.cursor()
         
         # Jobs Table
@@ -109,9 +501,64 @@ def init_db():
                         role TEXT DEFAULT 'candidate', -- recruiter, candidate, admin
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )''')
+
+        # Resume bodies (see documents.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS documents (
+                        content_hash TEXT PRIMARY KEY,
+                        body BLOB NOT NULL, -- codec byte + payload
+                        raw_size INTEGER,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )''')
+
+        # Embedding cache (see embedding_cache.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS embeddings (
+                        text_hash TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        vector BLOB NOT NULL, -- float16
+                        last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (text_hash, model)
+                    )''')
+
+        # Ingestion queue (see ingestion.py)
+        c.execute('''CREATE TABLE IF NOT EXISTS ingest_batches (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        job_id INTEGER,
+                        user_id INTEGER,
+                        total INTEGER DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY(job_id) REFERENCES jobs(id)
+                    )''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS ingest_items (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        batch_id INTEGER,
+                        job_id INTEGER,
+                        filename TEXT,
+                        path TEXT,
+                        status TEXT DEFAULT 'queued', -- queued, processing, done, failed
+                        error TEXT,
+                        candidate_id INTEGER,
+                        started_ts REAL, -- epoch seconds, for throughput
+                        finished_ts REAL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY(batch_id) REFERENCES ingest_batches(id)
+                    )''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_ingest_items_status ON ingest_items (status, id)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_ingest_items_batch ON ingest_items (batch_id)')
+
+        schema = migrations.migrate(c)
+        _init_search_sqlite(c)
+        if rollups.init_sqlite(c):
+            rollups.rebuild(conn)
+        migrated = documents.migrate_inline_text(conn)
         
         conn.commit()
+        if migrated:
+            # Give the space of the moved resume text back to the filesystem
+            conn.execute('VACUUM')
+            print(f"Moved {migrated} resumes into compressed document storage.")
         conn.close()
+        migrations.report(*schema)
         print("Initialized SQLite Database.")
 
 
@@ -119,50 +566,85 @@ def init_db():
 from flask_login import UserMixin
 import werkzeug.security
 
+# Profile columns are loaded on first access, so the per-request session user stays small
+PROFILE_COLUMNS = ('resume_path', 'skills', 'experience', 'education', 'profile_summary')
+SESSION_USER_TTL = float(os.getenv('SESSION_USER_CACHE_TTL', 60)) # seconds
+SESSION_USER_CACHE_SIZE = int(os.getenv('SESSION_USER_CACHE_SIZE', 1024))
+
+# user_id -> (expires, (id, name, email, role)), least recently used first
+_session_users = collections.OrderedDict()
+_session_users_lock = threading.Lock()
+
 class User(UserMixin):
-    def __init__(self, id, name, email, role, password_hash, resume_path=None, skills=None, experience=None, education=None, profile_summary=None):
+    def __init__(self, id, name, email, role, password_hash=None, **profile):
         self.id = id
         self.name = name
         self.email = email
         self.role = role
         self.password_hash = password_hash
-        self.resume_path = resume_path
-        self.skills = skills
-        self.experience = experience
-        self.education = education
-        self.profile_summary = profile_summary
+        for column, value in profile.items():
+            setattr(self, column, value)
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set yet: fetch that one profile column
+        if name not in PROFILE_COLUMNS:
+            raise AttributeError(name)
+        with get_db_connection() as conn:
+            row = conn.execute(f'SELECT {name} FROM users WHERE id = ?', (self.id,)).fetchone()
+        value = row[name] if row else None
+        setattr(self, name, value)
+        return value
 
     @staticmethod
     def get(user_id):
-        conn = get_db_connection()
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-        conn.close()
+        """
+        Session user loader (runs on every authenticated request): identity and role only,
+        cached for SESSION_USER_TTL seconds.
+        """
+        key = str(user_id)
+        now = time.monotonic()
+        with _session_users_lock:
+            cached = _session_users.get(key)
+            if cached and cached[0] > now:
+                _session_users.move_to_end(key)
+                return User(*cached[1])
+
+        with get_db_connection() as conn:
+            user = conn.execute('SELECT id, name, email, role FROM users WHERE id = ?', (user_id,)).fetchone()
         if not user: return None
-        return User(user['id'], user['name'], user['email'], user['role'], user['password_hash'], 
-                   user['resume_path'], user['skills'], user['experience'], user['education'], user['profile_summary'])
+        identity = (user['id'], user['name'], user['email'], user['role'])
+        with _session_users_lock:
+            _session_users[key] = (now + SESSION_USER_TTL, identity)
+            _session_users.move_to_end(key)
+            while len(_session_users) > SESSION_USER_CACHE_SIZE:
+                _session_users.popitem(last=False)
+        return User(*identity)
+
+    @staticmethod
+    def invalidate(user_id):
+        """
+        Drop a cached session user. Call after changing the user's row (profile, role).
+        """
+        with _session_users_lock:
+            _session_users.pop(str(user_id), None)
 
     @staticmethod
     def get_by_email(email):
-        conn = get_db_connection()
-        user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            user = conn.execute('SELECT id, name, email, role, password_hash FROM users WHERE email = ?', (email,)).fetchone()
         if not user: return None
-        return User(user['id'], user['name'], user['email'], user['role'], user['password_hash'],
-                   user['resume_path'], user['skills'], user['experience'], user['education'], user['profile_summary'])
+        return User(user['id'], user['name'], user['email'], user['role'], user['password_hash'])
         
     @staticmethod
     def create(name, email, password, role='candidate'):
         hashed = werkzeug.security.generate_password_hash(password)
-        conn = get_db_connection()
         try:
-            conn.execute('INSERT INTO users (name, email, password_hash, role) VALUES (?, ?, ?, ?)', 
-                         (name, email, hashed, role))
-            conn.commit()
+            with get_db_connection() as conn:
+                conn.execute('INSERT INTO users (name, email, password_hash, role) VALUES (?, ?, ?, ?)', 
+                             (name, email, hashed, role))
             return True
-        except sqlite3.IntegrityError:
+        except _integrity_errors(): # email already registered
             return False
-        finally:
-            conn.close()
 
     def check_password(self, password):
         return werkzeug.security.check_password_hash(self.password_hash, password)
@@ -0,0 +1,153 @@
+import os
+import zlib
+import hashlib
+
+try:
+    import zstandard
+except ImportError: # optional, zlib is always available
+    zstandard = None
+
+# Resume Document Store
+# Extracted resume text lives in the `documents` table, keyed by the sha256 of the text,
+# instead of inline in candidates.full_text. Candidates point at it via document_hash, so
+# an identical resume sent to ten jobs is stored once and list queries never carry it.
+# Each body is framed with a leading codec byte, so codecs can change without a rewrite.
+# On Postgres bodies are stored raw (codec 0): TOAST already compresses them, and the
+# database can read the text itself for tsvector indexing and ts_headline.
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+ZLIB_LEVEL = 6
+MIGRATE_BATCH = 200
+
+
+def _default_codec():
+    if os.getenv('DATABASE_URL'):
+        return CODEC_RAW
+    if os.getenv('DOCUMENT_CODEC') == 'zstd' and zstandard is not None:
+        return CODEC_ZSTD
+    return CODEC_ZLIB
+
+
+def encode(text, codec=None):
+    """
+    Frame and compress text: one codec byte followed by the payload.
+    """
+    codec = _default_codec() if codec is None else codec
+    raw = (text or "").encode('utf-8')
+    if codec == CODEC_ZLIB:
+        payload = zlib.compress(raw, ZLIB_LEVEL)
+    elif codec == CODEC_ZSTD:
+        payload = zstandard.ZstdCompressor().compress(raw)
+    else:
+        payload = raw
+    return bytes([codec]) + payload
+
+
+def decode(body):
+    if body is None:
+        return None
+    body = bytes(body)
+    codec, payload = body[0], body[1:]
+    if codec == CODEC_ZLIB:
+        payload = zlib.decompress(payload)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Document is zstd-compressed but the zstandard package is not installed")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec != CODEC_RAW:
+        raise ValueError(f"Unknown document codec {codec}")
+    return payload.decode('utf-8')
+
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode('utf-8')).hexdigest()
+
+
+def store(conn, text):
+    """
+    Store a resume body (once per distinct text). Returns its hash for candidates.document_hash.
+    Caller commits.
+    """
+    key = content_hash(text)
+    conn.execute('''INSERT INTO documents (content_hash, body, raw_size) VALUES (?, ?, ?)
+                    ON CONFLICT (content_hash) DO NOTHING''',
+                 (key, encode(text), len((text or "").encode('utf-8'))))
+    return key
+
+
+def load(conn, key):
+    row = conn.execute('SELECT body FROM documents WHERE content_hash = ?', (key,)).fetchone()
+    return decode(row['body']) if row else None
+
+
+def candidate_text(conn, candidate):
+    """
+    Lazy accessor for a candidate's resume text: loaded only by the code paths that need it.
+    Falls back to the legacy inline full_text for rows that have not been migrated.
+    """
+    keys = candidate.keys()
+    if 'document_hash' in keys and candidate['document_hash']:
+        text = load(conn, candidate['document_hash'])
+        if text is not None:
+            return text
+    return candidate['full_text'] if 'full_text' in keys else None
+
+
+def candidate_texts(conn, candidates):
+    """
+    Batch version of candidate_text (one query per call), in input order.
+    """
+    keys = list({c['document_hash'] for c in candidates if c['document_hash']})
+    bodies = {}
+    if keys:
+        marks = ','.join('?' * len(keys))
+        for row in conn.execute(f'SELECT content_hash, body FROM documents WHERE content_hash IN ({marks})', keys).fetchall():
+            bodies[row['content_hash']] = row['body']
+    texts = []
+    for c in candidates:
+        body = bodies.get(c['document_hash']) if c['document_hash'] else None
+        texts.append(decode(body) if body is not None else (c['full_text'] if 'full_text' in c.keys() else None))
+    return texts
+
+
+_UNREFERENCED = '''NOT EXISTS (SELECT 1 FROM candidates c WHERE c.document_hash = documents.content_hash)
+                   AND NOT EXISTS (SELECT 1 FROM users u WHERE u.resume_document_hash = documents.content_hash)'''
+
+
+def release(conn, keys=None):
+    """
+    Delete documents that no candidate (or profile resume) refers to any more: the given
+    keys, after the rows that pointed at them were deleted or repointed, or with keys=None
+    every unreferenced document. Returns the number deleted. Caller commits.
+    """
+    if keys is None:
+        return conn.execute(f'DELETE FROM documents WHERE {_UNREFERENCED}').rowcount
+    keys = list({key for key in keys if key})
+    deleted = 0
+    for i in range(0, len(keys), MIGRATE_BATCH):
+        batch = keys[i:i + MIGRATE_BATCH]
+        marks = ','.join('?' * len(batch))
+        deleted += conn.execute(f'DELETE FROM documents WHERE content_hash IN ({marks}) AND {_UNREFERENCED}',
+                                batch).rowcount
+    return deleted
+
+
+def migrate_inline_text(conn):
+    """
+    Move legacy candidates.full_text values into documents, in place and in batches.
+    Returns the number of candidates migrated. Caller commits.
+    """
+    migrated = 0
+    while True:
+        rows = conn.execute('''SELECT id, full_text FROM candidates
+                               WHERE full_text IS NOT NULL AND document_hash IS NULL
+                               LIMIT ?''', (MIGRATE_BATCH,)).fetchall()
+        if not rows:
+            return migrated
+        for row in rows:
+            key = store(conn, row['full_text'])
+            conn.execute('UPDATE candidates SET document_hash = ?, full_text = NULL WHERE id = ?', (key, row['id']))
+        migrated += len(rows)
@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import database
+
+# Two-tier embedding cache keyed by (sha256 of text, model version).
+# Tier 1: bounded in-process LRU. Tier 2: the persistent `embeddings` table (float16 vectors).
+# A CV that was encoded once is never sent through the transformer again.
+
+MEMORY_ITEMS = int(os.getenv('EMBEDDING_CACHE_SIZE', 2048))
+MAX_ROWS = int(os.getenv('EMBEDDING_CACHE_MAX_ROWS', 100000))
+PRUNE_EVERY = 500 # check the table size after this many inserts
+SQL_CHUNK = 500 # keep IN (...) lists under SQLite's variable limit
+
+
+def to_blob(vector):
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def from_blob(blob):
+    return np.frombuffer(bytes(blob), dtype=np.float16).astype(np.float32)
+
+
+class EmbeddingCache:
+    def __init__(self, model_version, max_items=MEMORY_ITEMS, max_rows=MAX_ROWS, persistent=True):
+        self.model_version = model_version
+        self.max_items = max_items
+        self.max_rows = max_rows
+        self.persistent = persistent
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts_since_prune = 0
+        self.hits = {'memory': 0, 'db': 0}
+        self.misses = 0
+        self.evictions = 0
+
+    # --- Tier 1 ---
+
+    def _remember(self, key, vector):
+        # Caller holds the lock
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # --- Public API ---
+
+    def get_many(self, keys):
+        """
+        Look up text hashes. Returns {key: vector} for the ones found in either tier.
+        """
+        found = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.hits['memory'] += 1
+                else:
+                    pending.append(key)
+
+        if pending and self.persistent:
+            from_db = self._load(pending)
+            with self._lock:
+                for key, vector in from_db.items():
+                    self._remember(key, vector)
+                    found[key] = vector
+                self.hits['db'] += len(from_db)
+
+        with self._lock:
+            self.misses += len([k for k in pending if k not in found])
+        return found
+
+    def put_many(self, items):
+        """
+        Store {key: vector} in both tiers. Returns the vectors as they will be served
+        on later hits (float16 precision).
+        """
+        if not items:
+            return {}
+        items = {key: from_blob(to_blob(vector)) for key, vector in items.items()}
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+        if self.persistent:
+            self._store(items)
+        return items
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits['memory'] + self.hits['db'] + self.misses
+            return {
+                'memory_items': len(self._memory),
+                'memory_hits': self.hits['memory'],
+                'db_hits': self.hits['db'],
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((lookups - self.misses) / lookups, 3) if lookups else 0.0
+            }
+
+    # --- Tier 2 ---
+
+    def _load(self, keys):
+        found = {}
+        try:
+            with database.get_db_connection() as conn:
+                for i in range(0, len(keys), SQL_CHUNK):
+                    chunk = keys[i:i + SQL_CHUNK]
+                    marks = ', '.join('?' * len(chunk))
+                    rows = conn.execute(f'''SELECT text_hash, vector FROM embeddings
+                                            WHERE model = ? AND text_hash IN ({marks})''',
+                                        [self.model_version] + chunk).fetchall()
+                    for row in rows:
+                        found[row['text_hash']] = from_blob(row['vector'])
+                    if rows:
+                        # Touch for LRU eviction of the table
+                        conn.execute(f'''UPDATE embeddings SET last_used = CURRENT_TIMESTAMP
+                                         WHERE model = ? AND text_hash IN ({', '.join('?' * len(rows))})''',
+                                     [self.model_version] + [row['text_hash'] for row in rows])
+        except Exception as e:
+            # Cache is best-effort: a DB failure just means we encode again
+            print(f"Embedding cache read failed: {e}")
+        return found
+
+    def _store(self, items):
+        try:
+            with database.get_db_connection() as conn:
+                conn.executemany('''INSERT INTO embeddings (text_hash, model, vector, last_used)
+                                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                                    ON CONFLICT (text_hash, model) DO UPDATE SET last_used = CURRENT_TIMESTAMP''',
+                                 [(key, self.model_version, to_blob(vector)) for key, vector in items.items()])
+                self._inserts_since_prune += len(items)
+                if self._inserts_since_prune >= PRUNE_EVERY:
+                    self._inserts_since_prune = 0
+                    self._prune(conn)
+        except Exception as e:
+            print(f"Embedding cache write failed: {e}")
+
+    def _prune(self, conn):
+        """
+        Evict the least recently used rows once the table grows past max_rows.
+        """
+        total = conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+        excess = total - self.max_rows
+        if excess > 0:
+            conn.execute('''DELETE FROM embeddings WHERE (text_hash, model) IN (
+                                SELECT text_hash, model FROM embeddings ORDER BY last_used ASC LIMIT ?)''', (excess,))
+            with self._lock:
+                self.evictions += excess
@@ -0,0 +1,271 @@
+"""
+Shared embedding server: one process owns the transformer and every gunicorn worker
+encodes through it over a Unix socket, so web workers can scale without each loading
+its own copy of the model.
+
+    python embedding_server.py                      # listens on EMBEDDING_SOCKET
+    EMBEDDING_SOCKET=/tmp/nexgen-embed.sock gunicorn app:app --workers 4 --threads 8
+
+Requests arriving within EMBEDDING_COALESCE_MS of each other are encoded in one batch
+(up to EMBEDDING_MAX_BATCH texts), which is where a transformer gets its throughput.
+Clients (ScoringEngine with EMBEDDING_SOCKET set) fall back to loading the model
+in-process if the server is unreachable, and switch back once it answers again.
+
+Wire format (multiprocessing.connection messages, no pickle): a JSON request
+{"op": "encode", "texts": [...], "normalize": true} or {"op": "info"}; the reply is a
+JSON header, followed for "encode" by one message of float32 row-major vectors.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import numpy as np
+from multiprocessing.connection import Listener, Client
+
+SOCKET_PATH = os.getenv('EMBEDDING_SOCKET', '/tmp/nexgen-embed.sock')
+COALESCE_MS = float(os.getenv('EMBEDDING_COALESCE_MS', 5))
+MAX_BATCH = int(os.getenv('EMBEDDING_MAX_BATCH', 128))
+# How long a client waits for the server to come up (it may still be loading the model)
+CONNECT_TIMEOUT = float(os.getenv('EMBEDDING_CONNECT_TIMEOUT', 120))
+# Seconds between reconnect attempts while a client runs on its in-process fallback
+RETRY_SECONDS = 30.0
+
+
+def _send(conn, header, vectors=None):
+    conn.send_bytes(json.dumps(header).encode('utf-8'))
+    if vectors is not None:
+        conn.send_bytes(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+
+def _recv(conn):
+    return json.loads(conn.recv_bytes().decode('utf-8'))
+
+
+class _Job:
+    __slots__ = ('texts', 'normalize', 'result', 'error', 'done')
+
+    def __init__(self, texts, normalize):
+        self.texts = texts
+        self.normalize = normalize
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingServer:
+    def __init__(self, engine, path=SOCKET_PATH, coalesce_ms=COALESCE_MS, max_batch=MAX_BATCH):
+        self.engine = engine
+        self.path = path
+        self.coalesce = coalesce_ms / 1000.0
+        self.max_batch = max_batch
+        self.jobs = queue.Queue()
+        self.listener = None
+        self.stats = {'requests': 0, 'texts': 0, 'batches': 0}
+
+    def bind(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path) # stale socket from a previous run
+        self.listener = Listener(self.path, family='AF_UNIX', backlog=64)
+        os.chmod(self.path, 0o660)
+
+    def serve_forever(self):
+        if self.listener is None:
+            self.bind()
+        threading.Thread(target=self._batch_loop, name="embed-batcher", daemon=True).start()
+        print(f"Embedding server listening on {self.path}")
+        listener = self.listener
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, AttributeError): # AttributeError: accept() on a closed Listener
+                if self.listener is None:
+                    return # closed
+                raise
+            threading.Thread(target=self._handle, args=(conn,), name="embed-conn", daemon=True).start()
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+
+    def info(self):
+        engine = self.engine
+        return {
+            'model_version': engine.model_version,
+            'model': engine.target_model,
+            'backend': engine.backend,
+            'device': engine.device,
+            'stats': dict(self.stats),
+        }
+
+    def _handle(self, conn):
+        # One thread per client connection; each client thread keeps its own connection
+        try:
+            while True:
+                request = _recv(conn)
+                if request.get('op') == 'info':
+                    _send(conn, self.info())
+                    continue
+                if request.get('op') != 'encode':
+                    _send(conn, {'error': f"unknown op {request.get('op')!r}"})
+                    continue
+                job = _Job(request.get('texts') or [], bool(request.get('normalize', True)))
+                self.jobs.put(job)
+                job.done.wait()
+                if job.error is not None:
+                    _send(conn, {'error': job.error})
+                else:
+                    _send(conn, {'shape': list(job.result.shape)}, job.result)
+        except (EOFError, OSError):
+            pass # client went away
+        finally:
+            conn.close()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self.jobs.get()]
+            size = len(batch[0].texts)
+            # Coalesce: collect whatever else arrives within the window
+            deadline = time.monotonic() + self.coalesce
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.jobs.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(job)
+                size += len(job.texts)
+            for normalize in {job.normalize for job in batch}:
+                self._encode([job for job in batch if job.normalize == normalize], normalize)
+
+    def _encode(self, jobs, normalize):
+        texts = [text for job in jobs for text in job.texts]
+        try:
+            if texts:
+                vectors = self.engine.model.encode(texts, batch_size=min(len(texts), self.max_batch),
+                                                   convert_to_numpy=True, normalize_embeddings=normalize,
+                                                   show_progress_bar=False)
+                vectors = np.asarray(vectors, dtype=np.float32)
+            else:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+        except Exception as e:
+            print(f"Embedding batch of {len(texts)} failed: {e}")
+            for job in jobs:
+                job.error = str(e)
+                job.done.set()
+            return
+        self.stats['requests'] += len(jobs)
+        self.stats['texts'] += len(texts)
+        self.stats['batches'] += 1
+        start = 0
+        for job in jobs:
+            job.result = vectors[start:start + len(job.texts)]
+            start += len(job.texts)
+            job.done.set()
+
+
+class RemoteModel:
+    """
+    Stand-in for the SentenceTransformer in client mode: encode() goes to the server.
+    If the server can't be reached, load_local() is called (once) and used instead.
+    """
+    def __init__(self, path, load_local):
+        self.path = path
+        self.load_local = load_local
+        self.local_model = None
+        self.degraded_since = None
+        self._conns = threading.local()
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._conns, 'conn', None)
+        if conn is None:
+            conn = Client(self.path, family='AF_UNIX')
+            self._conns.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._conns, 'conn', None)
+        self._conns.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, request, timeout=None):
+        conn = self._conn()
+        _send(conn, request)
+        if timeout is not None and not conn.poll(timeout):
+            raise TimeoutError("no reply from the embedding server")
+        header = _recv(conn)
+        if 'error' in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        if 'shape' in header:
+            return np.frombuffer(conn.recv_bytes(), dtype=np.float32).reshape(header['shape'])
+        return header
+
+    def info(self, wait=0):
+        """
+        The server's info, retrying for up to `wait` seconds; None if it never answers.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                # A bound server that is still loading the model answers once it is ready
+                return self._call({'op': 'info'}, timeout=max(deadline - time.monotonic(), 1))
+            except (OSError, EOFError):
+                self._drop()
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(1)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=False, **kwargs):
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        if self.degraded_since is None or time.monotonic() - self.degraded_since >= RETRY_SECONDS:
+            try:
+                vectors = self._call({'op': 'encode', 'texts': texts, 'normalize': bool(normalize_embeddings)})
+                if self.degraded_since is not None:
+                    self.degraded_since = None
+                    print(f"Embedding server at {self.path} is back; encoding remotely again.")
+                return vectors[0] if isinstance(sentences, str) else vectors
+            except (OSError, EOFError) as e:
+                self._drop()
+                if self.degraded_since is None:
+                    print(f"Embedding server at {self.path} unreachable ({e}); encoding in-process.")
+                self.degraded_since = time.monotonic()
+        return self._local().encode(sentences, batch_size=batch_size, convert_to_numpy=convert_to_numpy,
+                                    normalize_embeddings=normalize_embeddings,
+                                    show_progress_bar=show_progress_bar, **kwargs)
+
+    def _local(self):
+        with self._lock:
+            if self.local_model is None:
+                self.local_model = self.load_local()
+            return self.local_model
+
+
+def main():
+    import scoring_engine
+    server = EmbeddingServer(None, SOCKET_PATH)
+    # Bind before loading, so clients starting alongside wait for us instead of falling back
+    server.bind()
+    try:
+        print(f"Loading the scoring model for {SOCKET_PATH}...")
+        server.engine = scoring_engine.ScoringEngine(local=True)
+        server.engine.encode_query("warm-up")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close() # also removes the socket file
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
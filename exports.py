@@ -0,0 +1,133 @@
+import io
+import csv
+import json
+import database
+import keyword_search
+
+# Candidate Exports (CSV / NDJSON)
+# Rows are read BATCH_SIZE at a time (Connection.stream) and each batch is written out as
+# soon as it is read, so an export starts downloading at once and memory stays flat no
+# matter how many candidates it covers. The pooled connection is held until the download
+# finishes or the client goes away.
+
+BATCH_SIZE = 1000
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# (CSV header, NDJSON key, column) in output order
+# The job CSV keeps the columns of the original export, byte for byte; new fields go to NDJSON only
+JOB_FIELDS = [
+    ('Candidate Filename', 'filename', 'filename'),
+    ('Total Score', 'total_score', 'total_score'),
+    ('Semantic Score', 'semantic_score', 'semantic_score'),
+    ('Skills Score', 'skills_score', 'skills_score'),
+    ('Experience Score', 'experience_score', 'experience_score'),
+    ('Missing Skills', 'missing_skills', 'missing_skills'),
+]
+JOB_NDJSON_FIELDS = JOB_FIELDS + [('Status', 'status', 'status')]
+POOL_FIELDS = [
+    ('Candidate ID', 'id', 'id'),
+    ('Job', 'job', 'job_title'),
+    ('Candidate Filename', 'filename', 'filename'),
+    ('Name', 'name', 'name'),
+    ('Email', 'email', 'email'),
+    ('Total Score', 'total_score', 'total_score'),
+    ('Skills Score', 'skills_score', 'skills_score'),
+    ('Status', 'status', 'status'),
+    ('Date Added', 'created_at', 'created_at'),
+]
+SCORE_COLUMNS = {'total_score', 'semantic_score', 'skills_score', 'experience_score'}
+
+
+def job_query(job_id):
+    """
+    A job's applicants, best first (served by idx_candidates_job_score).
+    """
+    return ('''SELECT c.filename, c.total_score, c.semantic_score, c.skills_score, c.experience_score,
+                      c.status, c.missing_skills
+               FROM candidates c WHERE c.job_id = ?
+               ORDER BY c.total_score DESC, c.id DESC''', [job_id])
+
+
+def pool_query(q=None, job_id=None, status=None, min_score=None, since=None):
+    """
+    Candidates across all jobs, newest first, narrowed by any of: keyword query, job,
+    status, minimum total score, added on/after a date (YYYY-MM-DD).
+    """
+    where, params = [], []
+    keyword = keyword_search.filter_clause(q) if q else None
+    if keyword:
+        where.append(keyword[0])
+        params += keyword[1]
+    if job_id:
+        where.append('c.job_id = ?')
+        params.append(job_id)
+    if status:
+        # NULL reads as 'Applied'
+        where.append("COALESCE(c.status, 'Applied') = ?")
+        params.append(status)
+    if min_score is not None:
+        where.append('c.total_score >= ?')
+        params.append(min_score)
+    if since:
+        where.append('c.created_at >= ?')
+        params.append(since)
+    return (f'''SELECT c.id, j.title AS job_title, c.filename, c.name, c.email, c.total_score,
+                       c.skills_score, c.status, c.created_at
+                FROM candidates c LEFT JOIN jobs j ON j.id = c.job_id
+                WHERE {' AND '.join(where) or '1 = 1'}
+                ORDER BY c.created_at DESC, c.id DESC''', params)
+
+
+def _value(column, value):
+    if column == 'status':
+        return value or 'Applied'
+    if column == 'missing_skills' and value:
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    if column == 'created_at' and value is not None:
+        return str(value)
+    return value
+
+
+def _csv_cell(column, value):
+    if column == 'missing_skills':
+        return value # the stored JSON, as the original export wrote it
+    value = _value(column, value)
+    if value is None:
+        return ''
+    if column in SCORE_COLUMNS:
+        return f"{value:.2f}"
+    return value
+
+
+def stream(query, fields, fmt='csv', ranked=False):
+    """
+    Generator of export chunks (one per batch of rows) for a (sql, params) query.
+    ranked adds a leading 1-based Rank column.
+    """
+    sql, params = query
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow((['Rank'] if ranked else []) + [header for header, _, _ in fields])
+        yield buffer.getvalue() # the download starts before the query runs
+        buffer.seek(0)
+        buffer.truncate()
+    conn = database.get_db_connection()
+    try:
+        for rank, row in enumerate(conn.stream(sql, params, BATCH_SIZE), 1):
+            if fmt == 'csv':
+                writer.writerow(([rank] if ranked else []) + [_csv_cell(column, row[column]) for _, _, column in fields])
+            else:
+                record = {'rank': rank} if ranked else {}
+                record.update((key, _value(column, row[column])) for _, key, column in fields)
+                buffer.write(json.dumps(record) + '\n')
+            if rank % BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        conn.close()
@@ -0,0 +1,9 @@
+# Gunicorn settings (read automatically from the working directory)
+
+def post_worker_init(worker):
+    # Each worker loads the app itself; start its model warmup and ingestion workers
+    # there, after the fork (threads don't survive fork, e.g. with --preload).
+    # Safe with several workers: queue items are leased, so starting a worker only requeues
+    # items whose lease expired (their process died), not those other workers are processing
+    from app import start_background
+    start_background()
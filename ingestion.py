@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import threading
+from cv_parser import extract_texts
+import database
+import job_profiles
+import analysis_store
+import upload_store
+import vector_index
+import documents
+import rollups
+import job_weights
+import scoring_engine
+
+# Asynchronous CV Ingestion
+# Upload requests only read files and enqueue their bytes (ingest_batches / ingest_items tables).
+# A local pool of worker threads claims queued items, extracts text in memory, scores them in
+# batches and inserts candidates; the originals go to the upload store in the background.
+# No external broker: the database is the queue.
+
+WORKERS = int(os.getenv('INGEST_WORKERS', 2))
+CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 16)) # items scored per encode batch
+POLL_SECONDS = 2.0 # also picks up items enqueued by other processes
+ENGINE_RETRY_SECONDS = 30.0 # after the model failed to load
+# A claimed item is leased to its worker; the lease is renewed between stages of a chunk, so only
+# items whose worker died (crash, restart, killed process) outlive it and go back on the queue.
+# Must exceed the longest stage (extraction: up to CHUNK_SIZE * EXTRACT_TIMEOUT on one core).
+LEASE_SECONDS = int(os.getenv('INGEST_LEASE_SECONDS', 1800))
+
+_wakeup = threading.Event()
+_workers = []
+_start_lock = threading.Lock()
+
+
+def enqueue(conn, job_id, user_id, files):
+    """
+    Record a batch of uploads. `files` is a list of (filename, file_key, path, data): the
+    file's bytes are queued with it (path is where the original is persisted).
+    Caller commits. Returns the batch id.
+    """
+    cur = conn.execute('INSERT INTO ingest_batches (job_id, user_id, total) VALUES (?, ?, ?)',
+                       (job_id, user_id, len(files)))
+    batch_id = cur.lastrowid
+    conn.executemany('''INSERT INTO ingest_items (batch_id, job_id, filename, file_key, path, payload, status)
+                        VALUES (?, ?, ?, ?, ?, ?, 'queued')''',
+                     [(batch_id, job_id, filename, file_key, path, data) for filename, file_key, path, data in files])
+    return batch_id
+
+
+def notify():
+    """
+    Wake idle workers after a batch has been committed.
+    """
+    _wakeup.set()
+
+
+def batch_status(conn, batch_id):
+    """
+    Progress report for a batch: counts per status, per-file state and throughput.
+    Returns None if the batch does not exist.
+    """
+    batch = conn.execute('SELECT * FROM ingest_batches WHERE id = ?', (batch_id,)).fetchone()
+    if not batch:
+        return None
+
+    items = conn.execute('''SELECT id, filename, status, error, candidate_id, started_ts, finished_ts
+                            FROM ingest_items WHERE batch_id = ? ORDER BY id''', (batch_id,)).fetchall()
+    counts = {'queued': 0, 'processing': 0, 'done': 0, 'failed': 0}
+    for item in items:
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+
+    started = [i['started_ts'] for i in items if i['started_ts']]
+    finished = [i['finished_ts'] for i in items if i['finished_ts']]
+    elapsed = (max(finished) - min(started)) if started and finished else 0
+    completed = counts['done'] + counts['failed']
+
+    return {
+        'batch_id': batch['id'],
+        'job_id': batch['job_id'],
+        'user_id': batch['user_id'],
+        'total': batch['total'],
+        'counts': counts,
+        'finished': completed >= batch['total'],
+        'elapsed_seconds': round(elapsed, 2),
+        'files_per_second': round(completed / elapsed, 2) if elapsed > 0 else None,
+        'files': [{
+            'filename': i['filename'],
+            'status': i['status'],
+            'error': i['error'],
+            'candidate_id': i['candidate_id']
+        } for i in items]
+    }
+
+
+def active_batches(conn, job_id):
+    """
+    Ids of batches for a job that still have unfinished items.
+    """
+    rows = conn.execute('''SELECT DISTINCT batch_id FROM ingest_items
+                           WHERE job_id = ? AND status IN ('queued', 'processing')
+                           ORDER BY batch_id''', (job_id,)).fetchall()
+    return [row['batch_id'] for row in rows]
+
+
+# --- Workers ---
+
+def start_workers(count=WORKERS):
+    """
+    Start the background worker threads (once per process).
+    They claim work once the scoring engine has loaded; until then uploads just queue.
+    """
+    with _start_lock:
+        if _workers:
+            return
+        for n in range(count):
+            t = threading.Thread(target=_worker_loop, name=f"ingest-worker-{n}", daemon=True)
+            t.start()
+            _workers.append(t)
+        print(f"Started {count} ingestion workers.")
+
+
+def _requeue_expired(conn):
+    # Items whose worker stopped renewing the lease (crash/restart) go back on the queue.
+    # Items held by live workers, in this or any other process, are left alone.
+    conn.execute('''UPDATE ingest_items SET status = 'queued', started_ts = NULL, lease_ts = NULL
+                    WHERE status = 'processing' AND (lease_ts IS NULL OR lease_ts < ?)''',
+                 (time.time() - LEASE_SECONDS,))
+
+
+def _renew(items):
+    """
+    Extend the lease on claimed items. Returns the ids still held: an item whose lease expired
+    may have been requeued and claimed again (its started_ts is the claim stamp).
+    """
+    held = set()
+    now = time.time()
+    with database.get_db_connection() as conn:
+        for item in items:
+            cur = conn.execute('''UPDATE ingest_items SET lease_ts = ?
+                                  WHERE id = ? AND status = 'processing' AND started_ts = ?''',
+                               (now, item['id'], item['started_ts']))
+            if cur.rowcount == 1:
+                held.add(item['id'])
+    return held
+
+
+def _worker_loop():
+    while True:
+        try:
+            engine = scoring_engine.get_engine(timeout=None)
+            break
+        except scoring_engine.EngineNotReady as e:
+            print(f"Ingestion worker waiting for the scoring engine: {e}")
+            time.sleep(ENGINE_RETRY_SECONDS)
+    while True:
+        try:
+            items = _claim(CHUNK_SIZE)
+        except Exception as e:
+            print(f"Ingestion worker could not claim work: {e}")
+            items = []
+        if not items:
+            _wakeup.wait(POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        try:
+            _process(engine, items)
+        except Exception as e:
+            print(f"Ingestion chunk failed: {e}")
+            _fail(items, str(e))
+
+
+def _claim(limit):
+    """
+    Claim up to `limit` queued items from the oldest job with work.
+    The conditional UPDATE makes the claim safe across threads and processes.
+    """
+    with database.get_db_connection() as conn:
+        _requeue_expired(conn)
+        head = conn.execute("SELECT job_id FROM ingest_items WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+        if not head:
+            return []
+        rows = conn.execute('''SELECT * FROM ingest_items WHERE status = 'queued' AND job_id = ?
+                               ORDER BY id LIMIT ?''', (head['job_id'], limit)).fetchall()
+        claimed = []
+        now = time.time()
+        for row in rows:
+            cur = conn.execute('''UPDATE ingest_items SET status = 'processing', started_ts = ?, lease_ts = ?
+                                  WHERE id = ? AND status = 'queued\'''', (now, now, row['id']))
+            if cur.rowcount == 1:
+                claimed.append(dict(row, started_ts=now))
+        return claimed
+
+
+def _process(engine, items):
+    job_id = items[0]['job_id']
+    conn = database.get_db_connection()
+    try:
+        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if not job:
+            raise ValueError("Job not found")
+        profile = job_profiles.get_job_profile(conn, job, engine)
+        batch_users = {}
+        inserted = []
+
+        # 1. Parallel extraction from the queued bytes (items queued without them: cached
+        # text, or extraction from the stored file); a bad file only fails itself
+        parsed = []
+        failures = []
+        queued = [item for item in items if item['payload'] is not None]
+        legacy = [item for item in items if item['payload'] is None]
+        payloads = [bytes(item['payload']) for item in queued]
+        results = extract_texts(payloads) + upload_store.get_texts([item['path'] for item in legacy])
+        for item, data, result in zip(queued, payloads, results):
+            upload_store.persist(item['path'], data, result['text'])
+        for item, result in zip(queued + legacy, results):
+            if result['error'] is None:
+                parsed.append((item, result['text']))
+            else:
+                print(f"Error processing {item['filename']}: {result['error']}")
+                failures.append((item, result['error']))
+        _renew(items)
+
+        # 2. One batched encode for the chunk
+        # (done before any write on this connection, so the embedding cache can write freely)
+        scores = engine.score_cvs([cv_text for _, cv_text in parsed], job['description'],
+                                  job_weights.get_weights(job), job_profile=profile)
+        held = _renew(items)
+
+        # 3. Analyze & insert (skipping items another worker took over after our lease expired)
+        for item, error in failures:
+            if item['id'] in held:
+                _mark(conn, item['id'], 'failed', error=error)
+        for (item, cv_text), score_data in zip(parsed, scores):
+            if item['id'] not in held:
+                print(f"Lease on {item['filename']} expired; left to the worker that reclaimed it")
+                continue
+            try:
+                if item['batch_id'] not in batch_users:
+                    batch = conn.execute('SELECT user_id FROM ingest_batches WHERE id = ?', (item['batch_id'],)).fetchone()
+                    batch_users[item['batch_id']] = batch['user_id'] if batch else None
+
+                analysis = engine.analyze_candidate(cv_text, job['description'], job_profile=profile)
+                cur = conn.execute('''INSERT INTO candidates
+                                      (job_id, filename, file_key, semantic_score, skills_score, experience_score, total_score, document_hash, missing_skills, interview_questions, user_id,
+                                       analysis, analysis_version, analysis_jd_hash)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                                   (job_id, item['filename'], item['file_key'],
+                                    score_data['breakdown']['semantic_match'],
+                                    score_data['breakdown']['skills_match'],
+                                    score_data['breakdown']['experience_match'],
+                                    score_data['total_score'],
+                                    documents.store(conn, cv_text),
+                                    json.dumps(analysis['missing']),
+                                    json.dumps(analysis['questions']),
+                                    batch_users[item['batch_id']]
+                                   ) + analysis_store.columns(analysis, engine, profile['jd_hash']))
+                _mark(conn, item['id'], 'done', candidate_id=cur.lastrowid)
+                inserted.append((cur.lastrowid, cv_text))
+            except Exception as e:
+                print(f"Error processing {item['filename']}: {e}")
+                _mark(conn, item['id'], 'failed', error=str(e))
+
+        conn.commit()
+    finally:
+        conn.close()
+    if inserted:
+        rollups.invalidate()
+    vector_index.add_candidates(engine, inserted)
+
+
+def _mark(conn, item_id, status, error=None, candidate_id=None):
+    # The queued bytes are dropped once an item is finished
+    conn.execute('''UPDATE ingest_items SET status = ?, error = ?, candidate_id = ?, finished_ts = ?, payload = NULL
+                    WHERE id = ?''',
+                 (status, error, candidate_id, time.time(), item_id))
+
+
+def _fail(items, error):
+    with database.get_db_connection() as conn:
+        for item in items:
+            _mark(conn, item['id'], 'failed', error=error)
@@ -0,0 +1,76 @@
+import json
+import threading
+import numpy as np
+import database
+import scoring_engine
+
+# Job Profiles: the JD embedding and JD skill set are computed once per job
+# and stored on the jobs row, instead of being recomputed for every CV.
+
+
+def _is_fresh(job, engine):
+    """
+    A stored profile is usable only if it was built from the current description
+    with the current model and skill taxonomy.
+    """
+    if job['jd_embedding'] is None or job['jd_skills'] is None:
+        return False
+    if job['jd_model_version'] != engine.model_version:
+        return False
+    if job['jd_skills_version'] != scoring_engine.analysis_version():
+        return False
+    return job['jd_hash'] == engine.hash_text(job['description'])
+
+
+def save_job_profile(conn, job_id, profile):
+    conn.execute('''UPDATE jobs
+                    SET jd_embedding = ?, jd_skills = ?, jd_hash = ?, jd_model_version = ?, jd_skills_version = ?
+                    WHERE id = ?''',
+                 (profile['embedding'].astype(np.float32).tobytes(),
+                  json.dumps(profile['skills']),
+                  profile['jd_hash'],
+                  profile['model_version'],
+                  profile['skills_version'],
+                  job_id))
+
+
+def get_job_profile(conn, job, engine):
+    """
+    Load the stored profile for a job row, rebuilding it if it is missing or stale
+    (description edited, model or skill taxonomy changed).
+    """
+    if _is_fresh(job, engine):
+        return {
+            'embedding': np.frombuffer(bytes(job['jd_embedding']), dtype=np.float32),
+            'skills': json.loads(job['jd_skills']),
+            'jd_hash': job['jd_hash'],
+            'model_version': job['jd_model_version'],
+            'skills_version': job['jd_skills_version']
+        }
+
+    print(f"Rebuilding job profile for job {job['id']}...")
+    profile = engine.build_job_profile(job['description'])
+    save_job_profile(conn, job['id'], profile)
+    conn.commit()
+    return profile
+
+
+def build_in_background(job_id):
+    """
+    Build a new job's profile off the request thread, once the scoring engine is ready.
+    If a scoring request gets there first, get_job_profile builds it instead.
+    Returns the thread.
+    """
+    def run():
+        try:
+            engine = scoring_engine.get_engine(timeout=None)
+            with database.get_db_connection() as conn:
+                job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                if job:
+                    get_job_profile(conn, job, engine)
+        except Exception as e:
+            print(f"Job profile build for job {job_id} failed: {e}")
+
+    thread = threading.Thread(target=run, name=f"job-profile-{job_id}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,61 @@
+import time
+
+# Per-job Scoring Weights
+# A job's total_score is a weighted sum of the component scores stored on each candidate
+# (semantic_score, skills_score, experience_score). The weights live on the jobs row
+# (NULL = DEFAULT_WEIGHTS), so changing them re-ranks every applicant with one set-based
+# UPDATE; no CV is re-parsed or re-encoded.
+
+DEFAULT_WEIGHTS = {'overall_similarity': 0.5, 'skills': 0.3, 'experience': 0.2}
+
+# ScoringEngine weight key -> (jobs column, candidates component column, form label)
+FIELDS = [
+    ('overall_similarity', 'weight_semantic', 'semantic_score', 'Semantic match'),
+    ('skills', 'weight_skills', 'skills_score', 'Skills'),
+    ('experience', 'weight_experience', 'experience_score', 'Experience'),
+]
+
+
+def get_weights(job):
+    """
+    The scoring weights of a jobs row (DEFAULT_WEIGHTS if never set).
+    """
+    if any(job[column] is None for _, column, _, _ in FIELDS):
+        return dict(DEFAULT_WEIGHTS)
+    return {key: job[column] for key, column, _, _ in FIELDS}
+
+
+def parse_form(form):
+    """
+    Weights from percentages in a form (weight_semantic, ...), normalized to sum to 1.
+    Raises ValueError for missing, negative or all-zero values.
+    """
+    values = {}
+    for key, column, _, label in FIELDS:
+        try:
+            values[key] = float(form.get(column, ''))
+        except ValueError:
+            raise ValueError(f"{label} weight must be a number.")
+        if not 0 <= values[key] <= 100:
+            raise ValueError(f"{label} weight must be between 0 and 100.")
+    total = sum(values.values())
+    if total <= 0:
+        raise ValueError("At least one weight must be above zero.")
+    return {key: value / total for key, value in values.items()}
+
+
+def rescore(conn, job_id, weights):
+    """
+    Store new weights for a job and recompute total_score for all of its applicants in a
+    single UPDATE. Returns the number of candidates rescored; the caller commits.
+    """
+    start = time.perf_counter()
+    conn.execute('UPDATE jobs SET ' + ', '.join(f'{column} = ?' for _, column, _, _ in FIELDS) + ' WHERE id = ?',
+                 [weights[key] for key, _, _, _ in FIELDS] + [job_id])
+    # Components are stored as 0-100 percentages, so the weighted sum is the new total
+    total = ' + '.join(f'COALESCE({component}, 0) * ?' for _, _, component, _ in FIELDS)
+    cur = conn.execute(f'''UPDATE candidates SET total_score = ROUND(CAST({total} AS NUMERIC), 2)
+                           WHERE job_id = ? AND semantic_score IS NOT NULL''',
+                       [weights[key] for key, _, _, _ in FIELDS] + [job_id])
+    print(f"Rescored {cur.rowcount} candidates for job {job_id} in {time.perf_counter() - start:.3f}s")
+    return cur.rowcount
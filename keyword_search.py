@@ -0,0 +1,141 @@
+import os
+import re
+import sqlite3
+from markupsafe import Markup, escape
+
+# Keyword Search (talent pool)
+# Uses the inverted index created by database.init_db: the candidates_fts FTS5 table on
+# SQLite (BM25 ranking) or the search_vector tsvector/GIN column on Postgres (ts_rank_cd).
+# Query syntax: plain words (all must match), "quoted phrases" and prefix* terms.
+
+SNIPPET_TOKENS = 16
+# Highlight markers that can't occur in resume text; swapped for <mark> after escaping
+HL_START, HL_END = '\x02', '\x03'
+
+# Columns the results table needs (never the resume body)
+COLUMNS = 'c.id, c.job_id, c.name, c.filename, c.total_score, c.skills_score, c.created_at'
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r'\w+')
+
+
+def parse_query(query):
+    """
+    Split a query into terms: ('phrase', [words]), ('prefix', word) or ('word', word).
+    Operator characters are dropped, so user input can never break the index syntax.
+    """
+    terms = []
+    for phrase, token in _TERM_RE.findall(query or ''):
+        if phrase:
+            words = _WORD_RE.findall(phrase.lower())
+            if len(words) > 1:
+                terms.append(('phrase', words))
+            elif words:
+                terms.append(('word', words[0]))
+            continue
+        prefix = token.endswith('*')
+        words = _WORD_RE.findall(token.lower())
+        for i, word in enumerate(words):
+            terms.append(('prefix' if prefix and i == len(words) - 1 else 'word', word))
+    return terms
+
+
+def to_fts5(terms):
+    parts = []
+    for kind, value in terms:
+        if kind == 'phrase':
+            parts.append('"' + ' '.join(value) + '"')
+        elif kind == 'prefix':
+            parts.append(f'"{value}"*')
+        else:
+            parts.append(f'"{value}"')
+    return ' '.join(parts) # implicit AND
+
+
+def to_tsquery(terms):
+    parts = []
+    for kind, value in terms:
+        if kind == 'phrase':
+            parts.append('(' + ' <-> '.join(value) + ')')
+        elif kind == 'prefix':
+            parts.append(f'{value}:*')
+        else:
+            parts.append(value)
+    return ' & '.join(parts)
+
+
+def highlight(snippet):
+    """
+    Escape a raw snippet and turn the highlight markers into <mark> tags.
+    """
+    if not snippet:
+        return Markup('')
+    safe = str(escape(snippet))
+    return Markup(safe.replace(HL_START, '<mark>').replace(HL_END, '</mark>'))
+
+
+def search(conn, query, limit=20, offset=0):
+    """
+    Ranked keyword search over candidates.
+    Returns (total_matches, rows); each row has COLUMNS plus 'score' and a highlighted 'snippet'.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return 0, []
+
+    if os.getenv('DATABASE_URL'):
+        tsquery = to_tsquery(terms)
+        total = conn.execute('SELECT COUNT(*) AS n FROM candidates WHERE search_vector @@ to_tsquery(\'english\', ?)',
+                             (tsquery,)).fetchone()['n']
+        rows = conn.execute(f'''SELECT {COLUMNS}, ts_rank_cd(c.search_vector, q) AS score,
+                                       ts_headline('english', coalesce(
+                                                       (SELECT convert_from(substring(d.body from 2), 'UTF8') FROM documents d
+                                                        WHERE d.content_hash = c.document_hash), c.full_text, ''), q,
+                                                   'StartSel={HL_START}, StopSel={HL_END}, MaxWords=25, MinWords=10') AS snippet
+                                FROM candidates c, to_tsquery('english', ?) q
+                                WHERE c.search_vector @@ q
+                                ORDER BY score DESC, c.id DESC LIMIT ? OFFSET ?''',
+                             (tsquery, limit, offset)).fetchall()
+    else:
+        match = to_fts5(terms)
+        try:
+            total = conn.execute('SELECT COUNT(*) AS n FROM candidates_fts WHERE candidates_fts MATCH ?',
+                                 (match,)).fetchone()['n']
+            # bm25() is lower-is-better; name/filename hits weigh more than body hits
+            rows = conn.execute(f'''SELECT {COLUMNS}, -bm25(candidates_fts, 5.0, 5.0, 1.0) AS score,
+                                           snippet(candidates_fts, 2, '{HL_START}', '{HL_END}', '…', {SNIPPET_TOKENS}) AS snippet
+                                    FROM candidates_fts JOIN candidates c ON c.id = candidates_fts.rowid
+                                    WHERE candidates_fts MATCH ?
+                                    ORDER BY bm25(candidates_fts, 5.0, 5.0, 1.0), c.id DESC LIMIT ? OFFSET ?''',
+                                 (match, limit, offset)).fetchall()
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: fall back to a scan
+            print(f"FTS search unavailable, scanning: {e}")
+            return _scan(conn, terms, limit, offset)
+
+    return total, [dict(row, snippet=highlight(row['snippet'])) for row in rows]
+
+
+def filter_clause(query):
+    """
+    (sql, params) restricting candidates aliased c to keyword matches, for use in a WHERE
+    clause (exports); None if the query has no terms.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return None
+    if os.getenv('DATABASE_URL'):
+        return "c.search_vector @@ to_tsquery('english', ?)", [to_tsquery(terms)]
+    return 'c.id IN (SELECT rowid FROM candidates_fts WHERE candidates_fts MATCH ?)', [to_fts5(terms)]
+
+
+def _scan(conn, terms, limit, offset):
+    # candidates_fts_source (database.py) resolves each candidate's resume text
+    words = [' '.join(v) if kind == 'phrase' else v for kind, v in terms]
+    where = ' AND '.join(['(c.filename LIKE ? OR s.full_text LIKE ?)'] * len(words))
+    params = [p for w in words for p in (f'%{w}%', f'%{w}%')]
+    source = 'candidates c JOIN candidates_fts_source s ON s.id = c.id'
+    total = conn.execute(f'SELECT COUNT(*) AS n FROM {source} WHERE {where}', params).fetchone()['n']
+    rows = conn.execute(f'''SELECT {COLUMNS}, NULL AS score, NULL AS snippet FROM {source} WHERE {where}
+                            ORDER BY c.created_at DESC LIMIT ? OFFSET ?''', params + [limit, offset]).fetchall()
+    return total, [dict(row, snippet=highlight(None)) for row in rows]
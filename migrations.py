@@ -0,0 +1,181 @@
+# Schema Migrations
+# Ordered, numbered schema changes on top of the CREATE TABLE statements in database.init_db.
+# Applied versions are recorded in schema_migrations, so each one runs once per database;
+# every step is also idempotent, so databases that already picked up a change by hand (or
+# from the old ad-hoc column list) are simply marked as migrated.
+# To change the schema, append a migration with the next version number. Never edit or
+# renumber one that has shipped.
+
+
+def _add_columns(columns):
+    """
+    Step adding {table: [(name, sqlite_type, pg_type)]} columns that are not present yet.
+    """
+    def step(c, postgres):
+        for table, specs in columns.items():
+            if postgres:
+                for name, _, pg_type in specs:
+                    c.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {pg_type}')
+            else:
+                c.execute(f'PRAGMA table_info({table})')
+                existing = {row[1] for row in c.fetchall()}
+                for name, sqlite_type, _ in specs:
+                    if name not in existing:
+                        c.execute(f'ALTER TABLE {table} ADD COLUMN {name} {sqlite_type}')
+    return step
+
+
+def _create_table(name, columns):
+    """
+    Step creating a table from [(name, sqlite_type, pg_type)] columns.
+    """
+    def step(c, postgres):
+        body = ', '.join(f'{column} {pg_type if postgres else sqlite_type}' for column, sqlite_type, pg_type in columns)
+        c.execute(f'CREATE TABLE IF NOT EXISTS {name} ({body})')
+    return step
+
+
+def _create_indexes(indexes):
+    """
+    Step creating (name, table, columns) indexes.
+    """
+    def step(c, postgres):
+        for name, table, columns in indexes:
+            c.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    return step
+
+
+# (version, description, step(c, postgres))
+MIGRATIONS = [
+    (1, 'columns added after the original tables', _add_columns({
+        'jobs': [
+            # Precomputed job profile (see job_profiles.py)
+            ('jd_embedding', 'BLOB', 'BYTEA'),
+            ('jd_skills', 'TEXT', 'TEXT'),
+            ('jd_hash', 'TEXT', 'TEXT'),
+            ('jd_model_version', 'TEXT', 'TEXT'),
+        ],
+        'candidates': [
+            # Content-addressed upload key (see upload_store.py); filename stays the display name
+            ('file_key', 'TEXT', 'TEXT'),
+            # Stored analysis payload (see analysis_store.py)
+            ('analysis', 'TEXT', 'TEXT'),
+            ('analysis_version', 'TEXT', 'TEXT'),
+            ('analysis_jd_hash', 'TEXT', 'TEXT'),
+            # Resume text lives in documents (see documents.py); full_text is legacy
+            ('document_hash', 'TEXT', 'TEXT'),
+            # Pipeline status (NULL reads as 'Applied'); the analytics rollups count it
+            ('status', 'TEXT', 'TEXT'),
+        ],
+        'users': [
+            ('resume_filename', 'TEXT', 'TEXT'),
+        ],
+        'ingest_items': [
+            ('file_key', 'TEXT', 'TEXT'),
+        ],
+    })),
+    (2, 'recruiter notes and candidate profile columns', _add_columns({
+        'candidates': [
+            ('notes', 'TEXT', 'TEXT'),
+        ],
+        'users': [
+            ('resume_path', 'TEXT', 'TEXT'), # upload store key of the profile resume
+            ('skills', 'TEXT', 'TEXT'), # JSON list
+            ('experience', 'TEXT', 'TEXT'),
+            ('education', 'TEXT', 'TEXT'), # JSON list
+            ('profile_summary', 'TEXT', 'TEXT'),
+        ],
+    })),
+    (3, 'indexes for the candidate listing and lookup queries', _create_indexes([
+        # job_detail / export / delete_job: WHERE job_id = ? [AND total_score >= ?] ORDER BY total_score DESC, id DESC
+        ('idx_candidates_job_score', 'candidates', 'job_id, total_score, id'),
+        # job_detail with a status filter: WHERE job_id = ? AND status = ? ORDER BY total_score DESC, id DESC
+        ('idx_candidates_job_status_score', 'candidates', 'job_id, status, total_score, id'),
+        # talent pool browsing: ORDER BY created_at DESC, id DESC
+        ('idx_candidates_created', 'candidates', 'created_at, id'),
+        # easy_apply duplicate check (user_id = ? AND job_id = ?) and the candidate dashboard (user_id = ?)
+        ('idx_candidates_user_job', 'candidates', 'user_id, job_id'),
+        # recruiter dashboard: ORDER BY created_at DESC
+        ('idx_jobs_created', 'jobs', 'created_at'),
+    ])),
+    (4, 'per-job scoring weights', _add_columns({
+        # NULL = job_weights.DEFAULT_WEIGHTS
+        'jobs': [
+            ('weight_semantic', 'REAL', 'REAL'),
+            ('weight_skills', 'REAL', 'REAL'),
+            ('weight_experience', 'REAL', 'REAL'),
+        ],
+    })),
+    (5, 'bulk import checkpoints', _create_table('import_runs', [
+        # One row per `flask import-resumes` run (see bulk_import.py)
+        ('id', 'INTEGER PRIMARY KEY AUTOINCREMENT', 'SERIAL PRIMARY KEY'),
+        ('job_id', 'INTEGER', 'INTEGER'),
+        ('source', 'TEXT', 'TEXT'), # absolute path of the directory or zip
+        ('total', 'INTEGER', 'INTEGER'),
+        ('position', 'INTEGER DEFAULT 0', 'INTEGER DEFAULT 0'), # files handled, committed with their candidates
+        ('imported', 'INTEGER DEFAULT 0', 'INTEGER DEFAULT 0'),
+        ('failed', 'INTEGER DEFAULT 0', 'INTEGER DEFAULT 0'),
+        ('seconds', 'REAL DEFAULT 0', 'DOUBLE PRECISION DEFAULT 0'), # working time, across resumes
+        ('started_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+        ('finished_at', 'TIMESTAMP', 'TIMESTAMP'),
+    ])),
+    (6, 'queued upload bytes and profile resume text', _add_columns({
+        # Upload bytes, parsed in memory by the ingestion workers and cleared once the item
+        # is processed; NULL = parse the stored file (items queued before this migration)
+        'ingest_items': [('payload', 'BLOB', 'BYTEA')],
+        # documents.content_hash of the profile resume, parsed at upload
+        'users': [('resume_document_hash', 'TEXT', 'TEXT')],
+    })),
+    (7, 'index for document reference checks', _create_indexes([
+        # documents.release: is any candidate still pointing at this document?
+        ('idx_candidates_document', 'candidates', 'document_hash'),
+    ])),
+    (8, 'skill taxonomy stamp for job profiles', _add_columns({
+        # scoring_engine.analysis_version() the stored jd_skills were extracted with
+        'jobs': [('jd_skills_version', 'TEXT', 'TEXT')],
+    })),
+    (9, 'ingest item leases', _add_columns({
+        # renewed while a worker holds the item; expired leases are requeued (see ingestion.py)
+        'ingest_items': [('lease_ts', 'REAL', 'DOUBLE PRECISION')],
+    })),
+    (10, 'indexes for the NULL-safe candidate ranking', _create_indexes([
+        # job_detail: WHERE job_id = ? [AND status = ?] ORDER BY COALESCE(total_score, -1) DESC, id DESC
+        ('idx_candidates_job_rank', 'candidates', 'job_id, (COALESCE(total_score, -1)), id'),
+        ('idx_candidates_job_status_rank', 'candidates', 'job_id, status, (COALESCE(total_score, -1)), id'),
+    ])),
+]
+
+
+def migrate(c, postgres=False):
+    """
+    Apply pending migrations with cursor c. Returns (current version, [(version, description) applied]).
+    Runs inside the caller's transaction; the caller commits.
+    """
+    mark = '%s' if postgres else '?'
+    if postgres:
+        # Serialize app instances starting at the same time; released at commit
+        c.execute('SELECT pg_advisory_xact_lock(%s)', (0x5C4E4D41,))
+    c.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )''')
+
+    c.execute('SELECT version FROM schema_migrations')
+    done = {row[0] for row in c.fetchall()}
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version in done:
+            continue
+        step(c, postgres)
+        c.execute(f'INSERT INTO schema_migrations (version, description) VALUES ({mark}, {mark}) ON CONFLICT (version) DO NOTHING',
+                  (version, description))
+        applied.append((version, description))
+    return max(done | {v for v, _ in applied}, default=0), applied
+
+
+def report(version, applied):
+    if applied:
+        for number, description in applied:
+            print(f"Applied schema migration {number}: {description}")
+    print(f"Database schema at version {version}.")
@@ -0,0 +1,131 @@
+import json
+import base64
+from flask import request, url_for
+
+# Keyset (cursor) Pagination
+# Listings are ordered by a unique key tuple such as (total_score, id) and a page is
+# "the next N rows after this key", so the database seeks through an index instead of
+# counting past OFFSET rows, and each request holds at most one page in memory.
+# Cursors are opaque url-safe tokens of the boundary row's key values.
+# Row-value comparisons never match NULL, so a nullable key (e.g. an unscored candidate's
+# total_score) is compared and ordered as COALESCE(key, stand-in) via the `nulls` argument.
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 100
+
+
+def page_size(default=DEFAULT_PER_PAGE):
+    """
+    The per_page query parameter, clamped to 1..MAX_PER_PAGE.
+    """
+    return min(max(request.args.get('per_page', default, type=int), 1), MAX_PER_PAGE)
+
+
+def encode_cursor(values):
+    raw = json.dumps([v if isinstance(v, (int, float, str)) or v is None else str(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Key values from a cursor token, or None if it is missing or malformed.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _key_terms(keys, nulls):
+    nulls = nulls or {}
+    return [f'COALESCE({k}, {nulls[k]!r})' if k in nulls else k for k in keys]
+
+
+def _key_values(row, keys, nulls):
+    nulls = nulls or {}
+    return [nulls.get(k) if row[k] is None else row[k] for k in keys]
+
+
+def keyset_page(conn, columns, table, where, params, keys, per_page, after=None, before=None, nulls=None):
+    """
+    One page of `SELECT columns FROM table WHERE where` in descending `keys` order.
+    `keys` must be unique together (end with id) and be among the selected columns.
+    `nulls` maps nullable keys to a stand-in value below any real one, so those rows come last.
+    `after` / `before` are cursor tokens from a previous page.
+    Returns {'rows', 'next_cursor', 'prev_cursor'}.
+    """
+    terms = _key_terms(keys, nulls)
+    key_sql = ', '.join(terms)
+    after_values = decode_cursor(after, len(keys))
+    before_values = decode_cursor(before, len(keys)) if after_values is None else None
+    boundary = after_values or before_values
+    backwards = before_values is not None
+
+    sql = f'SELECT {columns} FROM {table} WHERE {where}'
+    args = list(params)
+    if boundary:
+        marks = ', '.join('?' * len(keys))
+        sql += f" AND ({key_sql}) {'>' if backwards else '<'} ({marks})"
+        args += boundary
+    direction = 'ASC' if backwards else 'DESC'
+    sql += ' ORDER BY ' + ', '.join(f'{t} {direction}' for t in terms) + ' LIMIT ?'
+    args.append(per_page + 1)
+
+    rows = conn.execute(sql, args).fetchall()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor(row):
+        return encode_cursor(_key_values(row, keys, nulls))
+
+    next_cursor = prev_cursor = None
+    if rows and backwards:
+        # We came back from the page ahead, so it exists
+        next_cursor = cursor(rows[-1])
+        prev_cursor = cursor(rows[0]) if more else None
+    elif rows:
+        next_cursor = cursor(rows[-1]) if more else None
+        prev_cursor = cursor(rows[0]) if boundary is not None else None
+    return {'rows': rows, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
+
+
+def count(conn, table, where, params):
+    """
+    Total rows for a listing, as a separate COUNT query (no row data loaded).
+    """
+    return conn.execute(f'SELECT COUNT(*) AS n FROM {table} WHERE {where}', list(params)).fetchone()['n']
+
+
+def rows_ahead(conn, table, where, params, keys, row, nulls=None):
+    """
+    How many rows come before `row` in a keyset_page listing (for rank numbers).
+    """
+    marks = ', '.join('?' * len(keys))
+    return count(conn, table, f"{where} AND ({', '.join(_key_terms(keys, nulls))}) > ({marks})",
+                 list(params) + _key_values(row, keys, nulls))
+
+
+def links(next_args=None, prev_args=None):
+    """
+    URLs for the current endpoint with the given paging arguments swapped in.
+    Other query parameters (filters, search, per_page) are kept.
+    """
+    def url(extra):
+        if extra is None:
+            return None
+        args = {k: v for k, v in request.args.items() if k not in ('after', 'before', 'page')}
+        args.update(extra)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+    return {'next_url': url(next_args), 'prev_url': url(prev_args)}
+
+
+def cursor_links(page):
+    return links({'after': page['next_cursor']} if page['next_cursor'] else None,
+                 {'before': page['prev_cursor']} if page['prev_cursor'] else None)
@@ -0,0 +1,252 @@
+import os
+import time
+import datetime
+import threading
+
+# Analytics Rollups
+# Precomputed counters for the analytics page, one small table per chart:
+#   rollup_job_counts          job_id -> candidates
+#   rollup_score_buckets       decile of total_score (0..9) -> candidates
+#   rollup_status_counts       pipeline status (NULL counts as 'Applied') -> candidates
+#   rollup_daily_applications  'YYYY-MM-DD' -> candidates
+#   rollup_totals              single row: candidates, scored candidates, sum of total_score
+# Database triggers on candidates keep them current inside the same transaction as the
+# insert / rescore / status change / delete, whichever code path makes it.
+# rebuild() recomputes them from scratch (`flask --app app rebuild-rollups`).
+# dashboard_counters() serves the recruiter dashboard from them through a short TTL cache;
+# write paths in this process call invalidate() so their own changes show immediately.
+
+DAILY_DAYS = 30 # days of application volume shown
+DASHBOARD_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', 10)) # seconds
+
+# (table, key column, key types (sqlite, postgres), watched column, key expression per dialect)
+# Expressions use {r} for the NEW/OLD row.
+ROLLUPS = [
+    ('rollup_job_counts', 'job_id', ('INTEGER', 'INTEGER'), 'job_id',
+     '{r}.job_id', '{r}.job_id'),
+    ('rollup_score_buckets', 'bucket', ('INTEGER', 'INTEGER'), 'total_score',
+     # (GREATEST/LEAST skip NULLs, so an unscored row needs the explicit CASE to stay out of bucket 9)
+     'MAX(MIN(CAST({r}.total_score / 10 AS INTEGER), 9), 0)',
+     'CASE WHEN {r}.total_score IS NULL THEN NULL ELSE GREATEST(LEAST(FLOOR({r}.total_score / 10)::int, 9), 0) END'),
+    ('rollup_status_counts', 'status', ('TEXT', 'TEXT'), 'status',
+     "COALESCE({r}.status, 'Applied')", "COALESCE({r}.status, 'Applied')"),
+    ('rollup_daily_applications', 'day', ('TEXT', 'TEXT'), 'created_at',
+     'date({r}.created_at)', "to_char({r}.created_at, 'YYYY-MM-DD')"),
+]
+
+
+def _bump(table, key, expr, r, delta):
+    """
+    One statement adding delta to the rollup row of row alias r (skipped if its key is NULL).
+    """
+    key_expr = expr.format(r=r)
+    if delta > 0:
+        return (f'INSERT INTO {table} ({key}, candidates) SELECT {key_expr}, 1 WHERE {key_expr} IS NOT NULL '
+                f'ON CONFLICT ({key}) DO UPDATE SET candidates = {table}.candidates + 1;')
+    return f'UPDATE {table} SET candidates = candidates - 1 WHERE {key} = {key_expr};'
+
+
+def _totals(r, sign):
+    """
+    Statement applying row alias r to rollup_totals (sign is '+' or '-').
+    """
+    return (f'UPDATE rollup_totals SET candidates = candidates {sign} 1, '
+            f'scored = scored {sign} (CASE WHEN {r}.total_score IS NULL THEN 0 ELSE 1 END), '
+            f'score_sum = score_sum {sign} COALESCE({r}.total_score, 0);')
+
+
+def _create_tables(c, dialect):
+    for table, key, types, _, _, _ in ROLLUPS:
+        c.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+                        {key} {types[dialect]} PRIMARY KEY,
+                        candidates INTEGER NOT NULL DEFAULT 0
+                    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS rollup_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    candidates INTEGER NOT NULL DEFAULT 0,
+                    scored INTEGER NOT NULL DEFAULT 0,
+                    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0
+                )''')
+
+
+def init_sqlite(c):
+    """
+    Create the rollup tables and triggers. Returns True if any table was just created
+    (so the caller rebuilds them from existing candidates).
+    """
+    existing = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE name LIKE 'rollup_%'").fetchall()}
+    created = not {t[0] for t in ROLLUPS} | {'rollup_totals'} <= existing
+    _create_tables(c, 0)
+    if not c.execute('SELECT 1 FROM rollup_totals').fetchone():
+        c.execute('INSERT INTO rollup_totals (id) VALUES (1)')
+
+    inserts = '\n'.join(_bump(t, k, e, 'new', 1) for t, k, _, _, e, _ in ROLLUPS)
+    deletes = '\n'.join(_bump(t, k, e, 'old', -1) for t, k, _, _, e, _ in ROLLUPS)
+    c.execute(f'CREATE TRIGGER IF NOT EXISTS rollups_insert AFTER INSERT ON candidates BEGIN\n{inserts}\nEND')
+    c.execute(f'CREATE TRIGGER IF NOT EXISTS rollups_delete AFTER DELETE ON candidates BEGIN\n{deletes}\nEND')
+    # One trigger per watched column, so a status change only touches the status rollup
+    for table, key, _, watched, expr, _ in ROLLUPS:
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS rollups_update_{watched} AFTER UPDATE OF {watched} ON candidates
+                      WHEN old.{watched} IS NOT new.{watched} BEGIN
+                      {_bump(table, key, expr, 'old', -1)}
+                      {_bump(table, key, expr, 'new', 1)}
+                      END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS rollup_totals_insert AFTER INSERT ON candidates BEGIN
+                   {_totals('new', '+')}
+                   END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS rollup_totals_delete AFTER DELETE ON candidates BEGIN
+                   {_totals('old', '-')}
+                   END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS rollup_totals_update AFTER UPDATE OF total_score ON candidates
+                   WHEN old.total_score IS NOT new.total_score BEGIN
+                   {_totals('old', '-')}
+                   {_totals('new', '+')}
+                   END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS rollups_job_delete AFTER DELETE ON jobs BEGIN
+                    DELETE FROM rollup_job_counts WHERE job_id = old.id;
+                 END''')
+    return created
+
+
+def init_postgres(c):
+    """
+    Postgres version of init_sqlite: one plpgsql trigger function for all rollups.
+    Also returns True when that function changed, so counters it kept are rebuilt.
+    """
+    created = False
+    for table in [t[0] for t in ROLLUPS] + ['rollup_totals']:
+        c.execute('SELECT to_regclass(%s)', (table,))
+        created = created or c.fetchone()[0] is None
+    _create_tables(c, 1)
+    c.execute('INSERT INTO rollup_totals (id) VALUES (1) ON CONFLICT (id) DO NOTHING')
+
+    blocks = []
+    for table, key, _, watched, _, expr in ROLLUPS:
+        blocks.append(f'''
+        IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.{watched} IS DISTINCT FROM NEW.{watched}) THEN
+            {_bump(table, key, expr, 'OLD', -1)}
+        END IF;
+        IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.{watched} IS DISTINCT FROM NEW.{watched}) THEN
+            {_bump(table, key, expr, 'NEW', 1)}
+        END IF;''')
+    blocks.append(f'''
+        IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.total_score IS DISTINCT FROM NEW.total_score) THEN
+            {_totals('OLD', '-')}
+        END IF;
+        IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND OLD.total_score IS DISTINCT FROM NEW.total_score) THEN
+            {_totals('NEW', '+')}
+        END IF;''')
+    body = f'''
+                  BEGIN{''.join(blocks)}
+                      RETURN NULL;
+                  END
+                  '''
+    # Counters kept by an older version of the trigger are recomputed
+    c.execute("SELECT prosrc FROM pg_proc WHERE proname = 'rollups_track'")
+    row = c.fetchone()
+    created = created or row is None or row[0] != body
+    c.execute(f'''CREATE OR REPLACE FUNCTION rollups_track() RETURNS trigger AS $${body}$$ LANGUAGE plpgsql''')
+    c.execute('DROP TRIGGER IF EXISTS rollups_track ON candidates')
+    c.execute(f'''CREATE TRIGGER rollups_track
+                  AFTER INSERT OR DELETE OR UPDATE OF {', '.join(r[3] for r in ROLLUPS)} ON candidates
+                  FOR EACH ROW EXECUTE FUNCTION rollups_track()''')
+    c.execute('''CREATE OR REPLACE FUNCTION rollups_job_delete() RETURNS trigger AS $$
+                 BEGIN
+                     DELETE FROM rollup_job_counts WHERE job_id = OLD.id;
+                     RETURN NULL;
+                 END
+                 $$ LANGUAGE plpgsql''')
+    c.execute('DROP TRIGGER IF EXISTS rollups_job_delete ON jobs')
+    c.execute('''CREATE TRIGGER rollups_job_delete AFTER DELETE ON jobs
+                 FOR EACH ROW EXECUTE FUNCTION rollups_job_delete()''')
+    return created
+
+
+def rebuild(conn, postgres=False):
+    """
+    Recompute every rollup from the candidates table (fixes drift). Caller commits.
+    """
+    if postgres:
+        # Hold off concurrent candidate writes so their trigger updates can't interleave
+        conn.execute('LOCK TABLE candidates IN SHARE MODE')
+    for table, key, _, _, sqlite_expr, pg_expr in ROLLUPS:
+        expr = (pg_expr if postgres else sqlite_expr).format(r='candidates')
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(f'''INSERT INTO {table} ({key}, candidates)
+                         SELECT {expr}, COUNT(*) FROM candidates
+                         WHERE {expr} IS NOT NULL GROUP BY {expr}''')
+    conn.execute('''UPDATE rollup_totals SET
+                        candidates = (SELECT COUNT(*) FROM candidates),
+                        scored = (SELECT COUNT(total_score) FROM candidates),
+                        score_sum = (SELECT COALESCE(SUM(total_score), 0) FROM candidates)
+                    WHERE id = 1''')
+    invalidate()
+
+
+def read(conn):
+    """
+    Everything the analytics page needs, from the rollup tables (a handful of small queries).
+    """
+    jobs = conn.execute('''SELECT j.title, COALESCE(r.candidates, 0) AS candidates
+                           FROM jobs j LEFT JOIN rollup_job_counts r ON r.job_id = j.id
+                           ORDER BY j.id''').fetchall()
+
+    deciles = dict(conn.execute('SELECT bucket, candidates FROM rollup_score_buckets').fetchall())
+    # Chart buckets: Low (<50), Medium (50-79), High (80+)
+    score_buckets = [sum(deciles.get(d, 0) for d in range(0, 5)),
+                     sum(deciles.get(d, 0) for d in range(5, 8)),
+                     sum(deciles.get(d, 0) for d in range(8, 10))]
+
+    statuses = dict(conn.execute('SELECT status, candidates FROM rollup_status_counts').fetchall())
+
+    # created_at is CURRENT_TIMESTAMP, i.e. UTC
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    days = [(today - datetime.timedelta(days=n)).isoformat() for n in range(DAILY_DAYS - 1, -1, -1)]
+    daily = dict(conn.execute('SELECT day, candidates FROM rollup_daily_applications WHERE day >= ?',
+                              (days[0],)).fetchall())
+
+    return {
+        'job_labels': [job['title'] for job in jobs],
+        'job_counts': [job['candidates'] for job in jobs],
+        'score_buckets': score_buckets,
+        'statuses': statuses,
+        'daily_labels': days,
+        'daily_counts': [daily.get(day, 0) for day in days]
+    }
+
+
+_dashboard_cache = {'value': None, 'expires': 0.0, 'generation': 0}
+_dashboard_lock = threading.Lock()
+
+
+def invalidate():
+    """
+    Drop the cached dashboard counters. Call after writing candidates or jobs.
+    """
+    with _dashboard_lock:
+        _dashboard_cache['value'] = None
+        _dashboard_cache['generation'] += 1
+
+
+def dashboard_counters(conn):
+    """
+    Totals for the recruiter dashboard: {'total_candidates', 'avg_score', 'job_counts'}.
+    Reads two tiny rollup tables, cached for DASHBOARD_TTL seconds.
+    """
+    with _dashboard_lock:
+        if _dashboard_cache['value'] is not None and time.monotonic() < _dashboard_cache['expires']:
+            return _dashboard_cache['value']
+        generation = _dashboard_cache['generation']
+
+    totals = conn.execute('SELECT candidates, scored, score_sum FROM rollup_totals WHERE id = 1').fetchone()
+    counters = {
+        'total_candidates': totals['candidates'] if totals else 0,
+        'avg_score': round(totals['score_sum'] / totals['scored'], 1) if totals and totals['scored'] else 0,
+        'job_counts': dict(conn.execute('SELECT job_id, candidates FROM rollup_job_counts').fetchall())
+    }
+    with _dashboard_lock:
+        # Don't cache a read that raced with an invalidate()
+        if generation == _dashboard_cache['generation']:
+            _dashboard_cache['value'] = counters
+            _dashboard_cache['expires'] = time.monotonic() + DASHBOARD_TTL
+    return counters
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template
 import database
+import rollups
 
 bp = Blueprint('analytics', __name__)
 
@@ -10,44 +11,19 @@ from decorators import role_required
 @login_required
 @role_required('recruiter')
 def index():
-    conn = database.get_db_connection()
+    # Precomputed by triggers on candidates (see rollups.py)
+    with database.get_db_connection() as conn:
+        data = rollups.read(conn)
     
-    # 1. Candidates per Job
-    jobs = conn.execute("SELECT id, title FROM jobs").fetchall()
-    job_labels = []
-    job_counts = []
-    
-    for job in jobs:
-        count = conn.execute("SELECT COUNT(*) FROM candidates WHERE job_id = ?", (job['id'],)).fetchone()[0]
-        job_labels.append(job['title'])
-        job_counts.append(count)
-        
-    # 2. Score Distribution (e.g. 0-50, 51-75, 76-100)
-    scores = conn.execute("SELECT total_score FROM candidates").fetchall()
-    score_buckets = [0, 0, 0] # Low, Medium, High
-    
-    for s in scores:
-        val = s['total_score']
-        if val < 50: score_buckets[0] += 1
-        elif val < 80: score_buckets[1] += 1
-        else: score_buckets[2] += 1
-        
-    # 3. Pipeline Funnel (Status Counts)
+    # Pipeline Funnel (Status Counts)
     statuses = ['Applied', 'Screening', 'Interview', 'Offer', 'Rejected']
-    status_counts = []
-    for st in statuses:
-        # Check for NULL status and treat as 'Applied' if st=='Applied'
-        if st == 'Applied':
-            c = conn.execute("SELECT COUNT(*) FROM candidates WHERE status = ? OR status IS NULL", (st,)).fetchone()[0]
-        else:
-            c = conn.execute("SELECT COUNT(*) FROM candidates WHERE status = ?", (st,)).fetchone()[0]
-        status_counts.append(c)
-
-    conn.close()
+    status_counts = [data['statuses'].get(st, 0) for st in statuses]
     
     return render_template('analytics.html', 
-                           job_labels=job_labels, 
-                           job_counts=job_counts,
-                           score_buckets=score_buckets,
+                           job_labels=data['job_labels'], 
+                           job_counts=data['job_counts'],
+                           score_buckets=data['score_buckets'],
                            pipeline_labels=statuses,
-                           pipeline_counts=status_counts)
+                           pipeline_counts=status_counts,
+                           daily_labels=data['daily_labels'],
+                           daily_counts=data['daily_counts'])
@@ -2,15 +2,27 @@ import os
 import json
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, current_app, flash
 from werkzeug.utils import secure_filename
-from scoring_engine import ScoringEngine
+import scoring_engine
 from cv_parser import extract_text
 import database
+import job_profiles
+import ingestion
+import upload_store
+import analysis_store
+import vector_index
+import pagination
+import documents
+import rollups
+import job_weights
+import exports
 
 bp = Blueprint('core', __name__)
 
-# Initialize NexGen AI Engine
-print("Initializing NexGen Scoring Engine in core blueprint...")
-engine = ScoringEngine()
+# Columns shown in candidate listings (never the resume body)
+LIST_COLUMNS = 'id, job_id, filename, total_score, skills_score, status, created_at'
+# Ranking order of a job's candidates; scores are 0-100, so -1 puts unscored ones last
+RANK_KEYS = ('total_score', 'id')
+RANK_NULLS = {'total_score': -1}
 
 from flask_login import login_required, current_user
 
@@ -27,17 +39,18 @@ def create_job():
     description = ""
 
     if desc_file:
-        filename = secure_filename(desc_file.filename)
-        path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        desc_file.save(path)
-        description = extract_text(path)
+        # Parsed from the request buffer; the original is persisted in the background
+        _, description = upload_store.parse(desc_file, current_app.config['UPLOAD_FOLDER'])
     else:
         description = request.form.get('description', '')
 
     conn = database.get_db_connection()
-    conn.execute('INSERT INTO jobs (title, description) VALUES (?, ?)', (title, description))
+    cur = conn.execute('INSERT INTO jobs (title, description) VALUES (?, ?)', (title, description))
+    job_id = cur.lastrowid
     conn.commit()
     conn.close()
+    # JD embedding + skills are computed once per job, in the background (not per uploaded CV)
+    job_profiles.build_in_background(job_id)
     return redirect(url_for('core.dashboard'))
 
 @bp.route('/jobs')
@@ -65,18 +78,13 @@ def dashboard():
         return render_template('candidate_dashboard.html', applications=applications)
         
     # Recruiter / Admin View (Original Dashboard)
-    conn = database.get_db_connection()
-    jobs = conn.execute('SELECT * FROM jobs ORDER BY created_at DESC').fetchall()
-    
-    # Safely handle empty DB
-    total_cand_row = conn.execute('SELECT COUNT(*) FROM candidates').fetchone()
-    total_candidates = total_cand_row[0] if total_cand_row else 0
-    
-    avg_score_row = conn.execute('SELECT AVG(total_score) FROM candidates').fetchone()
-    avg_score = round(avg_score_row[0], 1) if avg_score_row and avg_score_row[0] else 0
-    
-    conn.close()
-    return render_template('dashboard.html', jobs=jobs, total_candidates=total_candidates, avg_score=avg_score)
+    with database.get_db_connection() as conn:
+        jobs = conn.execute('SELECT id, title, created_at FROM jobs ORDER BY created_at DESC').fetchall()
+        # Maintained by triggers and cached briefly (see rollups.py), no scan of candidates
+        counters = rollups.dashboard_counters(conn)
+
+    return render_template('dashboard.html', jobs=jobs, total_candidates=counters['total_candidates'],
+                           avg_score=counters['avg_score'], job_counts=counters['job_counts'])
 
 @bp.route('/jobs/<int:job_id>')
 @login_required
@@ -91,66 +99,88 @@ def job_detail(job_id):
     min_score = request.args.get('min_score', type=float)
     status_filter = request.args.get('status_filter')
     
-    query = 'SELECT * FROM candidates WHERE job_id = ?'
+    where = 'job_id = ?'
     params = [job_id]
     
     if min_score:
-        query += ' AND total_score >= ?'
+        where += ' AND total_score >= ?'
         params.append(min_score)
         
     if status_filter:
-        query += ' AND status = ?'
+        where += ' AND status = ?'
         params.append(status_filter)
         
-    query += ' ORDER BY total_score DESC'
-    
-    candidates = conn.execute(query, params).fetchall()
+    # One keyset page, best scores first (unscored last), projecting only the columns the table shows
+    page = pagination.keyset_page(conn, LIST_COLUMNS, 'candidates', where, params, RANK_KEYS,
+                                  pagination.page_size(),
+                                  after=request.args.get('after'), before=request.args.get('before'),
+                                  nulls=RANK_NULLS)
+    candidates = page['rows']
+    total = pagination.count(conn, 'candidates', where, params)
+    # Rank of the first row = candidates ahead of it + 1
+    first_rank = 1
+    if candidates and (request.args.get('after') or request.args.get('before')):
+        first_rank += pagination.rows_ahead(conn, 'candidates', where, params, RANK_KEYS, candidates[0],
+                                            nulls=RANK_NULLS)
+    # Uploads still being processed; the page polls their progress
+    batch_ids = ingestion.active_batches(conn, job_id)
     conn.close()
-    return render_template('job_detail.html', job=job, candidates=candidates)
+    return render_template('job_detail.html', job=job, candidates=candidates, batch_ids=batch_ids,
+                           total=total, first_rank=first_rank,
+                           weights=job_weights.get_weights(job), weight_fields=job_weights.FIELDS,
+                           **pagination.cursor_links(page))
+
+@bp.route('/jobs/<int:job_id>/weights', methods=['POST'])
+@login_required
+@role_required('recruiter')
+def update_job_weights(job_id):
+    # Re-rank from the stored component scores; no CV is re-encoded (see job_weights.py)
+    try:
+        weights = job_weights.parse_form(request.form)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('core.job_detail', job_id=job_id))
+    with database.get_db_connection() as conn:
+        if not conn.execute('SELECT id FROM jobs WHERE id = ?', (job_id,)).fetchone():
+            return "Job not found", 404
+        rescored = job_weights.rescore(conn, job_id, weights)
+    rollups.invalidate()
+    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+        return jsonify({'weights': weights, 'rescored': rescored})
+    flash(f"Weights saved. {rescored} candidates re-ranked.", 'success')
+    return redirect(url_for('core.job_detail', job_id=job_id))
 
 @bp.route('/jobs/<int:job_id>/upload', methods=['POST'])
 @login_required
 def upload_cvs(job_id):
-    # Determine permissions internally
+    # Files are only read and queued here; extraction & scoring run in the ingestion workers
     conn = database.get_db_connection()
-    job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    job = conn.execute('SELECT id FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if not job:
+        conn.close()
+        return "Job not found", 404
     
     cv_files = request.files.getlist('cvs')
-    weights = {'overall_similarity': 0.5, 'skills': 0.3, 'experience': 0.2}
 
     # Identify user if logged in
     user_id = current_user.id if current_user.is_authenticated else None
 
+    saved = []
     for cv_file in cv_files:
         if cv_file.filename == '': continue
             
         filename = secure_filename(cv_file.filename)
-        path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        cv_file.save(path)
-        
-        try:
-            cv_text = extract_text(path)
-            score_data = engine.score_cv(cv_text, job['description'], weights)
-            analysis = engine.analyze_candidate(cv_text, job['description'])
-            
-            conn.execute('''INSERT INTO candidates 
-                            (job_id, filename, semantic_score, skills_score, experience_score, total_score, full_text, missing_skills, interview_questions, user_id)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', 
-                            (job_id, filename, 
-                             score_data['breakdown']['semantic_match'],
-                             score_data['breakdown']['skills_match'],
-                             score_data['breakdown']['experience_match'],
-                             score_data['total_score'],
-                             cv_text,
-                             json.dumps(analysis['missing']),
-                             json.dumps(analysis['questions']),
-                             user_id # Add user_id
-                            ))
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-            
+        data, key = upload_store.read(cv_file)
+        saved.append((filename, key, os.path.join(current_app.config['UPLOAD_FOLDER'], key), data))
+
+    batch_id = ingestion.enqueue(conn, job_id, user_id, saved)
     conn.commit()
     conn.close()
+    ingestion.notify()
+
+    # API clients get the batch id to poll
+    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+        return jsonify({'batch_id': batch_id, 'status_url': url_for('core.ingest_status', batch_id=batch_id)}), 202
     
     # Redirect based on role
     if current_user.is_authenticated and current_user.role == 'candidate':
@@ -158,18 +188,35 @@ def upload_cvs(job_id):
         
     return redirect(url_for('core.job_detail', job_id=job_id))
 
+@bp.route('/ingest/<int:batch_id>')
+@login_required
+def ingest_status(batch_id):
+    conn = database.get_db_connection()
+    status = ingestion.batch_status(conn, batch_id)
+    conn.close()
+    if not status:
+        return jsonify({'error': 'Not found'}), 404
+    if current_user.role == 'candidate' and status['user_id'] != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(status)
+
 @bp.route('/jobs/<int:job_id>/delete', methods=['POST'])
 @login_required
 @role_required('recruiter')
 def delete_job(job_id):
     conn = database.get_db_connection()
+    rows = conn.execute('SELECT id, document_hash FROM candidates WHERE job_id = ?', (job_id,)).fetchall()
+    removed = [row['id'] for row in rows]
     conn.execute('DELETE FROM candidates WHERE job_id = ?', (job_id,))
     conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+    documents.release(conn, [row['document_hash'] for row in rows])
     conn.commit()
     conn.close()
+    rollups.invalidate()
+    vector_index.remove_candidates(removed)
     return redirect(url_for('core.dashboard'))
 
-@bp.route('/uploads/<filename>')
+@bp.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     from flask import send_from_directory
     return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
@@ -183,7 +230,9 @@ def candidate_modal(candidate_id):
     import traceback
     try:
         conn = database.get_db_connection()
-        candidate = conn.execute('SELECT * FROM candidates WHERE id = ?', (candidate_id,)).fetchone()
+        candidate = conn.execute('''SELECT c.*, j.description AS job_description
+                                    FROM candidates c JOIN jobs j ON c.job_id = j.id
+                                    WHERE c.id = ?''', (candidate_id,)).fetchone()
         if not candidate: 
             conn.close()
             return jsonify({'error': 'Not found'}), 404
@@ -193,18 +242,23 @@ def candidate_modal(candidate_id):
              conn.close()
              return jsonify({'error': 'Unauthorized'}), 403
         
-        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (candidate['job_id'],)).fetchone()
+        # Stored at ingest; only recomputed if the engine or the JD changed since
+        analysis = analysis_store.load_analysis(candidate, candidate['job_description'], scoring_engine.analysis_version())
+        if analysis is None:
+            print(f"Analyzing candidate {candidate_id}...")
+            engine = scoring_engine.get_engine()
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (candidate['job_id'],)).fetchone()
+            profile = job_profiles.get_job_profile(conn, job, engine)
+            analysis = engine.analyze_candidate(documents.candidate_text(conn, candidate), job['description'], job_profile=profile)
+            analysis_store.save_analysis(conn, candidate_id, analysis, engine, profile['jd_hash'])
+            conn.commit()
         conn.close()
-        
-        # Re-run analysis for live view
-        print(f"Analyzing candidate {candidate_id}...")
-        analysis = engine.analyze_candidate(candidate['full_text'], job['description'])
-        print(f"Analysis successful. Keys: {analysis.keys()}")
-        print(f"Personal Info: {analysis.get('personal_info')}")
 
         return jsonify({
             'html': render_template('candidate_modal.html', candidate=candidate, analysis=analysis)
         })
+    except scoring_engine.EngineNotReady:
+        raise # 503, see app.py
     except Exception as e:
         print("CRITICAL ERROR in candidate_modal:")
         traceback.print_exc()
@@ -245,11 +299,14 @@ def update_candidate_notes(candidate_id):
 @role_required('recruiter')
 def delete_candidate(candidate_id):
     conn = database.get_db_connection()
-    cand = conn.execute('SELECT job_id FROM candidates WHERE id = ?', (candidate_id,)).fetchone()
+    cand = conn.execute('SELECT job_id, document_hash FROM candidates WHERE id = ?', (candidate_id,)).fetchone()
     if cand:
         conn.execute('DELETE FROM candidates WHERE id = ?', (candidate_id,))
+        documents.release(conn, [cand['document_hash']])
         conn.commit()
         conn.close()
+        rollups.invalidate()
+        vector_index.remove_candidates([candidate_id])
         return redirect(url_for('core.job_detail', job_id=cand['job_id']))
     return redirect(url_for('core.dashboard'))
 
@@ -257,30 +314,22 @@ def delete_candidate(candidate_id):
 @login_required
 @role_required('recruiter')
 def export_csv(job_id):
-    import csv, io
     from flask import Response
     
-    conn = database.get_db_connection()
-    job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
-    candidates = conn.execute('SELECT * FROM candidates WHERE job_id = ? ORDER BY total_score DESC', (job_id,)).fetchall()
-    conn.close()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Rank', 'Candidate Filename', 'Total Score', 'Semantic Score', 'Skills Score', 'Experience Score', 'Missing Skills'])
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return "Unknown export format", 400
+    with database.get_db_connection() as conn:
+        job = conn.execute('SELECT title FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if not job:
+        return "Job not found", 404
 
-    for idx, cand in enumerate(candidates, 1):
-        writer.writerow([
-            idx, cand['filename'], f"{cand['total_score']:.2f}",
-            f"{cand['semantic_score']:.2f}", f"{cand['skills_score']:.2f}",
-            f"{cand['experience_score']:.2f}", cand['missing_skills']
-        ])
-    
-    output.seek(0)
+    # Streamed in batches, ranked best first (see exports.py)
+    fields = exports.JOB_FIELDS if fmt == 'csv' else exports.JOB_NDJSON_FIELDS
     return Response(
-        output,
-        mimetype="text/csv",
-        headers={"Content-Disposition": f"attachment;filename={secure_filename(job['title'])}_candidates.csv"}
+        exports.stream(exports.job_query(job_id), fields, fmt, ranked=True),
+        mimetype=exports.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment;filename={secure_filename(job['title'])}_candidates.{fmt}"}
     )
 
 @bp.route('/profile', methods=['GET', 'POST'])
@@ -292,30 +341,30 @@ def profile():
         resume = request.files.get('resume')
         if resume:
             filename = secure_filename(resume.filename)
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            resume.save(path)
-            
-            # Parse Resume
-            cv_text = extract_text(path)
+            key, cv_text = upload_store.parse(resume, current_app.config['UPLOAD_FOLDER'])
             
             # Extract Details (Heuristic + ML)
             from cv_parser import extract_candidate_info
             personal_info = extract_candidate_info(cv_text)
-            skills = engine.extract_skills(cv_text) # Removed empty list arg if not needed or fix signature 
+            skills = scoring_engine.get_engine().extract_skills(cv_text) # Removed empty list arg if not needed or fix signature 
             # Wait, extract_skills matches against JD. We need a general extractor. 
             # For now, let's just use the text as the source of truth and maybe a default set of common skills if needed.
             # Actually, `extract_skills` returns matches. 
             # Let's just create a simple "profile_summary" for now.
             
             # Update User Profile
+            previous = conn.execute('SELECT resume_document_hash FROM users WHERE id = ?', (current_user.id,)).fetchone()
             conn.execute('''
                 UPDATE users 
                 SET resume_path = ?, 
+                    resume_filename = ?, 
                     skills = ?, 
                     experience = ?, 
-                    education = ?
+                    education = ?,
+                    resume_document_hash = ?
                 WHERE id = ?
             ''', (
+                key, 
                 filename, 
                 json.dumps(list(set(cv_text.split()))), # Placeholder for "All extracted words" is too big. 
                 # Let's store raw text and maybe simple extraction.
@@ -323,9 +372,12 @@ def profile():
                 # For this MVP phase, let's just store the path and text, and maybe heuristic info.
                 str(personal_info.get('total_years', 0)) + " Years",
                 json.dumps(personal_info.get('education', [])),
+                documents.store(conn, cv_text), # parsed once, here; easy_apply reads it back
                 current_user.id
             ))
+            documents.release(conn, [previous['resume_document_hash']]) # the replaced resume
             conn.commit()
+            database.User.invalidate(current_user.id)
             return redirect(url_for('core.profile'))
 
     # Fetch User Date
@@ -354,6 +406,7 @@ def update_profile():
                  (skills_json, experience, current_user.id))
     conn.commit()
     conn.close()
+    database.User.invalidate(current_user.id)
     
     flash('Profile updated successfully!', 'success')
     return redirect(url_for('core.profile'))
@@ -363,8 +416,9 @@ def update_profile():
 def easy_apply(job_id):
     if current_user.role != 'candidate':
         return jsonify({'error': 'Only candidates can apply'}), 403
+    # Before taking a connection: this may wait for the model to finish loading
+    engine = scoring_engine.get_engine()
         
-    conn = database.get_db_connection()
     conn = database.get_db_connection()
     user = conn.execute('SELECT * FROM users WHERE id = ?', (current_user.id,)).fetchone()
     
@@ -385,40 +439,50 @@ def easy_apply(job_id):
     # But we didn't save the text in 'users' table, only snippets.
     # We'll just read the file again.
     
-    cv_path = os.path.join(current_app.config['UPLOAD_FOLDER'], user['resume_path'])
-    if not os.path.exists(cv_path):
-         conn.close()
-         return jsonify({'error': 'Resume file missing on server.'}), 500
-
-    # Parse & Score
-    cv_text = extract_text(cv_path)
+    # Text parsed once, at profile upload (older profiles: cached next to the stored file)
+    cv_text = documents.load(conn, user['resume_document_hash']) if user['resume_document_hash'] else None
+    if cv_text is None:
+        cv_path = os.path.join(current_app.config['UPLOAD_FOLDER'], user['resume_path'])
+        if not os.path.exists(cv_path):
+             conn.close()
+             return jsonify({'error': 'Resume file missing on server.'}), 500
+        cv_text = upload_store.get_text(cv_path)
     job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    profile = job_profiles.get_job_profile(conn, job, engine)
     
-    # Analyze
-    analysis = engine.analyze_candidate(cv_text, job['description'])
+    # Score & Analyze against the stored job profile, with the job's weights
+    score_data = engine.score_cv(cv_text, job['description'], job_weights.get_weights(job), job_profile=profile)
+    analysis = engine.analyze_candidate(cv_text, job['description'], job_profile=profile)
     
     # Insert Candidate
-    conn.execute('''
+    cur = conn.execute('''
         INSERT INTO candidates (
-            job_id, name, email, phone, filename, 
+            job_id, name, email, phone, filename, file_key, 
             skills_score, experience_score, semantic_score, total_score, 
-            missing_skills, created_at, user_id, status
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, 'Applied')
+            document_hash, missing_skills, interview_questions, created_at, user_id, status,
+            analysis, analysis_version, analysis_jd_hash
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, 'Applied', ?, ?, ?)
     ''', (
         job_id, 
         user['name'], 
         user['email'], 
         analysis['personal_info'].get('phone', 'N/A'), 
-        user['resume_path'], # Filename
-        analysis['scores']['skills'],
-        analysis['scores']['experience'],
-        analysis['scores']['semantic'],
-        analysis['scores']['total'],
-        json.dumps(analysis['missing_skills']),
+        user['resume_filename'] or user['resume_path'], # Filename
+        user['resume_path'], # Upload store key
+        score_data['breakdown']['skills_match'],
+        score_data['breakdown']['experience_match'],
+        score_data['breakdown']['semantic_match'],
+        score_data['total_score'],
+        documents.store(conn, cv_text),
+        json.dumps(analysis['missing']),
+        json.dumps(analysis['questions']),
         current_user.id
-    ))
+    ) + analysis_store.columns(analysis, engine, profile['jd_hash']))
+    candidate_id = cur.lastrowid
     conn.commit()
+    vector_index.add_candidates(engine, [(candidate_id, cv_text)])
     conn.close()
+    rollups.invalidate()
     
     return jsonify({'message': 'Application submitted successfully!', 'redirect': url_for('core.dashboard')})
     
@@ -509,20 +573,21 @@ def generate_offer(candidate_id):
     try:
         cv_text = extract_text(path)
         # Weights
-        weights = {'overall_similarity': 0.5, 'skills': 0.3, 'experience': 0.2}
+        weights = job_weights.get_weights(job)
         
+        engine = scoring_engine.get_engine()
         score_data = engine.score_cv(cv_text, job['description'], weights)
         analysis = engine.analyze_candidate(cv_text, job['description'])
         
         conn.execute('''INSERT INTO candidates 
-                        (job_id, filename, semantic_score, skills_score, experience_score, total_score, full_text, missing_skills, interview_questions, user_id)
+                        (job_id, filename, semantic_score, skills_score, experience_score, total_score, document_hash, missing_skills, interview_questions, user_id)
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', 
                         (job_id, user['resume_path'], 
                          score_data['breakdown']['semantic_match'],
                          score_data['breakdown']['skills_match'],
                          score_data['breakdown']['experience_match'],
                          score_data['total_score'],
-                         cv_text,
+                         documents.store(conn, cv_text),
                          json.dumps(analysis['missing']),
                          json.dumps(analysis['questions']),
                          current_user.id
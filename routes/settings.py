@@ -1,6 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 import database
+import vector_index
+import rollups
+import documents
+import scoring_engine
 from flask_login import login_required, current_user
+from decorators import role_required
 
 bp = Blueprint('settings', __name__)
 
@@ -29,8 +34,25 @@ def reset_db():
         conn = database.get_db_connection()
         conn.execute("DELETE FROM candidates")
         conn.execute("DELETE FROM jobs")
+        documents.release(conn) # resume text; profile resumes stay
         conn.commit()
         conn.close()
+        rollups.invalidate()
+        vector_index.clear_candidates()
         flash('Database cleared successfully.', 'success')
         
     return redirect(url_for('settings.index'))
+
+@bp.route('/settings/stats')
+@login_required
+@role_required('recruiter')
+def stats():
+    """
+    Connection pool, scoring engine and embedding cache counters for this process.
+    """
+    engine_status = scoring_engine.engine_status()
+    return jsonify({
+        'database': database.pool_stats(),
+        'engine': engine_status,
+        'embedding_cache': scoring_engine.get_engine().cache.stats() if engine_status['ready'] else None
+    })
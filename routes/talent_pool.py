@@ -1,26 +1,95 @@
-from flask import Blueprint, render_template, request
+import datetime
+from flask import Blueprint, render_template, request, Response
 import database
+import vector_index
+import keyword_search
+import pagination
+import scoring_engine
+import exports
 
 bp = Blueprint('talent_pool', __name__)
 
 from flask_login import login_required
 from decorators import role_required
 
+# Columns shown in the listing (never the resume body)
+LIST_COLUMNS = 'id, job_id, name, filename, total_score, skills_score, created_at'
+
 @bp.route('/talent_pool')
 @login_required
 @role_required('recruiter')
 def index():
     query = request.args.get('q', '')
+    mode = request.args.get('mode', 'keyword')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = pagination.page_size()
     conn = database.get_db_connection()
+    scores = {}
+    notice = None
+    links = {'next_url': None, 'prev_url': None}
+    
+    engine = None
+    if query and mode == 'semantic':
+        try:
+            engine = scoring_engine.get_engine(timeout=0)
+        except scoring_engine.EngineNotReady:
+            notice = 'The semantic model is still loading. Showing keyword matches for now.'
+            mode = 'keyword'
+    if engine is not None:
+        index = vector_index.get_index()
+        if index.is_fresh(engine.model_version) and not index.rebuilding:
+            # One query encode + top-k over the memory-mapped candidate matrix
+            total, hits = index.search(engine.encode_query(query), offset=(page - 1) * per_page, limit=per_page)
+            scores = dict(hits)
+            rows = []
+            if hits:
+                placeholders = ','.join('?' * len(hits))
+                rows = conn.execute(f'SELECT {LIST_COLUMNS} FROM candidates WHERE id IN ({placeholders})',
+                                    [cid for cid, _ in hits]).fetchall()
+            candidates = sorted(rows, key=lambda row: -scores[row['id']])
+        else:
+            index.rebuild_in_background(engine)
+            notice = 'The semantic index is being built. Showing keyword matches for now.'
+            mode = 'keyword'
+    
+    if mode != 'semantic':
+        if query:
+            # Ranked full-text search (FTS5 / tsvector), with snippets
+            total, candidates = keyword_search.search(conn, query, limit=per_page, offset=(page - 1) * per_page)
+        else:
+            # Newest first, one keyset page at a time
+            listing = pagination.keyset_page(conn, LIST_COLUMNS, 'candidates', '1 = 1', [], ('created_at', 'id'),
+                                             per_page, after=request.args.get('after'), before=request.args.get('before'))
+            candidates = listing['rows']
+            total = pagination.count(conn, 'candidates', '1 = 1', [])
+            links = pagination.cursor_links(listing)
     
     if query:
-        # Simple SQL LIKE search
-        candidates = conn.execute(
-            "SELECT * FROM candidates WHERE filename LIKE ? OR full_text LIKE ? ORDER BY created_at DESC", 
-            (f'%{query}%', f'%{query}%')
-        ).fetchall()
-    else:
-        candidates = conn.execute('SELECT * FROM candidates ORDER BY created_at DESC').fetchall()
+        # Ranked results page by number; the result set is bounded by the page being asked for
+        links = pagination.links({'page': page + 1} if page * per_page < total else None,
+                                 {'page': page - 1} if page > 1 else None)
         
     conn.close()
-    return render_template('talent_pool.html', candidates=candidates, query=query)
+    return render_template('talent_pool.html', candidates=candidates, query=query, mode=mode,
+                           scores=scores, total=total, notice=notice, **links)
+
+@bp.route('/talent_pool/export')
+@login_required
+@role_required('recruiter')
+def export():
+    # Every matching candidate, streamed in batches (see exports.py)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return "Unknown export format", 400
+    since = request.args.get('since')
+    if since:
+        try:
+            since = datetime.date.fromisoformat(since).isoformat()
+        except ValueError:
+            return "since must be a YYYY-MM-DD date", 400
+    query = exports.pool_query(q=request.args.get('q'), job_id=request.args.get('job_id', type=int),
+                               status=request.args.get('status'),
+                               min_score=request.args.get('min_score', type=float),
+                               since=since)
+    return Response(exports.stream(query, exports.POOL_FIELDS, fmt), mimetype=exports.FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment;filename=talent_pool.{fmt}"})
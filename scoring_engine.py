@@ -1,101 +1,208 @@
 
 import os
-import torch
-from sentence_transformers import SentenceTransformer, util
+import re
+import time
+import hashlib
+import threading
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from embedding_cache import EmbeddingCache
+import skills
+
+# Bump when analyze_candidate output changes, so stored analyses are recomputed
+ANALYSIS_VERSION = '1'
+# How long a request waits for the model while it is still loading
+ENGINE_WAIT_TIMEOUT = float(os.getenv('ENGINE_WAIT_TIMEOUT', 30))
+# Inference backends (AI_INFERENCE_BACKEND):
+#   torch  fp32 PyTorch (default)
+#   int8   PyTorch with dynamic int8 quantization of the Linear layers (CPU only)
+#   onnx   ONNX Runtime; needs the optional `optimum[onnxruntime]` packages. The local
+#          weights are exported once and saved next to them (models/nexgen_cv_engine_onnx).
+# Compare speed and score drift with `python compare_backends.py`.
+BACKENDS = ('torch', 'int8', 'onnx')
+# CVs are encoded in chunks of at most this many words, cut at section boundaries, so no
+# part of a long CV falls past the model's 384-token window (resume text runs ~1.3-1.8
+# tokens per word). Counted in words so client mode (embedding_server.py) needs no tokenizer.
+CHUNK_WORDS = int(os.getenv('AI_CHUNK_WORDS', 200))
+# Sections shorter than this (in characters) are not scored on their own
+MIN_SECTION_CHARS = 20
+
+_WORD_RE = re.compile(r'\S+')
+
+def analysis_version():
+    """
+    Stamp for stored analyses. Needs only the skill taxonomy, not the model.
+    """
+    return f"{ANALYSIS_VERSION}:{skills.get_taxonomy().version}"
+
 
 class ScoringEngine:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, backend=None, local=False):
         """
         Initialize the NexGen Proprietary Scoring Engine.
         Default backbone: NexGen-CV-v1 (Customized Transformer).
+        backend overrides AI_INFERENCE_BACKEND (see BACKENDS).
+        With EMBEDDING_SOCKET set (and local=False) the model runs in the shared embedding
+        server (see embedding_server.py) and this process loads none.
         """
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        
         # Allow Model Overrides via Environment Variable (Important for Free Tier Scalability)
-        default_model = "all-mpnet-base-v2"
-        self.target_model = os.getenv('AI_MODEL_NAME', default_model)
+        self.default_model = "all-mpnet-base-v2"
+        self.target_model = os.getenv('AI_MODEL_NAME', self.default_model)
+        
+        self.backend = (backend or os.getenv('AI_INFERENCE_BACKEND', 'torch')).lower()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {self.backend!r} (expected one of: {', '.join(BACKENDS)})")
         
         self.model_name = f"NexGen-CV-Encoder-v1 ({self.target_model})"
         self.local_model_path = os.path.join(os.getcwd(), 'models', 'nexgen_cv_engine')
+        self.onnx_model_path = self.local_model_path + '_onnx'
+
+        self.model = None
+        socket_path = None if local else os.getenv('EMBEDDING_SOCKET')
+        if socket_path:
+            self.model = self._connect_server(socket_path)
+        if self.model is None:
+            self.model = self._load_model()
+
+        # Stamped on persisted embeddings so they are rebuilt when the model (or its numerics) changes
+        self.model_version = self.target_model if self.backend == 'torch' else f"{self.target_model}+{self.backend}"
+            
+        # Skill taxonomy, compiled once and shared (immutable)
+        self.skills = skills.get_taxonomy()
+        self.analysis_version = analysis_version()
+
+        # Text embeddings are cached by content hash, so a known CV is never re-encoded
+        self.cache = EmbeddingCache(self.model_version)
+
+        print(f"[{self.model_name}] Engine Online. Ready for semantic analysis.")
+
+    def _load_model(self):
+        """
+        Load the transformer into this process (sets self.device; may fall back self.backend).
+        """
+        # torch / sentence-transformers take seconds to import; only pay for them here
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if self.backend == 'int8' and self.device != 'cpu':
+            print("int8 quantization is CPU-only; using the torch fp32 backend on GPU.")
+            self.backend = 'torch'
         
-        print(f"[{self.model_name}] Initializing Neural Engine on {self.device.upper()}...")
+        print(f"[{self.model_name}] Initializing Neural Engine on {self.device.upper()} ({self.backend} backend)...")
         
         # Check if we should ignore local model and force download (e.g. if we switched models)
         # For simplicity, if AI_MODEL_NAME is set to something else, we ignore local custom weights.
+        local_weights = self.target_model == self.default_model
         
-        if self.target_model == default_model and os.path.exists(self.local_model_path):
+        model = self._load_onnx(SentenceTransformer, local_weights) if self.backend == 'onnx' else None
+        if model is not None:
+            pass # ONNX Runtime
+        elif local_weights and os.path.exists(self.local_model_path):
             print(f"[{self.model_name}] Loading proprietary weights from local storage...")
-            self.model = SentenceTransformer(self.local_model_path, device=self.device)
+            model = SentenceTransformer(self.local_model_path, device=self.device)
         else:
             print(f"[{self.model_name}] Model setup: Downloading optimized weights ({self.target_model})...")
-            self.model = SentenceTransformer(self.target_model, device=self.device)
+            model = SentenceTransformer(self.target_model, device=self.device)
             # Only cache if it's the default model to avoid polluting structure
-            if self.target_model == default_model:
+            if local_weights:
                 print(f"[{self.model_name}] Caching model to {self.local_model_path}...")
-                self.model.save(self.local_model_path)
-            
-        print(f"[{self.model_name}] Engine Online. Ready for semantic analysis.")
+                model.save(self.local_model_path)
+        if self.backend == 'int8':
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def _connect_server(self, socket_path):
+        """
+        Client mode: a RemoteModel for the embedding server, or None if it can't be reached.
+        The server's model settings win, so vectors match whichever process encoded them.
+        """
+        import embedding_server
+        print(f"[{self.model_name}] Connecting to the embedding server at {socket_path}...")
+        remote = embedding_server.RemoteModel(socket_path, self._load_model)
+        info = remote.info(wait=embedding_server.CONNECT_TIMEOUT)
+        if info is None:
+            print(f"[{self.model_name}] Embedding server unavailable; loading the model in-process.")
+            return None
+        self.target_model, self.backend, self.device = info['model'], info['backend'], info['device']
+        self.model_name = f"NexGen-CV-Encoder-v1 ({self.target_model})"
+        print(f"[{self.model_name}] Using the embedding server ({self.backend} on {self.device.upper()}).")
+        return remote
+
+    def _load_onnx(self, SentenceTransformer, local_weights):
+        """
+        The ONNX Runtime model, or None (falling back to torch) if the optional packages are missing.
+        """
+        if local_weights and os.path.exists(self.onnx_model_path):
+            source = self.onnx_model_path
+        elif local_weights and os.path.exists(self.local_model_path):
+            source = self.local_model_path
+        else:
+            source = self.target_model
+        try:
+            print(f"[{self.model_name}] Loading ONNX Runtime model from {source}...")
+            model = SentenceTransformer(source, device=self.device, backend='onnx')
+        except Exception as e:
+            print(f"[{self.model_name}] ONNX backend unavailable ({e}); using torch fp32.")
+            self.backend = 'torch'
+            return None
+        if local_weights and source != self.onnx_model_path:
+            print(f"[{self.model_name}] Caching ONNX export to {self.onnx_model_path}...")
+            model.save(self.onnx_model_path)
+        return model
 
     def compute_similarity(self, text1, text2):
         """
         Compute cosine similarity between two texts.
         """
-        embeddings1 = self.model.encode(text1, convert_to_tensor=True)
-        embeddings2 = self.model.encode(text2, convert_to_tensor=True)
-        
-        # util.cos_sim returns a tensor
-        score = util.cos_sim(embeddings1, embeddings2)
-        return score.item()
+        embeddings = self.encode_batch([text1, text2])
+        return float(np.dot(embeddings[0], embeddings[1]))
 
-    def extract_skills(self, text):
+    def encode(self, text):
         """
-        Advanced extraction using a categorized skill database.
+        Encode a single text into a normalized float32 vector.
         """
-        if not text:
-             return []
+        return self.encode_batch([text or ""])[0]
+
+    def encode_query(self, text):
+        """
+        Encode a search query. Queries are one-off, so they bypass the embedding cache.
+        """
+        return self.model.encode([text or ""], convert_to_numpy=True, normalize_embeddings=True,
+                                 show_progress_bar=False)[0].astype(np.float32)
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha256((text or "").encode('utf-8')).hexdigest()
 
-        # categorize skills for better context later
-        self.skill_categories = {
-            'languages': {'python', 'java', 'javascript', 'c++', 'c#', 'ruby', 'php', 'swift', 'rust', 'typescript', 'sql', 'matlab', 'kotlin', 'dart', 'scala', 'perl', 'lua', 'haskell', 'objective-c', 'assembly', 'vba', 'groovy'},
-            'web': {'react', 'angular', 'vue', 'node', 'flask', 'django', 'spring', 'asp.net', 'html', 'css', 'bootstrap', 'jquery', 'tailwind', 'sass', 'less', 'webpack', 'babel', 'next.js', 'nuxt.js', 'svelte', 'express', 'fastapi', 'laravel', 'symfony'},
-            'data': {'pandas', 'numpy', 'scikit-learn', 'tensorflow', 'pytorch', 'keras', 'hadoop', 'spark', 'tableau', 'power bi', 'excel', 'matplotlib', 'seaborn', 'plotly', 'airflow', 'kafka', 'flink', 'hive', 'pig', 'dbt', 'snowflake', 'databricks', 'alteryx'},
-            'cloud': {'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'terraform', 'ansible', 'circleci', 'git', 'gitlab', 'github', 'actions', 'prometheus', 'grafana', 'elk', 'splunk', 'nagios', 'openshift', 'heroku', 'digitalocean'},
-            'db': {'mysql', 'postgresql', 'mongodb', 'oracle', 'redis', 'cassandra', 'elasticsearch', 'dynamodb', 'sqlite', 'mariadb', 'mssql', 'db2', 'neo4j', 'couchbase', 'firebase', 'firestore', 'realm'},
-            'mobile': {'android', 'ios', 'flutter', 'react native', 'xamarin', 'ionic', 'cordova', 'unity', 'unreal'},
-            'soft': {'communication', 'leadership', 'teamwork', 'agile', 'scrum', 'problem solving', 'time management', 'presentation', 'collaboration', 'critical thinking', 'emotional intelligence', 'adaptability', 'creativity', 'negotiation', 'mentoring'}
+    def build_job_profile(self, jd_text):
+        """
+        Precompute everything about a JD that scoring needs, so it is done once per job
+        instead of once per CV.
+        """
+        jd_text = jd_text or ""
+        return {
+            'embedding': self.encode(jd_text),
+            'skills': sorted(self.extract_skills(jd_text)),
+            'jd_hash': self.hash_text(jd_text),
+            'model_version': self.model_version,
+            'skills_version': analysis_version() # jd skills follow the taxonomy
         }
-        
-        # Flatten for searching
-        all_skills = set()
-        for cat_skills in self.skill_categories.values():
-            all_skills.update(cat_skills)
-
-        found = set()
-        lower_text = text.lower()
-        # print(f"[DEBUG] Extracting skills from text length: {len(text)}. First 100 chars: {lower_text[:100]}")
-        
-        # Regex for word boundary to avoid partial matches (e.g. 'go' in 'google')
-        import re
-        for skill in all_skills:
-            # Escape skill for regex (e.g. c++)
-            pattern = r'\b' + re.escape(skill) + r'\b'
-            if re.search(pattern, lower_text):
-                found.add(skill)
-        
-        # Special handling for case-sensitive/ambiguous skills
-        # 'R' language - strictly UPPERCASE matching to avoid matching the letter 'r'
-        if re.search(r'\bR\b', text): # Use original text for case sensitivity
-            found.add('r')
-            self.skill_categories['languages'].add('r')
 
-        # 'Go' language - strictly Capitalized or 'golang'
-        if re.search(r'\bGo\b', text) or re.search(r'\bgolang\b', lower_text):
-            found.add('go')
-            self.skill_categories['languages'].add('go')
+    @property
+    def skill_categories(self):
+        """
+        Read-only category -> skills mapping from the compiled taxonomy.
+        """
+        return self.skills.categories
 
-        return list(found)
+    def extract_skills(self, text):
+        """
+        Advanced extraction using a categorized skill database.
+        Single pass over the text with the compiled taxonomy (see skills.py).
+        """
+        if not text:
+             return []
+        return list(self.skills.extract(text))
 
     def extract_years_of_experience(self, text):
         """
@@ -128,19 +235,19 @@ class ScoringEngine:
         
         return max_years if max_years > 0 else 0
 
-    def analyze_candidate(self, cv_text, jd_text):
+    def analyze_candidate(self, cv_text, jd_text, job_profile=None):
         """
         Extract skills from both, find gaps, and generate questions.
+        If a job profile is given, its precomputed JD skills are used.
         """
         if not cv_text: cv_text = ""
         if not jd_text: jd_text = ""
 
-        # Ensure categories are loaded
-        if not hasattr(self, 'skill_categories'):
-             self.extract_skills("") # Init categories
-             
         cv_skills = set(self.extract_skills(cv_text))
-        jd_skills = set(self.extract_skills(jd_text))
+        if job_profile is not None:
+            jd_skills = set(job_profile['skills'])
+        else:
+            jd_skills = set(self.extract_skills(jd_text))
         
         missing = list(jd_skills - cv_skills)
         matching = list(jd_skills.intersection(cv_skills))
@@ -181,11 +288,7 @@ class ScoringEngine:
             questions.append("Your profile is a strong match. Which of the required skills do you consider your strongest asset and why?")
         else:
             # Group missing skills by category to ask smarter questions
-            missing_cats = set()
-            for skill in missing_skills:
-                for cat, skills in self.skill_categories.items():
-                    if skill in skills:
-                        missing_cats.add(cat)
+            missing_cats = {self.skills.category_of[s] for s in missing_skills if s in self.skills.category_of}
             
             # Generate questions for up to 2 missing categories
             for cat in list(missing_cats)[:2]:
@@ -207,10 +310,55 @@ class ScoringEngine:
 
         return questions[:4] # Return top 4 unique questions
 
-    def score_cv(self, cv_text, jd_text, weights=None):
+    def score_cv(self, cv_text, jd_text, weights=None, job_profile=None):
 
         """
         Compute a comprehensive score for the CV against the JD.
+        If a job profile is given, its precomputed JD embedding is used.
+        """
+        return self.score_cvs([cv_text], jd_text, weights, job_profile=job_profile)[0]
+
+    def encode_batch(self, texts, batch_size=32):
+        """
+        Encode many texts in a single model call. Returns normalized float32 rows.
+        Texts already in the embedding cache are not encoded; duplicate strings are only
+        encoded once; sentence-transformers sorts the batch by length internally so
+        padding per mini-batch stays small.
+        """
+        keys = [self.hash_text(t) for t in texts]
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing[key] = text
+        if missing:
+            encoded = self.model.encode(list(missing.values()), batch_size=batch_size, convert_to_numpy=True,
+                                        normalize_embeddings=True, show_progress_bar=False).astype(np.float32)
+            # put_many hands back the stored (float16-rounded) vectors, so a score is the
+            # same whether its embedding came from the model or from the cache
+            vectors.update(self.cache.put_many(dict(zip(missing.keys(), encoded))))
+
+        return np.stack([vectors[k] for k in keys])
+
+    @staticmethod
+    def chunk_spans(text, start=0, end=None):
+        """
+        Split text[start:end] into [(start, end, words)] chunks of at most CHUNK_WORDS words.
+        """
+        words = [m.span() for m in _WORD_RE.finditer(text, start, len(text) if end is None else end)]
+        return [(words[i][0], words[min(i + CHUNK_WORDS, len(words)) - 1][1], min(CHUNK_WORDS, len(words) - i))
+                for i in range(0, len(words), CHUNK_WORDS)]
+
+    def score_cvs(self, cv_texts, jd_text, weights=None, job_profile=None):
+        """
+        Batch version of score_cv. Each CV is split once into section-aligned chunks and all
+        chunks from all CVs go through one encode call. The whole-CV and skills/experience
+        embeddings are then pooled from the chunk vectors of their character spans, so the
+        full length of a CV counts and no text is encoded twice.
+        Returns a list of score dicts in the same order as cv_texts.
         """
         if weights is None:
             # Default weights
@@ -219,27 +367,79 @@ class ScoringEngine:
                 'skills': 0.3, # We will try to extract skills specifically if possible
                 'experience': 0.2
             }
-        
-        # 1. Overall Semantic Match (The core "AI" score)
-        overall_score = self.compute_similarity(cv_text, jd_text)
-        
-        # 2. Key Term Matching (Simple Hybrid Approach)
-        from cv_parser import parse_cv_sections
-        sections = parse_cv_sections(cv_text)
-        
-        # Skill Score: Compare CV 'skills' section specifically to JD
-        if sections.get('skills') and len(sections['skills']) > 20: 
-             skill_score = self.compute_similarity(sections['skills'], jd_text)
-        else:
-            # Fallback if no skills section detected, use overall
-            skill_score = overall_score
-            
-        # Experience Score: Compare CV 'experience' section to JD
-        if sections.get('experience') and len(sections['experience']) > 20:
-            experience_score = self.compute_similarity(sections['experience'], jd_text)
+        if not cv_texts:
+            return []
+
+        # The JD is encoded at most once per batch (zero times with a job profile)
+        if job_profile is not None:
+            jd_embedding = job_profile['embedding']
         else:
-            experience_score = overall_score
+            jd_embedding = self.encode(jd_text)
 
+        layouts, vectors = self._encode_chunks(cv_texts)
+
+        results = []
+        for chunks in layouts:
+            # 1. Overall Semantic Match (The core "AI" score), over every chunk
+            overall_score = float(self._pool(vectors, chunks) @ jd_embedding)
+            # 2. Section scores fall back to overall if the section was not detected
+            skill_score = experience_score = overall_score
+            skills_chunks = [c for c in chunks if c[0] == 'skills']
+            if skills_chunks:
+                skill_score = float(self._pool(vectors, skills_chunks) @ jd_embedding)
+            experience_chunks = [c for c in chunks if c[0] == 'experience']
+            if experience_chunks:
+                experience_score = float(self._pool(vectors, experience_chunks) @ jd_embedding)
+            results.append(self._combine_scores(overall_score, skill_score, experience_score, weights))
+        return results
+
+    def encode_documents(self, texts):
+        """
+        Whole-document vectors (e.g. for the talent pool index), pooled from the same
+        cached chunk vectors score_cvs uses, so a scored CV is never encoded again.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        layouts, vectors = self._encode_chunks(texts)
+        return np.stack([self._pool(vectors, chunks) for chunks in layouts])
+
+    def _encode_chunks(self, cv_texts):
+        """
+        Split each CV at its section boundaries into chunks and encode all of them in one call.
+        Returns (per CV [(section, row, word count)], chunk vectors).
+        """
+        from cv_parser import section_spans
+        texts = []
+        layouts = []
+        for cv_text in cv_texts:
+            cv_text = cv_text or ""
+            chunks = []
+            for section, start, end in section_spans(cv_text):
+                # Skill Score / Experience Score: compare those sections specifically to JD
+                if section in ('skills', 'experience') and end - start <= MIN_SECTION_CHARS:
+                    section = 'other'
+                for chunk_start, chunk_end, words in self.chunk_spans(cv_text, start, end):
+                    chunks.append((section, len(texts), words))
+                    texts.append(cv_text[chunk_start:chunk_end])
+            if not chunks:
+                chunks.append(('other', len(texts), 1))
+                texts.append(cv_text)
+            layouts.append(chunks)
+        return layouts, self.encode_batch(texts)
+
+    @staticmethod
+    def _pool(vectors, chunks):
+        """
+        Word-weighted mean of some chunk vectors, renormalized.
+        """
+        if len(chunks) == 1:
+            return vectors[chunks[0][1]]
+        weights = np.array([words for _, _, words in chunks], dtype=np.float32)
+        pooled = weights @ vectors[[index for _, index, _ in chunks]]
+        norm = np.linalg.norm(pooled)
+        return (pooled / norm if norm > 0 else pooled).astype(np.float32)
+
+    def _combine_scores(self, overall_score, skill_score, experience_score, weights):
         # Weighted Total
         # Normalize scores (they are cosine sim -1 to 1, but usually 0 to 1 for text)
         overall_score = max(0, overall_score)
@@ -260,3 +460,79 @@ class ScoringEngine:
                 "experience_match": round(experience_score * 100, 2)
             }
         }
+
+
+# --- Shared engine ---
+# The app uses one engine per process. It is created on first use, or ahead of time by
+# start_warmup() at boot, so routes that don't score can serve while the model loads.
+
+class EngineNotReady(RuntimeError):
+    pass
+
+_engine = None
+_engine_error = None
+_engine_load_seconds = None
+_engine_loaded = threading.Event()
+_engine_lock = threading.Lock()
+_warmup_thread = None
+
+
+def _load_engine():
+    global _engine, _engine_error, _engine_load_seconds
+    start = time.monotonic()
+    engine, error = None, None
+    try:
+        engine = ScoringEngine()
+        engine.encode_query("warm-up") # first forward pass, outside any request
+    except Exception as e:
+        print(f"Scoring engine failed to load: {e}")
+        engine, error = None, str(e)
+    finally:
+        with _engine_lock:
+            _engine = engine
+            _engine_error = error
+            _engine_load_seconds = round(time.monotonic() - start, 2)
+            _engine_loaded.set()
+
+
+def start_warmup():
+    """
+    Load the shared engine in a background thread. No-op while it is loaded or loading;
+    after a failed load it tries again (the last error is reported until that one finishes).
+    """
+    global _warmup_thread
+    with _engine_lock:
+        if _engine is not None or (_warmup_thread is not None and _warmup_thread.is_alive()):
+            return
+        _engine_loaded.clear()
+        _warmup_thread = threading.Thread(target=_load_engine, name="engine-warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def get_engine(timeout=ENGINE_WAIT_TIMEOUT):
+    """
+    The shared ScoringEngine, waiting up to `timeout` seconds (None = forever) for it to load.
+    Raises EngineNotReady if it is still loading or failed to load.
+    """
+    if _engine is not None:
+        return _engine
+    start_warmup()
+    _engine_loaded.wait(timeout)
+    with _engine_lock:
+        engine, error = _engine, _engine_error
+    if engine is None:
+        raise EngineNotReady(error or "The scoring model is still loading")
+    return engine
+
+
+def engine_status():
+    with _engine_lock:
+        engine, error, load_seconds = _engine, _engine_error, _engine_load_seconds
+        loading = _warmup_thread is not None and _warmup_thread.is_alive()
+    return {
+        'ready': engine is not None,
+        'loading': loading,
+        'error': error,
+        'load_seconds': load_seconds if not loading else None,
+        'model': engine.model_version if engine is not None else None
+    }
@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import threading
+from types import MappingProxyType
+
+# Skill Taxonomy & Matcher
+# The taxonomy (categories, synonyms, case-sensitive names) lives in data/skills.json.
+# It is compiled once into a token trie, so extraction is a single pass over the text
+# no matter how many skills the taxonomy holds.
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'skills.json')
+
+# Tokens keep the characters skills are spelled with: c++, c#, asp.net, objective-c
+TOKEN_RE = re.compile(r'\w+[+#]*(?:[.\-]\w+[+#]*)*')
+END = '$' # trie terminal key
+
+
+def _tokens(text):
+    return TOKEN_RE.findall(text)
+
+
+class SkillTaxonomy:
+    """
+    Immutable, compiled skill taxonomy. Safe to share between request threads.
+    """
+    def __init__(self, categories, synonyms=None, case_sensitive=None, version=None):
+        self.version = version
+        # category -> frozenset(skills), and skill -> category
+        self.categories = MappingProxyType({cat: frozenset(s.lower() for s in skills)
+                                            for cat, skills in categories.items()})
+        self.category_of = MappingProxyType({skill: cat for cat, skills in self.categories.items()
+                                             for skill in skills})
+        # Exact-case surface forms (e.g. 'R', 'Go') that would be ambiguous in lowercase
+        self.case_sensitive = MappingProxyType(dict(case_sensitive or {}))
+        exact_only = set(self.case_sensitive.values())
+
+        # Surface form -> canonical skill
+        surface = {skill: skill for skill in self.category_of if skill not in exact_only}
+        for alias, canonical in (synonyms or {}).items():
+            canonical = canonical.lower()
+            if canonical not in self.category_of:
+                raise ValueError(f"Synonym '{alias}' points to unknown skill '{canonical}'")
+            surface[alias.lower()] = canonical
+
+        # Trie over token sequences, so multi-word skills ('power bi') match in the same pass
+        trie = {}
+        self.max_phrase = 1
+        for form, canonical in surface.items():
+            words = _tokens(form)
+            if ' '.join(words) != form:
+                raise ValueError(f"Skill '{form}' cannot be tokenized as written")
+            node = trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node[END] = canonical
+            self.max_phrase = max(self.max_phrase, len(words))
+        self._trie = trie
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['categories'], data.get('synonyms'), data.get('case_sensitive'), data.get('version'))
+
+    def _lookup(self, word):
+        node = self._trie.get(word)
+        return node.get(END) if node else None
+
+    def extract(self, text):
+        """
+        Return the set of canonical skills mentioned in the text.
+        """
+        found = set()
+        if not text:
+            return found
+
+        tokens = _tokens(text)
+        lowered = [t.lower() for t in tokens]
+        for i, token in enumerate(tokens):
+            # Exact-case names ('R', 'Go')
+            if token in self.case_sensitive:
+                found.add(self.case_sensitive[token])
+
+            # Longest phrase starting here
+            node = self._trie
+            for word in lowered[i:i + self.max_phrase]:
+                node = node.get(word)
+                if node is None:
+                    break
+                if END in node:
+                    found.add(node[END])
+
+            # Compound tokens also match their parts, like a \b regex would
+            # ('node.js' -> node, 'spring-boot' -> spring, 'python+' -> python)
+            word = lowered[i]
+            if '.' in word or '-' in word or word[-1] in '+#':
+                for part in re.split(r'[.\-]', word):
+                    for candidate in (part, part.rstrip('+#')):
+                        skill = self._lookup(candidate)
+                        if skill:
+                            found.add(skill)
+        return found
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_taxonomy():
+    """
+    The process-wide taxonomy, compiled on first use (SKILL_TAXONOMY_PATH overrides the file).
+    """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = SkillTaxonomy.from_file(os.getenv('SKILL_TAXONOMY_PATH', DEFAULT_PATH))
+    return _default
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+import shutil
+import zipfile
+import tempfile
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bulk_import
+
+class ListFilesTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, data=b'cv'):
+        path = os.path.join(self.dir, 'src', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def test_directory_is_walked_in_a_stable_order(self):
+        for name in ['b.pdf', 'a/z.DOCX', 'a/notes.md', 'c.txt', 'a/b/y.txt']:
+            self.write(name, name.encode())
+        files = bulk_import.list_files(os.path.join(self.dir, 'src'))
+        self.assertEqual([name for name, _ in files], ['a/b/y.txt', 'a/z.DOCX', 'b.pdf', 'c.txt'])
+        with files[0][1]() as f:
+            self.assertEqual(f.read(), b'a/b/y.txt')
+
+    def test_zip_members_skip_folders_and_mac_metadata(self):
+        path = os.path.join(self.dir, 'cvs.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('cvs/', '')
+            archive.writestr('cvs/2.txt', 'two')
+            archive.writestr('cvs/1.pdf', 'one')
+            archive.writestr('__MACOSX/cvs/._1.pdf', 'junk')
+            archive.writestr('cvs/readme.rtf', 'skip')
+        files = bulk_import.list_files(path)
+        self.assertEqual([name for name, _ in files], ['cvs/1.pdf', 'cvs/2.txt'])
+        with files[1][1]() as f:
+            self.assertEqual(f.read(), b'two')
+        with self.assertRaises(ValueError):
+            bulk_import.list_files(os.path.join(self.dir, 'cvs.zip.missing'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scoring_engine
+from cv_parser import section_spans, parse_cv_sections
+from embedding_cache import EmbeddingCache
+
+class KeywordModel:
+    """Embeds a text by which of a few keywords it contains; records every encode call."""
+    KEYWORDS = ['python', 'manager', 'university', 'alice']
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True,
+               show_progress_bar=False):
+        self.calls.append(list(texts))
+        rows = np.array([[1.0 if k in t.lower() else 0.0 for k in self.KEYWORDS] + [0.1] for t in texts],
+                        dtype=np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+def make_engine():
+    engine = scoring_engine.ScoringEngine.__new__(scoring_engine.ScoringEngine)
+    engine.model = KeywordModel()
+    engine.cache = EmbeddingCache('test', persistent=False)
+    return engine
+
+class ChunkingTests(unittest.TestCase):
+    def test_section_spans_match_parsed_sections(self):
+        text = "Alice Smith\nSkills\npython, sql\nExperience\n5 years at Acme\nEducation\nBSc"
+        sections = parse_cv_sections(text)
+        for name, start, end in section_spans(text):
+            self.assertEqual(text[start:end], sections[name])
+        self.assertEqual(section_spans("no headings here"), [('other', 0, 16)])
+
+    def test_chunk_spans_are_word_bounded(self):
+        text = ' '.join(f"w{i}" for i in range(450))
+        chunks = scoring_engine.ScoringEngine.chunk_spans(text)
+        self.assertEqual([words for _, _, words in chunks], [200, 200, 50])
+        self.assertEqual(' '.join(text[s:e] for s, e, _ in chunks), text)
+        self.assertEqual(scoring_engine.ScoringEngine.chunk_spans("   "), [])
+
+    def test_long_cv_is_covered_in_one_encode_call(self):
+        engine = make_engine()
+        filler = ' '.join(['worked'] * 500)
+        cv = ("Alice\nSkills\npython and more python tooling\nExperience\n" + filler +
+              " manager of the python team")
+        jd = np.array([1, 0, 0, 0, 0], dtype=np.float32) # "python"
+        bob = "Bob\nno headings at all"
+        scores = engine.score_cvs([cv, bob], None, job_profile={'embedding': jd})
+        self.assertEqual(len(engine.model.calls), 1)
+        # Each chunk encoded once; the tail of the long experience section was seen
+        texts = engine.model.calls[0]
+        self.assertTrue(any('manager of the python team' in t for t in texts))
+        self.assertEqual(sum(len(t.split()) for t in texts), len(cv.split()) + len(bob.split()))
+        alice, bob = scores
+        self.assertGreater(alice['breakdown']['skills_match'], alice['breakdown']['semantic_match'])
+        self.assertEqual(bob['breakdown']['skills_match'], bob['breakdown']['semantic_match'])
+
+class BatchScoringTests(unittest.TestCase):
+    CVS = [
+        "Alice\nSkills\npython, django and postgres\nExperience\n6 years as engineering manager",
+        "Bob\nExperience\nUniversity lab technician for ten years\nSkills\nexcel",
+        "Carol, no headings, python",
+        "Dan\nEducation\nUniversity of Somewhere, BSc\nSkills\npython and rust systems work",
+        "",
+    ]
+    JD = "python manager"
+
+    def test_batch_matches_per_cv_scores_in_one_encode_call(self):
+        batched = make_engine()
+        scores = batched.score_cvs(self.CVS, self.JD)
+        self.assertEqual(len(batched.model.calls), 2) # the JD, then every chunk of every CV
+
+        single = make_engine()
+        self.assertEqual([single.score_cv(cv, self.JD) for cv in self.CVS], scores)
+        self.assertEqual(len(single.model.calls), 1 + len(self.CVS))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+
+class PlaceholderTranslationTests(unittest.TestCase):
+    def test_question_marks_become_pyformat(self):
+        self.assertEqual(database._to_pyformat('SELECT * FROM t WHERE a = ? AND b IN (?, ?)'),
+                         'SELECT * FROM t WHERE a = %s AND b IN (%s, %s)')
+
+    def test_literals_and_percent_signs(self):
+        self.assertEqual(database._to_pyformat("SELECT '?' , 'it''s ?' FROM t WHERE a LIKE ? AND b = '50%'"),
+                         "SELECT '?' , 'it''s ?' FROM t WHERE a LIKE %s AND b = '50%%'")
+
+class PostgresLastRowIdTests(unittest.TestCase):
+    class FakeCursor:
+        def __init__(self, log):
+            self.log = log
+        def execute(self, sql, params=None):
+            self.log.append(sql)
+        def fetchone(self):
+            return (42,)
+
+    class FakePool:
+        postgres = True
+        def release(self, raw):
+            pass
+
+    def test_serial_inserts_return_their_id_with_the_statement(self):
+        log = []
+        raw = mock.Mock()
+        raw.cursor.side_effect = lambda: self.FakeCursor(log)
+        conn = database.Connection(self.FakePool(), raw)
+        cur = conn.execute('INSERT INTO candidates (job_id) VALUES (?)', (1,))
+        conn.close()
+        self.assertEqual(cur.lastrowid, 42) # still valid once the connection is back in the pool
+        self.assertEqual(log, ['INSERT INTO candidates (job_id) VALUES (%s) RETURNING id'])
+        conn = database.Connection(self.FakePool(), raw)
+        self.assertIsNone(conn.execute('INSERT INTO documents (content_hash) VALUES (?)', ('h',)).lastrowid)
+        self.assertEqual(log[-1], 'INSERT INTO documents (content_hash) VALUES (%s)')
+
+class SqlitePoolTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.old_name = database.DB_NAME
+        database.DB_NAME = os.path.join(self.dir, 'test.db')
+        with database.get_db_connection() as conn:
+            conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, v TEXT)')
+
+    def tearDown(self):
+        database.DB_NAME = self.old_name
+        shutil.rmtree(self.dir)
+
+    def test_connections_are_reused_and_in_wal_mode(self):
+        before = database.pool_stats()
+        for _ in range(5):
+            conn = database.get_db_connection()
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            conn.close()
+        stats = database.pool_stats()
+        self.assertEqual(stats['created'], before['created'])
+        self.assertEqual(stats['checkouts'], before['checkouts'] + 5)
+        self.assertEqual(stats['in_use'], 0)
+
+    def test_context_manager_commits_or_rolls_back(self):
+        with database.get_db_connection() as conn:
+            cur = conn.execute('INSERT INTO t (v) VALUES (?)', ('kept',))
+            self.assertEqual(cur.lastrowid, 1)
+        with self.assertRaises(ValueError):
+            with database.get_db_connection() as conn:
+                conn.execute('INSERT INTO t (v) VALUES (?)', ('dropped',))
+                raise ValueError()
+        # Released without commit: rolled back, not left open on the pooled connection
+        conn = database.get_db_connection()
+        conn.execute('INSERT INTO t (v) VALUES (?)', ('abandoned',))
+        conn.close()
+        with database.get_db_connection() as conn:
+            self.assertEqual([row['v'] for row in conn.execute('SELECT v FROM t')], ['kept'])
+
+    def test_threads_share_the_pool(self):
+        def work():
+            for _ in range(20):
+                with database.get_db_connection() as conn:
+                    conn.execute('INSERT INTO t (v) VALUES (?)', ('x',))
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with database.get_db_connection() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], 80)
+        self.assertLessEqual(database.pool_stats()['open'], 5)
+
+class SessionUserTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.old_name = database.DB_NAME
+        database.DB_NAME = os.path.join(self.dir, 'test.db')
+        with database.get_db_connection() as conn:
+            conn.execute('''CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, password_hash TEXT,
+                            role TEXT, resume_path TEXT, skills TEXT, experience TEXT, education TEXT, profile_summary TEXT)''')
+            conn.execute("INSERT INTO users VALUES (1, 'Ann', 'ann@x.io', 'h', 'candidate', 'k.pdf', '[\"python\"]', NULL, NULL, NULL)")
+
+    def tearDown(self):
+        database.User.invalidate(1)
+        database.DB_NAME = self.old_name
+        shutil.rmtree(self.dir)
+
+    def test_session_user_is_slim_and_cached_until_invalidated(self):
+        user = database.User.get('1')
+        self.assertEqual((user.id, user.name, user.role), (1, 'Ann', 'candidate'))
+        self.assertNotIn('skills', vars(user))
+        self.assertEqual(user.skills, '["python"]') # loaded on access
+        self.assertIsNone(database.User.get('2'))
+
+        with database.get_db_connection() as conn:
+            conn.execute("UPDATE users SET role = 'recruiter' WHERE id = 1")
+        checkouts = database.pool_stats()['checkouts']
+        self.assertEqual(database.User.get('1').role, 'candidate') # cached, no connection used
+        self.assertEqual(database.pool_stats()['checkouts'], checkouts)
+        database.User.invalidate(1)
+        self.assertEqual(database.User.get('1').role, 'recruiter')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import documents
+
+class DocumentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('CREATE TABLE documents (content_hash TEXT PRIMARY KEY, body BLOB NOT NULL, raw_size INTEGER)')
+        self.conn.execute('CREATE TABLE candidates (id INTEGER PRIMARY KEY, full_text TEXT, document_hash TEXT)')
+        self.conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, resume_document_hash TEXT)')
+
+    def test_codecs_round_trip(self):
+        text = 'Python developer – ünïcode\n' * 50
+        for codec in (documents.CODEC_RAW, documents.CODEC_ZLIB):
+            self.assertEqual(documents.decode(documents.encode(text, codec)), text)
+        self.assertLess(len(documents.encode(text, documents.CODEC_ZLIB)), len(text.encode('utf-8')))
+
+    def test_identical_text_is_stored_once(self):
+        first = documents.store(self.conn, 'same resume')
+        second = documents.store(self.conn, 'same resume')
+        self.assertEqual(first, second)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0], 1)
+        self.assertEqual(documents.load(self.conn, first), 'same resume')
+
+    def test_migrate_inline_text(self):
+        self.conn.executemany('INSERT INTO candidates (id, full_text) VALUES (?, ?)',
+                              [(1, 'resume one'), (2, 'resume two'), (3, 'resume one'), (4, None)])
+        self.assertEqual(documents.migrate_inline_text(self.conn), 3)
+        rows = self.conn.execute('SELECT * FROM candidates ORDER BY id').fetchall()
+        self.assertTrue(all(row['full_text'] is None for row in rows))
+        self.assertEqual(rows[0]['document_hash'], rows[2]['document_hash'])
+        self.assertEqual(documents.candidate_texts(self.conn, rows), ['resume one', 'resume two', 'resume one', None])
+        self.assertEqual(documents.candidate_text(self.conn, rows[1]), 'resume two')
+
+    def test_release_deletes_only_unreferenced_documents(self):
+        shared, single, profile = (documents.store(self.conn, text) for text in ('shared', 'single', 'profile'))
+        self.conn.executemany('INSERT INTO candidates (id, document_hash) VALUES (?, ?)',
+                              [(1, shared), (2, shared), (3, single), (4, profile)])
+        self.conn.execute('INSERT INTO users (id, resume_document_hash) VALUES (1, ?)', (profile,))
+
+        self.conn.execute('DELETE FROM candidates WHERE id IN (1, 3, 4)')
+        self.assertEqual(documents.release(self.conn, [shared, single, profile, None]), 1)
+        self.assertIsNone(documents.load(self.conn, single))
+        self.assertEqual(documents.load(self.conn, shared), 'shared') # candidate 2 still points at it
+        self.assertEqual(documents.load(self.conn, profile), 'profile') # a profile resume
+
+        self.conn.execute('DELETE FROM candidates')
+        self.assertEqual(documents.release(self.conn), 1)
+        self.assertEqual([row[0] for row in self.conn.execute('SELECT content_hash FROM documents')], [profile])
+
+if __name__ == '__main__':
+    unittest.main()
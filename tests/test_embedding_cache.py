@@ -0,0 +1,39 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from embedding_cache import EmbeddingCache
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self):
+        # Memory tier only, no database needed
+        self.cache = EmbeddingCache('test-model', max_items=2, persistent=False)
+
+    def test_hit_and_miss_counters(self):
+        self.cache.put_many({'a': np.ones(4, dtype=np.float32)})
+        found = self.cache.get_many(['a', 'b'])
+        self.assertIn('a', found)
+        self.assertNotIn('b', found)
+        stats = self.cache.stats()
+        self.assertEqual(stats['memory_hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_lru_eviction(self):
+        self.cache.put_many({'a': np.zeros(4), 'b': np.zeros(4)})
+        self.cache.get_many(['a']) # 'a' is now most recently used
+        self.cache.put_many({'c': np.zeros(4)})
+        found = self.cache.get_many(['a', 'b', 'c'])
+        self.assertEqual(set(found), {'a', 'c'})
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_vectors_are_float16_rounded(self):
+        stored = self.cache.put_many({'a': np.array([0.1, 0.2], dtype=np.float32)})
+        self.assertEqual(stored['a'].dtype, np.float32)
+        np.testing.assert_array_equal(stored['a'], np.float16([0.1, 0.2]).astype(np.float32))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import embedding_server
+
+class FakeModel:
+    """Encodes each text as [len(text), 1, 0, 0] and records batch sizes."""
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=False):
+        self.batches.append(len(texts))
+        return np.array([[len(t), 1, 0, 0] for t in texts], dtype=np.float32)
+
+class FakeEngine:
+    model_version = 'fake'
+    target_model = 'fake'
+    backend = 'torch'
+    device = 'cpu'
+
+    def __init__(self):
+        self.model = FakeModel()
+
+class EmbeddingServerTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.path = os.path.join(self.dir, 'embed.sock')
+        self.engine = FakeEngine()
+        self.server = embedding_server.EmbeddingServer(self.engine, self.path, coalesce_ms=200)
+        self.server.bind()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.close)
+
+    def test_concurrent_requests_are_coalesced(self):
+        client = embedding_server.RemoteModel(self.path, load_local=None)
+        self.assertEqual(client.info(wait=5)['model_version'], 'fake')
+        results = {}
+
+        def encode(i):
+            results[i] = client.encode(['x' * i, 'y'], normalize_embeddings=True)
+
+        threads = [threading.Thread(target=encode, args=(i,)) for i in range(1, 5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(self.engine.model.batches, [8])
+        for i in range(1, 5):
+            self.assertEqual(results[i].shape, (2, 4))
+            self.assertEqual(results[i][0][0], i)
+
+    def test_falls_back_to_in_process_model(self):
+        local = FakeModel()
+        client = embedding_server.RemoteModel(os.path.join(self.dir, 'missing.sock'), load_local=lambda: local)
+        self.assertIsNone(client.info(wait=0))
+        vectors = client.encode(['abc'], normalize_embeddings=True)
+        self.assertEqual(vectors[0][0], 3)
+        self.assertEqual(local.batches, [1])
+        self.assertEqual(self.engine.model.batches, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import threading
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scoring_engine
+
+class SlowEngine:
+    release = threading.Event()
+    fail = False
+    model_version = 'test-model'
+
+    def __init__(self):
+        SlowEngine.release.wait(5)
+        if SlowEngine.fail:
+            raise OSError('download failed')
+
+    def encode_query(self, text):
+        return None
+
+class EngineWarmupTests(unittest.TestCase):
+    def setUp(self):
+        # Start from a fresh shared-engine state, whatever ran before
+        self.reset()
+        SlowEngine.release.clear()
+        SlowEngine.fail = False
+        patcher = mock.patch.object(scoring_engine, 'ScoringEngine', SlowEngine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        SlowEngine.release.set()
+        if scoring_engine._warmup_thread is not None:
+            scoring_engine._warmup_thread.join(5)
+        scoring_engine._engine = None
+        scoring_engine._engine_error = None
+        scoring_engine._engine_load_seconds = None
+        scoring_engine._engine_loaded = threading.Event()
+        scoring_engine._warmup_thread = None
+
+    def test_requests_wait_for_warmup(self):
+        scoring_engine.start_warmup()
+        self.assertTrue(scoring_engine.engine_status()['loading'])
+        with self.assertRaises(scoring_engine.EngineNotReady):
+            scoring_engine.get_engine(timeout=0)
+        SlowEngine.release.set()
+        engine = scoring_engine.get_engine(timeout=5)
+        self.assertIsInstance(engine, SlowEngine)
+        self.assertIs(scoring_engine.get_engine(timeout=0), engine)
+        self.assertTrue(scoring_engine.engine_status()['ready'])
+
+    def test_failed_load_is_reported_and_retried(self):
+        SlowEngine.fail = True
+        SlowEngine.release.set()
+        with self.assertRaisesRegex(scoring_engine.EngineNotReady, 'download failed'):
+            scoring_engine.get_engine(timeout=5)
+        self.assertEqual(scoring_engine.engine_status()['error'], 'download failed')
+        SlowEngine.fail = False
+        self.assertIsInstance(scoring_engine.get_engine(timeout=5), SlowEngine)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+import csv
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import exports
+
+class ExportTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.old_name = database.DB_NAME
+        database.DB_NAME = os.path.join(self.dir, 'test.db')
+        with database.get_db_connection() as conn:
+            conn.execute('CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT)')
+            conn.execute('''CREATE TABLE candidates (id INTEGER PRIMARY KEY, job_id INTEGER, name TEXT, email TEXT,
+                            filename TEXT, total_score REAL, semantic_score REAL, skills_score REAL,
+                            experience_score REAL, status TEXT, missing_skills TEXT, created_at TIMESTAMP)''')
+            conn.executemany('INSERT INTO jobs (id, title) VALUES (?, ?)', [(1, 'Dev'), (2, 'Ops')])
+            conn.executemany('''INSERT INTO candidates (job_id, filename, total_score, semantic_score, skills_score,
+                                experience_score, status, missing_skills, created_at) VALUES (?, ?, ?, 50, 50, 50, ?, ?, ?)''',
+                             [(1 + i % 2, f'cv{i}.pdf', i, 'Offer' if i % 3 == 0 else None, json.dumps(['docker']),
+                               f'2026-01-{1 + i % 28:02d}') for i in range(25)])
+
+    def tearDown(self):
+        database.DB_NAME = self.old_name
+        shutil.rmtree(self.dir)
+
+    def test_job_csv_is_ranked_and_streamed_in_batches(self):
+        with mock.patch.object(exports, 'BATCH_SIZE', 5):
+            chunks = list(exports.stream(exports.job_query(1), exports.JOB_FIELDS, 'csv', ranked=True))
+        # The original export's header and cell formats
+        self.assertEqual(chunks[0], 'Rank,Candidate Filename,Total Score,Semantic Score,Skills Score,'
+                                    'Experience Score,Missing Skills\r\n')
+        self.assertEqual(len(chunks), 1 + 2 + 1) # header, 13 rows: two full batches of 5, then the rest
+        self.assertTrue(chunks[1].startswith('1,cv24.pdf,24.00,50.00,50.00,50.00,"[""docker""]"\r\n'))
+        rows = list(csv.reader(''.join(chunks).splitlines()))[1:]
+        self.assertEqual(len(rows), 13)
+
+        records = [json.loads(line) for line in ''.join(exports.stream(exports.job_query(1), exports.JOB_NDJSON_FIELDS,
+                                                                      'ndjson', ranked=True)).splitlines()]
+        self.assertEqual(records[0], {'rank': 1, 'filename': 'cv24.pdf', 'total_score': 24, 'semantic_score': 50,
+                                      'skills_score': 50, 'experience_score': 50, 'missing_skills': ['docker'],
+                                      'status': 'Offer'})
+        self.assertEqual(records[1]['status'], 'Applied')
+
+    def test_pool_ndjson_with_filters(self):
+        query = exports.pool_query(job_id=2, status='Offer', min_score=5, since='2026-01-04')
+        records = [json.loads(line) for line in ''.join(exports.stream(query, exports.POOL_FIELDS, 'ndjson')).splitlines()]
+        self.assertEqual([r['filename'] for r in records], ['cv21.pdf', 'cv15.pdf', 'cv9.pdf'])
+        self.assertEqual(records[0]['job'], 'Ops')
+        self.assertNotIn('rank', records[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import ingestion
+
+class LeaseTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.old_name = database.DB_NAME
+        database.DB_NAME = os.path.join(self.dir, 'test.db')
+        with database.get_db_connection() as conn:
+            conn.execute('''CREATE TABLE ingest_items (id INTEGER PRIMARY KEY, batch_id INTEGER, job_id INTEGER,
+                            filename TEXT, status TEXT, started_ts REAL, lease_ts REAL)''')
+            conn.executemany("INSERT INTO ingest_items (job_id, filename, status) VALUES (1, ?, 'queued')",
+                             [(f'cv{i}.pdf',) for i in range(3)])
+
+    def tearDown(self):
+        database.DB_NAME = self.old_name
+        shutil.rmtree(self.dir)
+
+    def test_live_items_are_not_reclaimed_by_other_workers(self):
+        first = ingestion._claim(2)
+        self.assertEqual(len(first), 2)
+        # Another worker (or a freshly started process) only gets what is still queued
+        second = ingestion._claim(2)
+        self.assertEqual([i['filename'] for i in second], ['cv2.pdf'])
+        self.assertEqual(ingestion._claim(2), [])
+        self.assertEqual(ingestion._renew(first), {i['id'] for i in first})
+
+    def test_expired_leases_are_requeued_and_the_old_owner_loses_them(self):
+        first = ingestion._claim(3)
+        with database.get_db_connection() as conn:
+            conn.execute('UPDATE ingest_items SET lease_ts = ? WHERE id = ?',
+                         (first[0]['started_ts'] - ingestion.LEASE_SECONDS - 1, first[0]['id']))
+        reclaimed = ingestion._claim(3)
+        self.assertEqual([i['id'] for i in reclaimed], [first[0]['id']])
+        # The original worker must not insert it as well
+        self.assertEqual(ingestion._renew(first), {i['id'] for i in first[1:]})
+
+if __name__ == '__main__':
+    unittest.main()
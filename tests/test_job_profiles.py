@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import sqlite3
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import job_profiles
+import scoring_engine
+
+class FakeEngine:
+    model_version = 'test-model'
+    hash_text = staticmethod(scoring_engine.ScoringEngine.hash_text)
+
+    def __init__(self):
+        self.builds = 0
+
+    def build_job_profile(self, jd_text):
+        self.builds += 1
+        return {'embedding': np.ones(3, dtype=np.float32), 'skills': ['python'],
+                'jd_hash': self.hash_text(jd_text), 'model_version': self.model_version,
+                'skills_version': scoring_engine.analysis_version()}
+
+class JobProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('''CREATE TABLE jobs (id INTEGER PRIMARY KEY, description TEXT, jd_embedding BLOB,
+                             jd_skills TEXT, jd_hash TEXT, jd_model_version TEXT, jd_skills_version TEXT)''')
+        self.conn.execute("INSERT INTO jobs (id, description) VALUES (1, 'Python developer')")
+        self.engine = FakeEngine()
+
+    def profile(self):
+        job = self.conn.execute('SELECT * FROM jobs WHERE id = 1').fetchone()
+        return job_profiles.get_job_profile(self.conn, job, self.engine)
+
+    def test_profile_is_rebuilt_when_the_skill_taxonomy_changes(self):
+        self.profile()
+        self.assertEqual(self.profile()['skills'], ['python'])
+        self.assertEqual(self.engine.builds, 1)
+        with mock.patch.object(scoring_engine, 'analysis_version', return_value='new-taxonomy'):
+            self.assertEqual(self.profile()['skills_version'], 'new-taxonomy')
+            self.profile()
+        self.assertEqual(self.engine.builds, 2)
+
+    def test_new_job_profile_is_built_in_the_background(self):
+        tmp = tempfile.mkdtemp()
+        old_name = database.DB_NAME
+        database.DB_NAME = os.path.join(tmp, 'test.db')
+        try:
+            with database.get_db_connection() as conn:
+                conn.execute('''CREATE TABLE jobs (id INTEGER PRIMARY KEY, description TEXT, jd_embedding BLOB,
+                                jd_skills TEXT, jd_hash TEXT, jd_model_version TEXT, jd_skills_version TEXT)''')
+                conn.execute("INSERT INTO jobs (id, description) VALUES (7, 'Python developer')")
+            with mock.patch.object(scoring_engine, 'get_engine', return_value=self.engine):
+                job_profiles.build_in_background(7).join(10)
+            with database.get_db_connection() as conn:
+                job = conn.execute('SELECT * FROM jobs WHERE id = 7').fetchone()
+            self.assertTrue(job_profiles._is_fresh(job, self.engine))
+            self.assertEqual(self.engine.builds, 1)
+        finally:
+            database.DB_NAME = old_name
+            shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    unittest.main()
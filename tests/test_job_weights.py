@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import job_weights
+import rollups
+
+class JobWeightsTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('''CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT,
+                             weight_semantic REAL, weight_skills REAL, weight_experience REAL)''')
+        self.conn.execute('''CREATE TABLE candidates (id INTEGER PRIMARY KEY, job_id INTEGER, semantic_score REAL,
+                             skills_score REAL, experience_score REAL, total_score REAL, status TEXT,
+                             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        self.conn.executemany('INSERT INTO jobs (id, title) VALUES (?, ?)', [(1, 'Dev'), (2, 'Ops')])
+        self.conn.executemany('''INSERT INTO candidates (job_id, semantic_score, skills_score, experience_score, total_score)
+                                 VALUES (?, ?, ?, ?, ?)''',
+                              [(1, 80, 20, 50, 56), (1, 40, 90, 60, 59), (1, None, None, None, 30), (2, 80, 20, 50, 56)])
+        rollups.init_sqlite(self.conn)
+        rollups.rebuild(self.conn)
+
+    def job(self, job_id):
+        return self.conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def test_parse_form_normalizes_percentages(self):
+        weights = job_weights.parse_form({'weight_semantic': '20', 'weight_skills': '60', 'weight_experience': '20'})
+        self.assertAlmostEqual(weights['skills'], 0.6)
+        self.assertAlmostEqual(sum(weights.values()), 1.0)
+        for bad in ({'weight_semantic': 'x', 'weight_skills': '1', 'weight_experience': '1'},
+                    {'weight_semantic': '-1', 'weight_skills': '1', 'weight_experience': '1'},
+                    {'weight_semantic': '0', 'weight_skills': '0', 'weight_experience': '0'}):
+            with self.assertRaises(ValueError):
+                job_weights.parse_form(bad)
+
+    def test_rescore_reranks_one_job_from_stored_components(self):
+        self.assertEqual(job_weights.get_weights(self.job(1)), job_weights.DEFAULT_WEIGHTS)
+        weights = {'overall_similarity': 0.2, 'skills': 0.6, 'experience': 0.2}
+        self.assertEqual(job_weights.rescore(self.conn, 1, weights), 2)
+        self.assertEqual(job_weights.get_weights(self.job(1)), weights)
+        scores = [row['total_score'] for row in self.conn.execute('SELECT total_score FROM candidates ORDER BY id')]
+        self.assertEqual(scores, [38.0, 74.0, 30, 56]) # unscored row and other job untouched
+        # The rollup triggers followed the UPDATE
+        rollups.invalidate()
+        self.assertEqual(rollups.dashboard_counters(self.conn)['avg_score'], round((38 + 74 + 30 + 56) / 4, 1))
+
+if __name__ == '__main__':
+    unittest.main()
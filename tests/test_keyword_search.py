@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import keyword_search
+import documents
+
+class KeywordSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        database._register_sqlite_functions(self.conn)
+        self.conn.execute('''CREATE TABLE candidates (id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER, name TEXT,
+                             filename TEXT, total_score REAL, skills_score REAL, full_text TEXT, document_hash TEXT,
+                             status TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        self.conn.execute('CREATE TABLE documents (content_hash TEXT PRIMARY KEY, body BLOB NOT NULL, raw_size INTEGER)')
+        # Legacy row with inline text, indexed when the FTS table is created
+        self.conn.execute("INSERT INTO candidates (filename, full_text) VALUES ('old.pdf', 'Java developer')")
+        database._init_search_sqlite(self.conn)
+        for filename, text in [('a.pdf', 'Senior Python developer with machine learning experience'),
+                               ('b.pdf', 'Machine operator. Learning Python <script>'),
+                               ('c.pdf', 'Pythonista and data engineer')]:
+            self.conn.execute('INSERT INTO candidates (filename, document_hash) VALUES (?, ?)',
+                              (filename, documents.store(self.conn, text)))
+
+    def names(self, query):
+        return [row['filename'] for row in keyword_search.search(self.conn, query)[1]]
+
+    def test_parse_query_drops_operators(self):
+        terms = keyword_search.parse_query('"machine learning" pyth* NEAR( -x')
+        self.assertEqual(terms, [('phrase', ['machine', 'learning']), ('prefix', 'pyth'),
+                                 ('word', 'near'), ('word', 'x')])
+
+    def test_words_phrases_and_prefixes(self):
+        self.assertEqual(self.names('java'), ['old.pdf'])
+        self.assertEqual(sorted(self.names('python machine')), ['a.pdf', 'b.pdf'])
+        self.assertEqual(self.names('"machine learning"'), ['a.pdf'])
+        self.assertEqual(sorted(self.names('pyth*')), ['a.pdf', 'b.pdf', 'c.pdf'])
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.conn.execute("UPDATE candidates SET document_hash = ? WHERE filename = 'a.pdf'",
+                          (documents.store(self.conn, 'Rust developer'),))
+        self.conn.execute("DELETE FROM candidates WHERE filename = 'old.pdf'")
+        self.conn.execute("UPDATE candidates SET status = 'Hired' WHERE filename = 'c.pdf'")
+        self.assertEqual(self.names('rust'), ['a.pdf'])
+        self.assertEqual(self.names('java'), [])
+        self.assertEqual(self.names('pythonista'), ['c.pdf'])
+
+    def test_migrated_rows_stay_searchable(self):
+        self.assertEqual(documents.migrate_inline_text(self.conn), 1)
+        self.assertEqual(self.names('java'), ['old.pdf'])
+        self.conn.execute("DELETE FROM candidates WHERE filename = 'old.pdf'")
+        self.assertEqual(self.names('java'), [])
+        self.conn.execute("INSERT INTO candidates_fts (candidates_fts) VALUES ('integrity-check')")
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        row = keyword_search.search(self.conn, 'operator')[1][0]
+        self.assertIn('<mark>operator</mark>', row['snippet'].lower())
+        self.assertIn('&lt;script&gt;', row['snippet'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import migrations
+
+class MigrationTests(unittest.TestCase):
+    def setUp(self):
+        # Original tables, with one later column already added by hand
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute('CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT, created_at TIMESTAMP)')
+        self.conn.execute('''CREATE TABLE candidates (id INTEGER PRIMARY KEY, job_id INTEGER, user_id INTEGER,
+                             total_score REAL, created_at TIMESTAMP, status TEXT)''')
+        self.conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+        self.conn.execute('CREATE TABLE ingest_items (id INTEGER PRIMARY KEY)')
+
+    def columns(self, table):
+        return {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+
+    def test_applies_pending_versions_once(self):
+        version, applied = migrations.migrate(self.conn.cursor())
+        self.assertEqual(version, migrations.MIGRATIONS[-1][0])
+        self.assertEqual([v for v, _ in applied], [m[0] for m in migrations.MIGRATIONS])
+        self.assertLessEqual({'status', 'notes', 'document_hash'}, self.columns('candidates'))
+        self.assertLessEqual({'resume_path', 'skills', 'profile_summary'}, self.columns('users'))
+
+        self.assertEqual(migrations.migrate(self.conn.cursor()), (version, []))
+        recorded = [row[0] for row in self.conn.execute('SELECT version FROM schema_migrations ORDER BY version')]
+        self.assertEqual(recorded, [m[0] for m in migrations.MIGRATIONS])
+
+    def test_hot_queries_use_indexes(self):
+        migrations.migrate(self.conn.cursor())
+        plans = [
+            'SELECT id FROM candidates WHERE user_id = 1 AND job_id = 2',
+            "SELECT id FROM candidates WHERE job_id = 1 AND status = 'Offer' ORDER BY total_score DESC, id DESC LIMIT 25",
+            'SELECT id FROM candidates WHERE job_id = 1 ORDER BY total_score DESC, id DESC LIMIT 25',
+        ]
+        for sql in plans:
+            detail = ' '.join(row[3] for row in self.conn.execute('EXPLAIN QUERY PLAN ' + sql))
+            self.assertIn('USING', detail, sql)
+            self.assertNotIn('TEMP B-TREE', detail, sql)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pagination
+
+class KeysetPaginationTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('CREATE TABLE candidates (id INTEGER PRIMARY KEY, job_id INTEGER, total_score REAL, full_text TEXT)')
+        # Ties on score so the id tie-breaker matters
+        self.conn.executemany('INSERT INTO candidates (id, job_id, total_score) VALUES (?, 1, ?)',
+                              [(i, float(i // 3)) for i in range(1, 12)])
+
+    def page(self, **cursor):
+        return pagination.keyset_page(self.conn, 'id, total_score', 'candidates', 'job_id = ?', [1],
+                                      ('total_score', 'id'), 4, **cursor)
+
+    def ids(self, page):
+        return [row['id'] for row in page['rows']]
+
+    def test_walks_forward_and_back_without_gaps(self):
+        first = self.page()
+        second = self.page(after=first['next_cursor'])
+        third = self.page(after=second['next_cursor'])
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), list(range(11, 0, -1)))
+        self.assertIsNone(first['prev_cursor'])
+        self.assertIsNone(third['next_cursor'])
+
+        back = self.page(before=third['prev_cursor'])
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertIsNotNone(back['next_cursor'])
+        self.assertEqual(self.ids(self.page(before=back['prev_cursor'])), self.ids(first))
+
+    def test_bad_cursor_returns_first_page(self):
+        self.assertEqual(self.ids(self.page(after='not-a-cursor')), [11, 10, 9, 8])
+
+    def test_unscored_rows_come_last_on_later_pages(self):
+        self.conn.executemany('INSERT INTO candidates (id, job_id, total_score) VALUES (?, 1, NULL)', [(12,), (13,)])
+        nulls = {'total_score': -1}
+        pages = [pagination.keyset_page(self.conn, 'id, total_score', 'candidates', 'job_id = ?', [1],
+                                        ('total_score', 'id'), 4, nulls=nulls)]
+        while pages[-1]['next_cursor']:
+            pages.append(pagination.keyset_page(self.conn, 'id, total_score', 'candidates', 'job_id = ?', [1],
+                                                ('total_score', 'id'), 4, after=pages[-1]['next_cursor'], nulls=nulls))
+        self.assertEqual(sum((self.ids(p) for p in pages), []), list(range(11, 0, -1)) + [13, 12])
+        last = pages[-1]['rows'][0]
+        self.assertEqual(pagination.rows_ahead(self.conn, 'candidates', 'job_id = ?', [1], ('total_score', 'id'),
+                                               last, nulls=nulls), 12)
+        back = pagination.keyset_page(self.conn, 'id, total_score', 'candidates', 'job_id = ?', [1],
+                                      ('total_score', 'id'), 4, before=pages[-1]['prev_cursor'], nulls=nulls)
+        self.assertEqual(self.ids(back), self.ids(pages[-2]))
+
+    def test_count(self):
+        self.assertEqual(pagination.count(self.conn, 'candidates', 'job_id = ?', [1]), 11)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import sys
+import os
+import sqlite3
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import rollups
+
+class RollupTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT)')
+        self.conn.execute('''CREATE TABLE candidates (id INTEGER PRIMARY KEY, job_id INTEGER, total_score REAL,
+                             status TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        self.conn.executemany('INSERT INTO jobs (id, title) VALUES (?, ?)', [(1, 'Dev'), (2, 'Ops')])
+        # Existing rows before the rollups exist
+        self.conn.execute("INSERT INTO candidates (job_id, total_score, status) VALUES (1, 91, 'Offer')")
+        self.assertTrue(rollups.init_sqlite(self.conn))
+        rollups.rebuild(self.conn)
+        self.conn.executemany('INSERT INTO candidates (job_id, total_score, status) VALUES (?, ?, ?)',
+                              [(1, 45, None), (1, 65, 'Screening'), (2, 80, 'Applied'), (2, None, None)])
+
+    def snapshot(self):
+        data = rollups.read(self.conn)
+        return data['job_counts'], data['score_buckets'], data['statuses'], data['daily_counts'][-1]
+
+    def test_triggers_track_inserts_updates_and_deletes(self):
+        self.assertEqual(self.snapshot(), ([3, 2], [1, 1, 2], {'Offer': 1, 'Applied': 3, 'Screening': 1}, 5))
+        self.conn.execute("UPDATE candidates SET status = 'Rejected' WHERE total_score = 45")
+        self.conn.execute('UPDATE candidates SET total_score = 85 WHERE total_score = 65')
+        self.conn.execute('DELETE FROM candidates WHERE total_score = 80')
+        jobs, buckets, statuses, today = self.snapshot()
+        self.assertEqual(jobs, [3, 1])
+        self.assertEqual(buckets, [1, 0, 2])
+        self.assertEqual({k: v for k, v in statuses.items() if v}, {'Offer': 1, 'Applied': 1, 'Screening': 1, 'Rejected': 1})
+        self.assertEqual(today, 4)
+
+    def test_rebuild_matches_incremental_state(self):
+        self.conn.execute("UPDATE candidates SET status = 'Interview' WHERE job_id = 2")
+        self.conn.execute('DELETE FROM jobs WHERE id = 2')
+        incremental = self.snapshot()
+        self.conn.execute('UPDATE rollup_status_counts SET candidates = 99') # drift
+        rollups.rebuild(self.conn)
+        self.assertEqual(self.snapshot()[:2], incremental[:2])
+        self.assertEqual({k: v for k, v in self.snapshot()[2].items() if v},
+                         {k: v for k, v in incremental[2].items() if v})
+
+    def test_dashboard_counters_are_cached_until_invalidated(self):
+        rollups.invalidate()
+        counters = rollups.dashboard_counters(self.conn)
+        self.assertEqual(counters['total_candidates'], 5)
+        self.assertEqual(counters['avg_score'], round((91 + 45 + 65 + 80) / 4, 1)) # NULL scores excluded, like AVG()
+        self.assertEqual(counters['job_counts'], {1: 3, 2: 2})
+
+        self.conn.execute('UPDATE candidates SET total_score = 10 WHERE total_score = 91')
+        self.conn.execute('DELETE FROM candidates WHERE job_id = 2')
+        self.assertIs(rollups.dashboard_counters(self.conn), counters) # still cached
+        rollups.invalidate()
+        counters = rollups.dashboard_counters(self.conn)
+        self.assertEqual((counters['total_candidates'], counters['avg_score']), (3, 40.0))
+        self.assertEqual(counters['job_counts'], {1: 3, 2: 0})
+
+        totals = tuple(self.conn.execute('SELECT candidates, scored, score_sum FROM rollup_totals').fetchone())
+        rollups.rebuild(self.conn)
+        self.assertEqual(tuple(self.conn.execute('SELECT candidates, scored, score_sum FROM rollup_totals').fetchone()), totals)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from skills import SkillTaxonomy, get_taxonomy
+
+class SkillTaxonomyTests(unittest.TestCase):
+    def setUp(self):
+        self.taxonomy = get_taxonomy()
+
+    def test_word_boundaries(self):
+        self.assertIn('java', self.taxonomy.extract("Senior Java engineer"))
+        self.assertNotIn('java', self.taxonomy.extract("JavaScript only"))
+        self.assertIn('spring', self.taxonomy.extract("Spring-Boot microservices"))
+        self.assertIn('node', self.taxonomy.extract("APIs in Node.js"))
+
+    def test_symbols_and_phrases(self):
+        found = self.taxonomy.extract("C++ and C# developer, dashboards in Power BI.")
+        self.assertTrue({'c++', 'c#', 'power bi'} <= found)
+
+    def test_case_sensitive_and_synonyms(self):
+        self.assertIn('go', self.taxonomy.extract("Backend in Go"))
+        self.assertIn('go', self.taxonomy.extract("golang services"))
+        self.assertNotIn('go', self.taxonomy.extract("ready to go"))
+        self.assertIn('r', self.taxonomy.extract("Statistics with R"))
+        self.assertIn('kubernetes', self.taxonomy.extract("k8s clusters"))
+
+    def test_category_index_and_validation(self):
+        self.assertEqual(self.taxonomy.category_of['postgresql'], 'db')
+        with self.assertRaises(ValueError):
+            SkillTaxonomy({'db': ['mysql']}, synonyms={'pg': 'postgresql'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import threading
+from unittest import mock
+import docx
+from werkzeug.datastructures import FileStorage
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import upload_store
+import cv_parser
+
+class UploadStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _upload(self, data, name):
+        return upload_store.save(FileStorage(stream=io.BytesIO(data), filename=name), self.root)
+
+    def test_identical_uploads_are_deduplicated(self):
+        key1 = self._upload(b"Python developer", "resume.txt")
+        key2 = self._upload(b"Python developer", "other_name.txt")
+        key3 = self._upload(b"Java developer", "resume.txt")
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+        self.assertTrue(os.path.exists(os.path.join(self.root, key1)))
+
+    def test_text_is_cached_next_to_blob(self):
+        key = self._upload(b"Python developer", "resume.txt")
+        path = os.path.join(self.root, key)
+        self.assertEqual(upload_store.get_text(path), "Python developer")
+        # Served from the cache even if the blob goes away
+        os.remove(path)
+        self.assertEqual(upload_store.get_text(path), "Python developer")
+
+    def test_type_is_sniffed_from_content(self):
+        buffer = io.BytesIO()
+        document = docx.Document()
+        document.add_paragraph("Rust engineer")
+        document.save(buffer)
+        self.assertEqual(cv_parser.sniff_type(buffer.getvalue()), 'docx')
+        self.assertEqual(cv_parser.sniff_type(b"%PDF-1.7\n"), 'pdf')
+        self.assertEqual(cv_parser.sniff_type(b"Caf\xc3\xa9 owner\r\n"), 'txt')
+        self.assertIsNone(cv_parser.sniff_type(b"\x89PNG\r\n\x1a\n\x00"))
+        # Bytes and file objects; the name plays no part
+        self.assertEqual(cv_parser.extract_text(buffer.getvalue()), "Rust engineer")
+        self.assertEqual(cv_parser.extract_text(io.BytesIO(b"a\r\nb")), "a\nb")
+        with self.assertRaises(ValueError):
+            cv_parser.extract_text(b"\x89PNG\r\n\x1a\n\x00")
+
+    def test_parse_reads_from_memory_and_persists_as_configured(self):
+        upload = lambda: FileStorage(stream=io.BytesIO(b"Python developer"), filename="resume.pdf")
+        with mock.patch.object(upload_store, 'PERSIST', 'off'):
+            key, text = upload_store.parse(upload(), self.root)
+        self.assertEqual(text, "Python developer")
+        self.assertTrue(key.endswith('.txt')) # sniffed, not taken from the filename
+        self.assertEqual(os.listdir(self.root), [])
+
+        with mock.patch.object(upload_store, 'PERSIST', 'sync'):
+            self.assertEqual(upload_store.parse(upload(), self.root), (key, text))
+        with open(os.path.join(self.root, key), 'rb') as f:
+            self.assertEqual(f.read(), b"Python developer")
+        self.assertEqual(upload_store._read_cached(os.path.join(self.root, key)), text)
+
+    def test_concurrent_writers_use_their_own_temp_files(self):
+        path = os.path.join(self.root, 'ab', 'cd', 'abcd.txt')
+        os.makedirs(os.path.dirname(path))
+        sources = []
+        real_replace = os.replace
+        def replace(src, dst):
+            sources.append(src)
+            real_replace(src, dst)
+        with mock.patch.object(upload_store.os, 'replace', replace):
+            threads = [threading.Thread(target=upload_store._write, args=(path, b"Python developer", "Python developer"))
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(set(sources)), len(sources))
+        self.assertEqual(upload_store.get_text(path), "Python developer")
+        self.assertEqual(sorted(os.listdir(os.path.dirname(path))), ['abcd.text.json', 'abcd.txt'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database
+import vector_index
+from vector_index import VectorIndex
+
+def _unit(rows):
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+class VectorIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index = VectorIndex(os.path.join(self.dir, 'index'))
+        self.index.clear('test-model', 8)
+        self.vectors = _unit(np.random.default_rng(0).normal(size=(50, 8)).astype(np.float32))
+        self.index.add(list(range(1, 51)), self.vectors)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_exact_top_k_and_pages(self):
+        total, hits = self.index.search(self.vectors[9], offset=0, limit=5)
+        self.assertEqual(total, 50)
+        self.assertEqual(hits[0][0], 10)
+        self.assertAlmostEqual(hits[0][1], 1.0, places=2)
+        self.assertEqual([s for _, s in hits], sorted([s for _, s in hits], reverse=True))
+        _, next_page = self.index.search(self.vectors[9], offset=5, limit=5)
+        self.assertFalse({cid for cid, _ in hits} & {cid for cid, _ in next_page})
+
+    def test_removed_candidates_are_not_returned(self):
+        self.index.remove([10])
+        total, hits = self.index.search(self.vectors[9], limit=50)
+        self.assertEqual(total, 49)
+        self.assertNotIn(10, [cid for cid, _ in hits])
+
+    def test_ivf_search_finds_exact_match(self):
+        self.index.train_ivf(nlist=4)
+        self.index.add([51], self.vectors[:1]) # assigned to a list on insert
+        old_min = vector_index.IVF_MIN_ROWS
+        vector_index.IVF_MIN_ROWS = 1
+        try:
+            _, hits = self.index.search(self.vectors[20], limit=3)
+        finally:
+            vector_index.IVF_MIN_ROWS = old_min
+        self.assertEqual(hits[0][0], 21)
+
+    def test_add_is_idempotent_per_candidate(self):
+        self.index.add([10, 51, 51], self.vectors[:3])
+        total, hits = self.index.search(self.vectors[9], limit=60)
+        self.assertEqual(total, 51)
+        self.assertEqual(len(hits), len({cid for cid, _ in hits}))
+
+    def test_remove_missing_tombstones_deleted_candidates(self):
+        old_name = database.DB_NAME
+        database.DB_NAME = os.path.join(self.dir, 'test.db')
+        try:
+            with database.get_db_connection() as conn:
+                conn.execute('CREATE TABLE candidates (id INTEGER PRIMARY KEY)')
+                conn.executemany('INSERT INTO candidates (id) VALUES (?)', [(i,) for i in range(1, 51) if i % 10])
+            self.index.remove_missing()
+        finally:
+            database.DB_NAME = old_name
+        total, hits = self.index.search(self.vectors[9], limit=50)
+        self.assertEqual(total, 45)
+        self.assertFalse({10, 20, 30, 40, 50} & {cid for cid, _ in hits})
+
+    def test_same_size_rebuild_from_another_process_is_picked_up(self):
+        reader = VectorIndex(self.index.path) # e.g. another gunicorn worker
+        self.assertEqual(reader.search(self.vectors[9], limit=1)[1][0][0], 10)
+        # A rebuild elsewhere swaps in a new directory with the same number of rows
+        tmp = VectorIndex(self.index.path + '.tmp')
+        tmp.clear('test-model', 8)
+        tmp.add(list(range(101, 151)), self.vectors)
+        shutil.rmtree(self.index.path)
+        os.replace(tmp.path, self.index.path)
+        self.assertEqual(reader.search(self.vectors[9], limit=1)[1][0][0], 110)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+from cv_parser import extract_text, extract_texts, sniff_type, EXTRACTOR_VERSION
+
+# Content-Addressed Upload Store
+# Every upload is stored once under uploads/ by the sha256 of its bytes:
+#   uploads/ab/cd/abcd...ef.pdf            <- the blob
+#   uploads/ab/cd/abcd...ef.text.json      <- extracted text + extractor version
+# Identical uploads dedupe to the same blob, and any path that needs the text
+# reads the cached copy instead of re-parsing the file.
+#
+# Uploads are parsed straight from memory (parse here; CV uploads are queued as bytes
+# and parsed by the ingestion workers) and never read back from disk. Writing the
+# blob + text cache is a separate step (persist), set by UPLOAD_PERSIST:
+#   async (default)  written by a background thread once the text is extracted
+#   sync             written before persist returns
+#   off              never written (read-only or network-backed uploads dir);
+#                    the parsed text lives in the documents table either way
+
+CHUNK = 1024 * 1024
+PERSIST = os.getenv('UPLOAD_PERSIST', 'async')
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _key_for(digest, ext):
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def _text_cache_path(path):
+    return os.path.splitext(path)[0] + '.text.json'
+
+
+def read(file_storage):
+    """
+    Read an upload into memory (request size is capped by MAX_CONTENT_LENGTH).
+    Returns (data, key); the key's extension comes from the sniffed type, not the filename.
+    """
+    data = file_storage.read()
+    file_type = sniff_type(data)
+    ext = f'.{file_type}' if file_type else os.path.splitext(secure_filename(file_storage.filename or ''))[1].lower()
+    return data, _key_for(hashlib.sha256(data).hexdigest(), ext)
+
+
+def _write(path, data, text=None):
+    """
+    Write a blob (and its text cache) into place, unless it is already stored.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):
+        # Temp file in the same filesystem, then move into place
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    if text is not None:
+        _write_cached(path, text)
+
+
+def _write_in_background(path, data, text):
+    try:
+        _write(path, data, text)
+    except OSError as e:
+        print(f"Could not store upload {path}: {e}")
+
+
+def persist(path, data, text=None):
+    """
+    Store an upload that was parsed in memory at path (root + key), as configured by PERSIST.
+    """
+    global _writer
+    if PERSIST == 'off':
+        return
+    if PERSIST == 'sync':
+        _write(path, data, text)
+        return
+    with _writer_lock:
+        if _writer is None:
+            # One thread: uploads are written in arrival order, off the request path
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-writer')
+    _writer.submit(_write_in_background, path, data, text)
+
+
+def save(file_storage, root):
+    """
+    Store an uploaded FileStorage now. Returns the blob key (a path relative to root).
+    """
+    data, key = read(file_storage)
+    _write(os.path.join(root, key), data)
+    return key
+
+
+def parse(file_storage, root):
+    """
+    Extract an upload's text from memory, then persist the original. Returns (key, text).
+    """
+    data, key = read(file_storage)
+    text = extract_text(data)
+    persist(os.path.join(root, key), data, text)
+    return key, text
+
+
+def _read_cached(path):
+    try:
+        with open(_text_cache_path(path), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('extractor_version') == EXTRACTOR_VERSION:
+            return cached['text']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _write_cached(path, text):
+    cache_path = _text_cache_path(path)
+    tmp_path = None
+    try:
+        # A temp name of its own: identical uploads may write the same cache at once
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(cache_path) or '.',
+                                         suffix='.part', delete=False) as f:
+            tmp_path = f.name
+            json.dump({'extractor_version': EXTRACTOR_VERSION, 'text': text}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # Caching is best-effort (e.g. read-only uploads dir)
+        print(f"Could not cache extracted text for {path}: {e}")
+
+
+def get_text(path):
+    """
+    Extracted text for a stored file, parsing it only on a cache miss.
+    """
+    text = _read_cached(path)
+    if text is None:
+        text = extract_text(path)
+        _write_cached(path, text)
+    return text
+
+
+def get_texts(paths):
+    """
+    Batch version of get_text. Cache misses are extracted in parallel (cv_parser.extract_texts).
+    Returns {'path', 'text', 'error'} dicts in input order.
+    """
+    results = [{'path': p, 'text': _read_cached(p), 'error': None} for p in paths]
+    misses = [i for i, r in enumerate(results) if r['text'] is None]
+    for i, extracted in zip(misses, extract_texts([paths[i] for i in misses])):
+        results[i] = extracted
+        if extracted['error'] is None:
+            _write_cached(paths[i], extracted['text'])
+    return results
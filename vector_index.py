@@ -0,0 +1,416 @@
+import os
+import json
+import uuid
+import shutil
+import threading
+import numpy as np
+import database
+import documents
+
+try:
+    import fcntl
+except ImportError: # Windows: process-local locking only
+    fcntl = None
+
+# Candidate Vector Index (semantic talent pool search)
+# Files under VECTOR_INDEX_DIR, appended in lockstep, one row per candidate:
+#   vectors.f16   float16 [n, dim] resume embeddings, pooled from chunks (memory-mapped for queries)
+#   ids.i64       int64   [n] candidate ids; -1 marks a deleted row
+#   lists.i32     int32   [n] IVF list of each row (-1 until the IVF is trained)
+#   centroids.npy float32 [nlist, dim] optional IVF centroids
+#   meta.json     model version, dimension, vector format + build stamp (new on every rebuild,
+#                 clear and IVF training, so other processes drop their cached maps)
+# Queries are exact (chunked NumPy dot products) for small pools, IVF-probed for large ones.
+
+INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', 'vector_index')
+IVF_MIN_ROWS = int(os.getenv('VECTOR_INDEX_IVF_MIN_ROWS', 50000)) # below this, always exact
+IVF_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', 8))
+SCAN_CHUNK = 16384 # rows converted to float32 at a time
+# Bump when the way resume vectors are derived changes; older indexes are rebuilt
+VECTOR_FORMAT = 2 # 2: ScoringEngine.encode_documents (pooled chunks); 1: full text, truncated
+
+
+class VectorIndex:
+    def __init__(self, path=INDEX_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._maps = None # (build, rows, vectors, ids, lists) for the last seen build and file size
+        self._centroids = None # (build, centroids)
+        self.rebuilding = False
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    # --- Metadata ---
+
+    def meta(self):
+        try:
+            with open(self._file('meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, model_version):
+        meta = self.meta()
+        return (meta is not None and meta.get('model_version') == model_version
+                and meta.get('format', 1) == VECTOR_FORMAT)
+
+    def _rows_on_disk(self, dim):
+        try:
+            vec_rows = os.path.getsize(self._file('vectors.f16')) // (2 * dim)
+            id_rows = os.path.getsize(self._file('ids.i64')) // 8
+            list_rows = os.path.getsize(self._file('lists.i32')) // 4
+        except OSError:
+            return 0
+        # ids are written last, so a half-finished append is never visible
+        return min(vec_rows, id_rows, list_rows)
+
+    # --- Writes (serialized across threads and processes) ---
+
+    def _exclusive(self):
+        return _FileLock(self._file('.lock'), self._lock)
+
+    def add(self, candidate_ids, vectors):
+        """
+        Append rows for newly inserted candidates. Idempotent per id: candidates that
+        already have a live row (e.g. indexed by a rebuild that was running) are skipped.
+        """
+        meta = self.meta()
+        if meta is None or not len(candidate_ids):
+            return # no index yet; the next rebuild picks these up
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(candidate_ids), meta['dim'])
+
+        with self._exclusive():
+            rows = self._rows_on_disk(meta['dim'])
+            keep = np.unique(candidate_ids, return_index=True)[1]
+            if rows:
+                existing = np.fromfile(self._file('ids.i64'), dtype=np.int64, count=rows)
+                keep = keep[~np.isin(candidate_ids[keep], existing)]
+            if not len(keep):
+                return
+            keep.sort()
+            candidate_ids, vectors = candidate_ids[keep], vectors[keep]
+            centroids = self._load_centroids(self.meta())
+            if centroids is not None:
+                lists = np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+            else:
+                lists = np.full(len(candidate_ids), -1, dtype=np.int32)
+
+            # Truncate any torn append from a crashed writer before adding
+            for name, width in (('vectors.f16', 2 * meta['dim']), ('lists.i32', 4), ('ids.i64', 8)):
+                with open(self._file(name), 'r+b') as f:
+                    f.truncate(rows * width)
+            with open(self._file('vectors.f16'), 'ab') as f:
+                f.write(vectors.astype(np.float16).tobytes())
+            with open(self._file('lists.i32'), 'ab') as f:
+                f.write(lists.tobytes())
+            with open(self._file('ids.i64'), 'ab') as f:
+                f.write(candidate_ids.tobytes())
+
+    def remove(self, candidate_ids):
+        """
+        Tombstone rows of deleted candidates.
+        """
+        meta = self.meta()
+        if meta is None or not candidate_ids:
+            return
+        with self._exclusive():
+            rows = self._rows_on_disk(meta['dim'])
+            if not rows:
+                return
+            ids = np.memmap(self._file('ids.i64'), dtype=np.int64, mode='r+', shape=(rows,))
+            ids[np.isin(ids, np.asarray(list(candidate_ids), dtype=np.int64))] = -1
+            ids.flush()
+            del ids
+
+    def remove_missing(self):
+        """
+        Tombstone rows whose candidate no longer exists.
+        """
+        meta = self.meta()
+        if meta is None:
+            return
+        rows = self._rows_on_disk(meta['dim'])
+        if not rows:
+            return
+        indexed = np.fromfile(self._file('ids.i64'), dtype=np.int64, count=rows)
+        with database.get_db_connection() as conn:
+            live = np.fromiter((row['id'] for row in conn.stream('SELECT id FROM candidates')), dtype=np.int64)
+        self.remove(set(indexed[(indexed >= 0) & ~np.isin(indexed, live)].tolist()))
+
+    def clear(self, model_version, dim):
+        """
+        Start an empty index for the given model.
+        """
+        with self._exclusive():
+            self._write_empty(self.path, model_version, dim)
+            self._maps = None
+            self._centroids = None
+
+    @staticmethod
+    def _write_empty(path, model_version, dim):
+        os.makedirs(path, exist_ok=True)
+        for name in ('vectors.f16', 'ids.i64', 'lists.i32'):
+            open(os.path.join(path, name), 'wb').close()
+        if os.path.exists(os.path.join(path, 'centroids.npy')):
+            os.remove(os.path.join(path, 'centroids.npy'))
+        VectorIndex._write_meta(path, {'model_version': model_version, 'dim': dim, 'format': VECTOR_FORMAT})
+
+    @staticmethod
+    def _write_meta(path, meta):
+        # Atomic, with a fresh build stamp: readers never see a half-written file
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(dict(meta, build=uuid.uuid4().hex), f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    # --- Rebuild & IVF training ---
+
+    def rebuild(self, engine, batch_size=256):
+        """
+        Re-create the index from every stored candidate. Embeddings come through the
+        engine's cache, so only resumes it has never seen are encoded.
+        """
+        dim = int(engine.encode("").shape[0])
+        tmp = self.path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        self._write_empty(tmp, engine.model_version, dim)
+
+        last_id = 0
+        conn = database.get_db_connection()
+        try:
+            cur = conn.execute('SELECT id, document_hash, full_text FROM candidates ORDER BY id')
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                vectors = engine.encode_documents(documents.candidate_texts(conn, rows))
+                with open(os.path.join(tmp, 'vectors.f16'), 'ab') as f:
+                    f.write(vectors.astype(np.float16).tobytes())
+                with open(os.path.join(tmp, 'lists.i32'), 'ab') as f:
+                    f.write(np.full(len(rows), -1, dtype=np.int32).tobytes())
+                with open(os.path.join(tmp, 'ids.i64'), 'ab') as f:
+                    f.write(np.asarray([row['id'] for row in rows], dtype=np.int64).tobytes())
+        finally:
+            conn.close()
+
+        with self._exclusive():
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(tmp, self.path)
+            self._maps = None
+            self._centroids = None
+
+        # Candidates inserted while we were scanning (add skips any already appended since the
+        # swap), then those deleted meanwhile: their remove() went to the old files
+        conn = database.get_db_connection()
+        try:
+            late = conn.execute('SELECT id, document_hash, full_text FROM candidates WHERE id > ? ORDER BY id',
+                                (last_id,)).fetchall()
+            late_texts = documents.candidate_texts(conn, late)
+        finally:
+            conn.close()
+        if late:
+            self.add([row['id'] for row in late], engine.encode_documents(late_texts))
+        self.remove_missing()
+
+        if self._rows_on_disk(dim) >= IVF_MIN_ROWS:
+            self.train_ivf()
+
+    def rebuild_in_background(self, engine):
+        """
+        Start a rebuild thread unless one is already running in this process.
+        """
+        with self._lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+
+        def run():
+            try:
+                self.rebuild(engine)
+                print("Vector index rebuilt.")
+            except Exception as e:
+                print(f"Vector index rebuild failed: {e}")
+            finally:
+                self.rebuilding = False
+
+        threading.Thread(target=run, name="vector-index-rebuild", daemon=True).start()
+
+    def train_ivf(self, nlist=None, iterations=10, sample=50000, seed=0):
+        """
+        Partition the rows with k-means (nlist ~ sqrt(n)) and assign every row to a list.
+        """
+        meta = self.meta()
+        rows, vectors, ids, _ = self._mapped(meta)
+        if rows == 0:
+            return
+        nlist = nlist or max(1, int(np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        pick = np.sort(rng.choice(rows, size=min(sample, rows), replace=False))
+        data = np.asarray(vectors[pick], dtype=np.float32)
+
+        # Spherical k-means: vectors are normalized, so assign by dot product
+        centroids = data[rng.choice(len(data), size=min(nlist, len(data)), replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = data[assign == c]
+                if len(members):
+                    mean = members.mean(axis=0)
+                    centroids[c] = mean / (np.linalg.norm(mean) or 1.0)
+
+        lists = np.empty(rows, dtype=np.int32)
+        for start in range(0, rows, SCAN_CHUNK):
+            block = np.asarray(vectors[start:start + SCAN_CHUNK], dtype=np.float32)
+            lists[start:start + SCAN_CHUNK] = np.argmax(block @ centroids.T, axis=1)
+
+        with self._exclusive():
+            np.save(self._file('centroids.npy'), centroids.astype(np.float32))
+            on_disk = np.memmap(self._file('lists.i32'), dtype=np.int32, mode='r+', shape=(rows,))
+            on_disk[:] = lists
+            on_disk.flush()
+            del on_disk
+            self._write_meta(self.path, meta)
+            self._maps = None
+            self._centroids = None
+        print(f"Vector index IVF trained: {len(centroids)} lists over {rows} rows.")
+
+    # --- Queries ---
+
+    def _load_centroids(self, meta):
+        build = meta and meta.get('build')
+        cached = self._centroids
+        if cached is None or cached[0] != build:
+            centroids = None
+            if os.path.exists(self._file('centroids.npy')):
+                centroids = np.load(self._file('centroids.npy'))
+            self._centroids = cached = (build, centroids)
+        return cached[1]
+
+    def _mapped(self, meta):
+        """
+        Memory-maps of the current files, re-opened when they have grown or another
+        process swapped in a new build (possibly with the same number of rows).
+        """
+        dim = meta['dim']
+        build = meta.get('build')
+        rows = self._rows_on_disk(dim)
+        maps = self._maps
+        if maps is None or maps[:2] != (build, rows):
+            if rows == 0:
+                maps = (build, 0, None, None, None)
+            else:
+                maps = (build, rows,
+                        np.memmap(self._file('vectors.f16'), dtype=np.float16, mode='r', shape=(rows, dim)),
+                        np.memmap(self._file('ids.i64'), dtype=np.int64, mode='r', shape=(rows,)),
+                        np.memmap(self._file('lists.i32'), dtype=np.int32, mode='r', shape=(rows,)))
+            self._maps = maps
+        return maps[1:]
+
+    def search(self, query_vector, offset=0, limit=20):
+        """
+        Top results for a normalized query vector.
+        Returns (total_indexed, [(candidate_id, score), ...]) for the requested page.
+        """
+        meta = self.meta()
+        if meta is None:
+            return 0, []
+        rows, vectors, ids, lists = self._mapped(meta)
+        if rows == 0:
+            return 0, []
+        query = np.asarray(query_vector, dtype=np.float32)
+        live = np.asarray(ids) >= 0
+
+        # Candidate rows: all of them, or only the probed IVF lists for big pools
+        centroids = self._load_centroids(meta)
+        if centroids is not None and rows >= IVF_MIN_ROWS:
+            probe = np.argsort(-(centroids @ query))[:IVF_NPROBE]
+            rows_to_scan = np.flatnonzero(np.isin(lists, probe) & live)
+            scores = np.empty(len(rows_to_scan), dtype=np.float32)
+            for start in range(0, len(rows_to_scan), SCAN_CHUNK):
+                part = rows_to_scan[start:start + SCAN_CHUNK]
+                scores[start:start + len(part)] = np.asarray(vectors[part], dtype=np.float32) @ query
+        else:
+            rows_to_scan = np.flatnonzero(live)
+            all_scores = np.empty(rows, dtype=np.float32)
+            for start in range(0, rows, SCAN_CHUNK):
+                all_scores[start:start + SCAN_CHUNK] = np.asarray(vectors[start:start + SCAN_CHUNK], dtype=np.float32) @ query
+            scores = all_scores[rows_to_scan]
+
+        k = min(offset + limit, len(scores))
+        if k <= 0:
+            return int(live.sum()), []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])][offset:]
+        return int(live.sum()), [(int(ids[rows_to_scan[i]]), float(scores[i])) for i in top]
+
+
+class _FileLock:
+    """
+    Thread lock + advisory file lock, so appends from several processes don't interleave.
+    """
+    def __init__(self, path, thread_lock):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.handle = open(self.path, 'w')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+        self.thread_lock.release()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex()
+        return _index
+
+
+def add_candidates(engine, candidates):
+    """
+    Index freshly inserted candidates, given (candidate_id, full_text) pairs.
+    Best-effort: a failure here only delays them until the next rebuild.
+    """
+    index = get_index()
+    if not candidates or not index.is_fresh(engine.model_version):
+        return
+    try:
+        vectors = engine.encode_documents([text for _, text in candidates]) # chunks are cache hits after scoring
+        index.add([cid for cid, _ in candidates], vectors)
+    except Exception as e:
+        print(f"Could not index candidates: {e}")
+
+
+def remove_candidates(candidate_ids):
+    try:
+        get_index().remove(list(candidate_ids))
+    except Exception as e:
+        print(f"Could not remove candidates from index: {e}")
+
+
+def clear_candidates():
+    """
+    Empty the index (after the candidates table was wiped), keeping its model stamp.
+    """
+    index = get_index()
+    meta = index.meta()
+    if meta:
+        index.clear(meta['model_version'], meta['dim'])